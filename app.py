@@ -1,27 +1,41 @@
-from flask import Flask, send_from_directory, send_file
+from flask import Flask, Response, send_from_directory, send_file
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import io
 
-from database import init_db
+from database import init_db, get_pool_metrics
+from middleware.auth_middleware import require_internal
+from middleware.query_metrics import init_query_metrics, request_metrics
+from services.serialization import init_json
 
 
 def create_app():
     app = Flask(__name__, static_folder="frontend", static_url_path="")
 
     app.config.from_object("config.Config")
+    if app.config["TRUSTED_PROXIES"]:
+        # request.remote_addr - адрес клиента, а не прокси (ограничение попыток входа по IP)
+        trusted = app.config["TRUSTED_PROXIES"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted, x_proto=trusted, x_host=trusted)
     init_db(app)
+    init_json(app)
+    init_query_metrics(app)
     CORS(app)
 
     from routes.auth import auth_bp
     from routes.users import users_bp
     from routes.requests import requests_bp
     from routes.statistics import statistics_bp
+    from routes.comments import comments_bp
+    from routes.events import events_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(users_bp)
     app.register_blueprint(requests_bp)
     app.register_blueprint(statistics_bp)
+    app.register_blueprint(comments_bp)
+    app.register_blueprint(events_bp)
 
     @app.get("/qr/feedback")
     def qr_feedback():
@@ -37,6 +51,37 @@ def create_app():
         buf.seek(0)
         return send_file(buf, mimetype="image/png")
 
+    @app.get("/api/_db/pool")
+    @require_internal
+    def db_pool_metrics():
+        return get_pool_metrics()
+
+    @app.get("/api/_metrics")
+    @require_internal
+    def prometheus_metrics():
+        return Response(request_metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.get("/api/_auth/token-cache")
+    @require_internal
+    def token_cache_metrics():
+        from middleware.auth_middleware import token_cache
+
+        return token_cache.stats()
+
+    @app.get("/api/_users/cache")
+    @require_internal
+    def user_cache_metrics():
+        from services.user_service import user_cache
+
+        return user_cache.stats()
+
+    @app.get("/api/_events")
+    @require_internal
+    def event_bus_metrics():
+        from services.event_bus import event_bus
+
+        return event_bus.stats()
+
     @app.route("/")
     @app.route("/index.html")
     def index():
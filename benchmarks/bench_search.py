@@ -0,0 +1,103 @@
+# benchmarks/bench_search.py
+"""
+Бенчмарк полнотекстового поиска заявок (services.search_service).
+
+Сравнивает сканирование LIKE '%слово%' по трём полям с поиском через индекс:
+GIN по tsvector в PostgreSQL или инвертированный индекс в памяти для SQLite.
+Замеряется первая страница, страница глубоко в выдаче (по курсору) и,
+для индекса в памяти, его построение.
+
+    python -m benchmarks.bench_search --rows 1000000
+    python -m benchmarks.bench_search --database-url postgresql+psycopg2://.../bench --rows 1000000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.common import create_bench_app, seed
+
+QUERIES = ['компрессор', 'течёт вода', 'плата управления', 'daikin фильтр']
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(database_url, rows, repeat, limit, pages):
+    app = create_bench_app(database_url)
+
+    from sqlalchemy import or_
+    from database import db
+    from models.repair_request import RepairRequest
+    from services.search_service import SearchService, search_index, tokenize
+
+    with app.app_context():
+        started = time.perf_counter()
+        seed(specialists=50, clients=max(rows // 40, 10), requests=rows)
+        print(f"Наполнение {rows} заявок: {time.perf_counter() - started:.1f} с")
+
+        if SearchService.uses_database():
+            db.session.execute(db.text('ANALYZE repair_requests'))
+            print("Бэкенд: PostgreSQL tsvector + GIN")
+        else:
+            search_index.reset()
+            started = time.perf_counter()
+            search_index.ranked('')
+            print(f"Бэкенд: индекс в памяти, построение {time.perf_counter() - started:.1f} с, "
+                  f"{search_index.stats()['terms']} основ")
+
+        def like_page(text):
+            # Прежний вариант без индекса: каждое слово - LIKE по всем полям
+            query = RepairRequest.query
+            for word in text.split():
+                pattern = f'%{word}%'
+                query = query.filter(or_(
+                    RepairRequest.climate_tech_model.ilike(pattern),
+                    RepairRequest.problem_description.ilike(pattern),
+                    RepairRequest.repair_parts.ilike(pattern),
+                ))
+            return query.order_by(RepairRequest.request_id).limit(limit).all()
+
+        def deep_page(text):
+            position = None
+            for _ in range(pages):
+                page, has_more = SearchService.search_page(RepairRequest.query, text, position, limit)
+                if not has_more:
+                    break
+                row, rank = page[-1]
+                position = {'r': rank, 'id': row[0]}
+
+        print(f"\n{'запрос':<20}{'найдено':>9}{'LIKE, ms':>11}{'индекс, ms':>12}{f'стр. {pages}, ms':>14}")
+        for text in QUERIES:
+            found = len(search_index.match(text)) if not SearchService.uses_database() else \
+                RepairRequest.query.filter(SearchService.match_filter(text)).count()
+            like_time = measure(lambda: like_page(text), repeat)
+            index_time = measure(lambda: SearchService.search_page(RepairRequest.query, text, None, limit), repeat)
+            deep_time = measure(lambda: deep_page(text), repeat)
+            print(f"{text:<20}{found:>9}{like_time * 1000:>11.1f}{index_time * 1000:>12.1f}{deep_time * 1000:>14.1f}")
+
+        print(f"\nОсновы запросов: {[tokenize(text) for text in QUERIES]}")
+        print("LIKE не учитывает словоформы и не ранжирует - время приведено как точка отсчёта")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite://', help='БД для замеров (таблицы пересоздаются!)')
+    parser.add_argument('--rows', type=int, default=100000, help='заявок в таблице')
+    parser.add_argument('--repeat', type=int, default=5, help='повторов каждого замера (берётся медиана)')
+    parser.add_argument('--limit', type=int, default=20, help='размер страницы')
+    parser.add_argument('--pages', type=int, default=10, help='сколько страниц пролистать курсором')
+    args = parser.parse_args()
+    return run(args.database_url, args.rows, args.repeat, args.limit, args.pages)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
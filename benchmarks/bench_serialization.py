@@ -0,0 +1,105 @@
+# benchmarks/bench_serialization.py
+"""
+Микробенчмарк сериализации страницы заявок: загрузка строк + dict + JSON.
+
+Сравнивает прежний путь (объекты ORM, dict вручную, стандартный json)
+с ModelSerializer (объекты или кортежи колонок) и JSON-бэкендами std/orjson.
+
+    python -m benchmarks.bench_serialization --rows 10000 --repeat 7
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.common import create_bench_app, seed
+
+
+def legacy_request_to_json(r):
+    """Прежний _request_to_json из routes/requests.py - точка отсчёта"""
+    return {
+        'request_id': r.request_id,
+        'start_date': r.start_date.isoformat() if r.start_date else None,
+        'climate_tech_type': r.climate_tech_type,
+        'climate_tech_model': r.climate_tech_model,
+        'problem_description': r.problem_description,
+        'request_status': r.request_status,
+        'completion_date': r.completion_date.isoformat() if r.completion_date else None,
+        'repair_parts': r.repair_parts,
+        'master_id': r.master_id,
+        'client_id': r.client_id
+    }
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run(rows, repeat):
+    app = create_bench_app()
+
+    from flask.json.provider import DefaultJSONProvider
+    from database import db
+    from models.repair_request import RepairRequest
+    from services.serialization import OrjsonProvider, orjson, request_serializer
+
+    backends = {'std': DefaultJSONProvider(app)}
+    if orjson is not None:
+        backends['orjson'] = OrjsonProvider(app)
+    for provider in backends.values():
+        provider.ensure_ascii = False
+        provider.sort_keys = False
+
+    with app.app_context():
+        seed(specialists=20, clients=max(rows // 40, 10), requests=rows)
+        query = RepairRequest.query.order_by(RepairRequest.request_id).limit(rows)
+
+        def objects():
+            db.session.expunge_all()
+            return query.all()
+
+        def tuples():
+            return query.with_entities(*request_serializer.columns).all()
+
+        cases = [
+            ('ORM + dict вручную', 'std', lambda: [legacy_request_to_json(r) for r in objects()]),
+        ]
+        for name in backends:
+            cases += [
+                ('ORM + ModelSerializer', name, lambda: [request_serializer.from_object(r) for r in objects()]),
+                ('колонки + ModelSerializer', name, lambda: request_serializer.many(tuples())),
+            ]
+
+        baseline = None
+        print(f"{'путь':<28}{'json':>8}{'загрузка+dict, ms':>20}{'json, ms':>10}{'всего, ms':>11}{'x':>7}")
+        for title, backend, build in cases:
+            provider = backends[backend]
+            build_time = measure(build, repeat)
+            payload = {'data': build()}
+            dump_time = measure(lambda: provider.dumps(payload), repeat)
+            total = build_time + dump_time
+            baseline = baseline or total
+            print(f"{title:<28}{backend:>8}{build_time * 1000:>20.1f}{dump_time * 1000:>10.1f}"
+                  f"{total * 1000:>11.1f}{baseline / total:>7.2f}")
+
+        if orjson is None:
+            print("\norjson не установлен - сравнение только со стандартным json")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='строк на странице')
+    parser.add_argument('--repeat', type=int, default=7, help='повторов каждого замера (берётся медиана)')
+    args = parser.parse_args()
+    return run(args.rows, args.repeat)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# benchmarks/bench_specialist_workload.py
+"""
+Регрессионный бенчмарк StatisticsService.get_specialist_workload:
+число SQL-запросов не должно зависеть от количества специалистов.
+
+    python -m benchmarks.bench_specialist_workload
+"""
+
+import sys
+import time
+
+from benchmarks.common import create_bench_app, seed, count_statements
+
+SPECIALIST_COUNTS = [1, 10, 100, 500]
+
+
+def run():
+    from database import db
+    from services.statistics_service import StatisticsService
+
+    results = []
+    for specialists in SPECIALIST_COUNTS:
+        app = create_bench_app()
+        with app.app_context():
+            seed(specialists=specialists, clients=20, requests=specialists * 20)
+            db.session.expire_all()
+
+            with count_statements(db.engine) as statements:
+                started = time.perf_counter()
+                workload = StatisticsService.get_specialist_workload()
+                elapsed = time.perf_counter() - started
+
+            if isinstance(workload, dict):
+                print(f"Ошибка: {workload['error']}")
+                return 1
+            results.append((specialists, len(statements), elapsed))
+            print(f"specialists={specialists:>4}  statements={len(statements)}  time={elapsed * 1000:.1f} ms")
+
+            db.session.remove()
+            db.drop_all()
+
+    counts = {statements for _, statements, _ in results}
+    if len(counts) != 1:
+        print(f"FAIL: число запросов зависит от количества специалистов: {sorted(counts)}")
+        return 1
+    print(f"OK: {counts.pop()} запрос(ов) независимо от количества специалистов")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run())
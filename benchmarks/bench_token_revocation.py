@@ -0,0 +1,62 @@
+# benchmarks/bench_token_revocation.py
+"""
+Накладные расходы проверки отзыва токена на один запрос.
+
+Сравнивается проверка токена в middleware (с кэшем) без списка отзыва
+и с проверкой revocation_store.is_revoked при большом числе отозванных токенов.
+
+    python -m benchmarks.bench_token_revocation
+"""
+
+import sys
+import time
+import uuid
+
+from benchmarks.common import create_bench_app
+
+ITERATIONS = 100_000
+REVOKED_TOKENS = 100_000
+
+
+def run():
+    app = create_bench_app()
+
+    from middleware.auth_middleware import verify_token_cached
+    from services.auth_service import AuthService
+    from services.token_revocation_service import revocation_store
+    from models.user import User
+
+    with app.test_request_context():
+        user = User(user_id=1, login='bench', user_type='Менеджер')
+        token = AuthService.generate_token(user)
+        jti = AuthService.verify_token(token)[0]['jti']
+        exp = time.time() + 3600
+
+        # Заполняем список отзыва напрямую в памяти (как после синхронизации с таблицей)
+        revocation_store.sync()
+        revocation_store._revoked.update({uuid.uuid4().hex: exp for _ in range(REVOKED_TOKENS)})
+
+        started = time.perf_counter()
+        for _ in range(ITERATIONS):
+            revocation_store.is_revoked(jti)
+        check_time = (time.perf_counter() - started) / ITERATIONS
+
+        started = time.perf_counter()
+        for _ in range(ITERATIONS):
+            verify_token_cached(token)
+        verify_time = (time.perf_counter() - started) / ITERATIONS
+
+        started = time.perf_counter()
+        for _ in range(ITERATIONS // 10):
+            AuthService.verify_token(token)
+        decode_time = (time.perf_counter() - started) / (ITERATIONS // 10)
+
+    print(f"revoked tokens in memory:        {REVOKED_TOKENS}")
+    print(f"is_revoked():                    {check_time * 1e6:.2f} us/request")
+    print(f"verify_token_cached() (+revoke): {verify_time * 1e6:.2f} us/request")
+    print(f"AuthService.verify_token():      {decode_time * 1e6:.2f} us/request (без кэша, для сравнения)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run())
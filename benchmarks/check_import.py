@@ -0,0 +1,70 @@
+# benchmarks/check_import.py
+"""
+Регрессионная проверка массового импорта заявок (POST /api/requests/import).
+
+Ошибочная строка файла должна попасть в отчёт (errors), не прерывая импорт:
+корректные строки той же пачки вставляются, ответ - 200. Каждый случай -
+файл из одной плохой и одной корректной строки.
+
+    python -m benchmarks.check_import
+"""
+
+import json
+import sys
+
+from benchmarks.common import create_bench_app, seed
+
+# (описание, значения плохой строки поверх корректной)
+BAD_ROWS = [
+    ('client_id - список', {'client_id': [3]}),
+    ('client_id - объект', {'client_id': {'id': 3}}),
+    ('client_id - дробное', {'client_id': 3.5}),
+    ('master_id - логическое', {'master_id': True}),
+    ('start_date - список', {'start_date': ['2024-01-01']}),
+    ('модель - список', {'climate_tech_model': ['LG']}),
+    ('неизвестный статус', {'request_status': 'Потеряна'}),
+]
+
+
+def run():
+    app = create_bench_app()
+
+    from models.repair_request import RepairRequest
+    from models.user import User
+    from services.auth_service import AuthService
+
+    with app.app_context():
+        seed(specialists=1, clients=1, requests=0)
+        manager = User.query.filter_by(user_type='Менеджер').first()
+        client_id = User.query.filter_by(user_type='Заказчик').first().user_id
+        headers = {'Authorization': f'Bearer {AuthService.generate_token(manager)}'}
+
+    client = app.test_client()
+    failures = 0
+    for i, (title, bad) in enumerate(BAD_ROWS):
+        good = {
+            'external_id': f'check-{i}-good', 'climate_tech_type': 'Кондиционер',
+            'climate_tech_model': 'LG S09ET', 'problem_description': 'Не охлаждает', 'client_id': client_id,
+        }
+        rows = [dict(good, external_id=f'check-{i}-bad', **bad), good]
+        body = '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows).encode('utf-8')
+        response = client.post('/api/requests/import?format=jsonl', data=body, headers=headers)
+        report = response.get_json() or {}
+
+        with app.app_context():
+            inserted = RepairRequest.query.filter_by(external_id=good['external_id']).count()
+        ok = (response.status_code == 200 and report.get('inserted') == 1 and report.get('failed') == 1
+              and [error['line'] for error in report.get('errors', [])] == [1] and inserted == 1)
+        print(f"{'ok  ' if ok else 'FAIL'} {title}: HTTP {response.status_code} {report}")
+        failures += not ok
+
+    print()
+    if failures:
+        print(f"FAIL: {failures} из {len(BAD_ROWS)} случаев")
+        return 1
+    print(f"OK: плохая строка попадает в отчёт, корректная вставляется ({len(BAD_ROWS)} случаев)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run())
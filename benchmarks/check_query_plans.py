@@ -0,0 +1,126 @@
+# benchmarks/check_query_plans.py
+"""
+Регрессионная проверка планов запросов списка заявок.
+
+Наполняет БД, вызывает маршруты через тестовый клиент, перехватывает
+выполненные SQL-запросы и прогоняет каждый через EXPLAIN. Проверка падает,
+если в плане есть последовательное сканирование таблицы, в которой
+больше --threshold строк.
+
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --database-url postgresql+psycopg2://... --rows 200000
+"""
+
+import argparse
+import re
+import sys
+
+from benchmarks.common import create_bench_app, seed, count_statements
+
+# (описание, роль, URL) - запросы с фильтрами, которые обязаны идти по индексам
+ROUTE_CASES = [
+    ('список заявок заказчика', 'Заказчик', '/api/requests/?limit=20'),
+    ('список заказчика, keyset', 'Заказчик', '/api/requests/?cursor=&limit=20'),
+    ('фильтр по статусу', 'Менеджер', '/api/requests/?status=Ожидание комплектующих&limit=20'),
+    ('статус + keyset по дате', 'Менеджер',
+     '/api/requests/?status=Новая заявка&cursor=&order=start_date&limit=20'),
+    ('keyset после request_id', 'Менеджер', '/api/requests/?after={request_id}&limit=20'),
+    ('keyset по дате после request_id', 'Менеджер', '/api/requests/?after={request_id}&order=start_date&limit=20'),
+    ('поиск по ID', 'Менеджер', '/api/requests/?search={request_id}'),
+    ('одна заявка', 'Менеджер', '/api/requests/{request_id}'),
+]
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+def explain_sqlite(conn, statement, parameters):
+    plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    details = [row[-1] for row in plan]
+    scans = [match.group(1) for match in map(SQLITE_SCAN.match, details) if match]
+    return details, scans
+
+
+def explain_postgresql(conn, statement, parameters):
+    plan = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+    details, scans = [], []
+
+    def walk(node):
+        details.append(f"{node['Node Type']} {node.get('Relation Name', '')}".strip())
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(node['Relation Name'])
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return details, scans
+
+
+def run(database_url, rows, threshold):
+    app = create_bench_app(database_url)
+
+    from database import db
+    from models.user import User
+    from models.repair_request import RepairRequest
+    from services.auth_service import AuthService
+
+    with app.app_context():
+        seed(specialists=20, clients=max(rows // 40, 10), requests=rows)
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE')
+
+        tokens = {
+            user_type: AuthService.generate_token(User.query.filter_by(user_type=user_type).first())
+            for user_type in ('Менеджер', 'Заказчик')
+        }
+        request_id = db.session.query(RepairRequest.request_id).order_by(
+            RepairRequest.request_id.desc()).offset(rows // 2).limit(1).scalar()
+        table_rows = {
+            table.name: db.session.query(table).count()
+            for table in db.metadata.sorted_tables
+        }
+        dialect = db.engine.dialect.name
+        explain = explain_postgresql if dialect == 'postgresql' else explain_sqlite
+        engine = db.engine
+
+    client = app.test_client()
+    failures = 0
+
+    for title, role, url in ROUTE_CASES:
+        url = url.format(request_id=request_id)
+        with count_statements(engine, with_parameters=True) as statements:
+            response = client.get(url, headers={'Authorization': f'Bearer {tokens[role]}'})
+        if response.status_code != 200:
+            print(f"FAIL {title}: {url} -> HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+            failures += 1
+            continue
+
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                details, scans = explain(conn, statement, parameters)
+                bad = [table for table in scans if table_rows.get(table, 0) > threshold]
+                status = 'FAIL' if bad else 'ok  '
+                print(f"{status} {title}: {' | '.join(details)}")
+                if bad:
+                    failures += 1
+                    print(f"     последовательное сканирование {', '.join(bad)} ({url})")
+                    print(f"     {' '.join(statement.split())}")
+
+    print()
+    if failures:
+        print(f"FAIL: {failures} запрос(ов) со сканированием таблиц > {threshold} строк")
+        return 1
+    print(f"OK: сканирований таблиц > {threshold} строк нет ({dialect}, {rows} заявок)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite://', help='БД для проверки (будет пересоздана)')
+    parser.add_argument('--rows', type=int, default=20000, help='сколько заявок наполнить')
+    parser.add_argument('--threshold', type=int, default=1000, help='допустимый размер таблицы для полного сканирования')
+    args = parser.parse_args()
+    return run(args.database_url, args.rows, args.threshold)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
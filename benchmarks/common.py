@@ -0,0 +1,136 @@
+# benchmarks/common.py
+"""
+Общие утилиты бенчмарков: приложение на локальной БД, наполнение данными,
+подсчёт SQL-запросов.
+
+Запуск бенчмарков из корня проекта:
+    python -m benchmarks.bench_specialist_workload
+"""
+
+import os
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+STATUSES = ['Новая заявка', 'В процессе ремонта', 'Ожидание комплектующих', 'Готова к выдаче']
+SEED_BATCH_SIZE = 5000
+COMMENT_MESSAGES = ['Всё сделаем!', 'Починим в момент.', 'Ждём комплектующие', 'Заменён фильтр', 'Клиент уведомлён']
+PROBLEMS = [
+    'Не работает', 'Не включается после грозы', 'Шумит компрессор и вибрирует корпус',
+    'Течёт вода из внутреннего блока', 'Не охлаждает, дует тёплым воздухом', 'Ошибка E1 на дисплее',
+    'Пульт не реагирует на нажатия', 'Сильный запах гари при включении', 'Не набирает влажность',
+    'Периодически отключается, перегрев платы управления', 'Не греет воздух', 'Треснул корпус фильтра',
+]
+REPAIR_PARTS = [None, 'Компрессор', 'Плата управления', 'Датчик температуры', 'Фильтр', 'Вентилятор', 'Дренажный насос']
+EQUIPMENT = [
+    ('Кондиционер', ['TCL TAC-12CHSA', 'LG S09ET', 'Daikin FTXB25C', 'Panasonic CS-E9RKDW']),
+    ('Увлажнитель воздуха', ['Xiaomi Smart Humidifier 2', 'Boneco U201', 'Stadler Form Oskar']),
+    ('Сушилка для рук', ['Ballu BAHD-1250', 'Dyson Airblade V']),
+]
+
+
+def create_bench_app(database_url='sqlite://', reset=True):
+    """
+    Создать Flask-приложение на указанной БД (по умолчанию SQLite в памяти) и таблицы.
+    reset=True пересоздаёт таблицы - не направляйте бенчмарки на рабочую БД.
+    """
+    os.environ['DATABASE_URL'] = database_url
+
+    from app import create_app
+    from database import db
+    import models.user  # noqa: F401
+    import models.repair_request  # noqa: F401
+    import models.comment  # noqa: F401
+    import models.statistics_snapshot  # noqa: F401
+    import models.revoked_token  # noqa: F401
+
+    app = create_app()
+    with app.app_context():
+        if reset:
+            db.drop_all()
+        db.create_all()
+    return app
+
+
+def seed(specialists=3, clients=10, requests=100, comments=0, rnd=None):
+    """Наполнить БД тестовыми пользователями, заявками и комментариями (нужен app_context)"""
+    from sqlalchemy import insert, func
+    from database import db
+    from models.user import User
+    from models.repair_request import RepairRequest
+    from models.comment import Comment
+
+    rnd = rnd or random.Random(42)
+
+    users = [User(full_name='Менеджер', phone='89990000000', login='bench_manager',
+                  password='pass', user_type='Менеджер')]
+    users += [User(full_name=f'Специалист {i}', phone=f'8999{i:07d}', login=f'bench_spec{i}',
+                   password='pass', user_type='Специалист') for i in range(specialists)]
+    users += [User(full_name=f'Заказчик {i}', phone=f'8998{i:07d}', login=f'bench_client{i}',
+                   password='pass', user_type='Заказчик') for i in range(clients)]
+    db.session.add_all(users)
+    db.session.flush()
+
+    specialist_ids = [u.user_id for u in users if u.user_type == 'Специалист']
+    client_ids = [u.user_id for u in users if u.user_type == 'Заказчик']
+
+    start = date(2022, 1, 1)
+    rows = []
+    for _ in range(requests):
+        tech_type, models = rnd.choice(EQUIPMENT)
+        status = rnd.choice(STATUSES)
+        start_date = start + timedelta(days=rnd.randrange(0, 1000))
+        rows.append({
+            'start_date': start_date,
+            'climate_tech_type': tech_type,
+            'climate_tech_model': rnd.choice(models),
+            'problem_description': rnd.choice(PROBLEMS),
+            'request_status': status,
+            'completion_date': start_date + timedelta(days=rnd.randrange(1, 60)) if status == 'Готова к выдаче' else None,
+            'repair_parts': rnd.choice(REPAIR_PARTS) if status != 'Новая заявка' else None,
+            'master_id': rnd.choice(specialist_ids) if specialist_ids and status != 'Новая заявка' else None,
+            'client_id': rnd.choice(client_ids),
+        })
+        # Пачками через executemany, чтобы наполнение больших объёмов не упиралось в ORM
+        if len(rows) == SEED_BATCH_SIZE:
+            db.session.execute(insert(RepairRequest), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(RepairRequest), rows)
+
+    if comments and specialist_ids and requests:
+        first_id, last_id = db.session.query(
+            func.min(RepairRequest.request_id), func.max(RepairRequest.request_id)).one()
+        created = datetime(2022, 1, 1)
+        rows = []
+        for i in range(comments):
+            rows.append({
+                'message': rnd.choice(COMMENT_MESSAGES),
+                'master_id': rnd.choice(specialist_ids),
+                'request_id': rnd.randint(first_id, last_id),
+                'created_at': created + timedelta(minutes=i),
+            })
+            if len(rows) == SEED_BATCH_SIZE:
+                db.session.execute(insert(Comment), rows)
+                rows = []
+        if rows:
+            db.session.execute(insert(Comment), rows)
+
+    db.session.commit()
+
+
+@contextmanager
+def count_statements(engine, with_parameters=False):
+    """Собрать SQL-запросы, выполненные внутри блока with (с параметрами - парами)"""
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters) if with_parameters else statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
@@ -0,0 +1,284 @@
+# benchmarks/load_test.py
+"""
+Нагрузочный тест бэкенда - конкурентная версия сценариев test_windows.py.
+
+Поднимает приложение на локальной БД (SQLite-файл или локальный PostgreSQL),
+наполняет её заданными объёмами, затем несколько потоков параллельно гоняют
+вход, список заявок, создание/обновление заявок и статистику.
+По каждому эндпоинту выводятся пропускная способность, p50/p95/p99 и число
+SQL-запросов (из заголовка Server-Timing); результаты сохраняются в JSON
+для сравнения между коммитами.
+
+    python -m benchmarks.load_test --requests 50000 --concurrency 8 --duration 20
+    python -m benchmarks.load_test --output new.json --compare old.json
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from benchmarks.common import create_bench_app, seed
+
+SERVER_TIMING_STATEMENTS = re.compile(r'statements=(\d+)')
+
+# Сценарии и их доли в смеси запросов
+SCENARIOS = [
+    ('login', 5),
+    ('list_requests', 35),
+    ('list_requests_cursor', 15),
+    ('get_request', 10),
+    ('create_request', 10),
+    ('update_request', 10),
+    ('statistics', 15),
+]
+
+
+def start_server(app):
+    """Запустить приложение в многопоточном werkzeug-сервере на свободном порту"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def sql_statements(server_timing):
+    """Число SQL-запросов из заголовка Server-Timing (db;dur=..;desc="statements=N")"""
+    match = SERVER_TIMING_STATEMENTS.search(server_timing or '')
+    return int(match.group(1)) if match else 0
+
+
+class Worker(threading.Thread):
+    """Поток-клиент: держит keep-alive соединение и выполняет случайные сценарии"""
+
+    def __init__(self, port, fixtures, deadline, results, seed_value):
+        super().__init__(daemon=True)
+        self.port = port
+        self.fixtures = fixtures
+        self.deadline = deadline
+        self.results = results
+        self.rnd = random.Random(seed_value)
+        self.conn = None
+        self.token = None
+        self.created_ids = []
+
+    def call(self, scenario, method, path, body=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+            sql_count = sql_statements(response.getheader('Server-Timing'))
+        except (OSError, http.client.HTTPException):
+            self.conn = None
+            data, status, sql_count = b'', 0, 0
+        elapsed = time.perf_counter() - started
+
+        self.results.append((scenario, elapsed, status, sql_count))
+        return status, data
+
+    def login(self):
+        user = self.rnd.choice(self.fixtures['logins'])
+        status, data = self.call('login', 'POST', '/api/auth/login', {'login': user, 'password': 'pass'})
+        if status == 200:
+            self.token = json.loads(data)['access_token']
+
+    def run(self):
+        self.login()
+        names, weights = zip(*SCENARIOS)
+        while time.monotonic() < self.deadline:
+            scenario = self.rnd.choices(names, weights)[0]
+            if scenario == 'login' or not self.token:
+                self.login()
+            elif scenario == 'list_requests':
+                page = self.rnd.randint(1, self.fixtures['pages'])
+                self.call(scenario, 'GET', f'/api/requests/?page={page}&limit=20', token=self.token)
+            elif scenario == 'list_requests_cursor':
+                after = self.rnd.randint(0, self.fixtures['max_request_id'])
+                self.call(scenario, 'GET', f'/api/requests/?after={after}&limit=20', token=self.token)
+            elif scenario == 'get_request':
+                request_id = self.rnd.randint(1, self.fixtures['max_request_id'])
+                self.call(scenario, 'GET', f'/api/requests/{request_id}', token=self.token)
+            elif scenario == 'create_request':
+                status, data = self.call(scenario, 'POST', '/api/requests/', {
+                    'climate_tech_type': 'Кондиционер',
+                    'climate_tech_model': 'LG S09ET',
+                    'problem_description': 'Нагрузочный тест',
+                    'client_id': self.rnd.choice(self.fixtures['client_ids']),
+                }, token=self.token)
+                if status == 201:
+                    self.created_ids.append(json.loads(data)['request_id'])
+            elif scenario == 'update_request':
+                request_id = (self.rnd.choice(self.created_ids) if self.created_ids
+                              else self.rnd.randint(1, self.fixtures['max_request_id']))
+                self.call(scenario, 'PUT', f'/api/requests/{request_id}', {
+                    'request_status': 'В процессе ремонта',
+                    'master_id': self.rnd.choice(self.fixtures['specialist_ids']),
+                }, token=self.token)
+            elif scenario == 'statistics':
+                self.call(scenario, 'GET', '/api/statistics/', token=self.token)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(results, duration):
+    by_scenario = defaultdict(list)
+    for scenario, elapsed, status, sql_count in results:
+        by_scenario[scenario].append((elapsed, status, sql_count))
+
+    summary = {}
+    for scenario, rows in sorted(by_scenario.items()):
+        latencies = sorted(elapsed for elapsed, _, _ in rows)
+        errors = sum(1 for _, status, _ in rows if status == 0 or status >= 500)
+        summary[scenario] = {
+            'requests': len(rows),
+            'errors': errors,
+            'throughput_rps': round(len(rows) / duration, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'sql_statements_avg': round(sum(sql for _, _, sql in rows) / len(rows), 2),
+            'sql_statements_max': max(sql for _, _, sql in rows),
+        }
+    return summary
+
+
+def print_summary(summary, baseline=None):
+    header = f"{'endpoint':<22}{'req':>7}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'sql avg':>9}"
+    print(header)
+    print('-' * len(header))
+    for scenario, row in summary.items():
+        line = (f"{scenario:<22}{row['requests']:>7}{row['errors']:>5}{row['throughput_rps']:>9}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['sql_statements_avg']:>9}")
+        old = (baseline or {}).get(scenario)
+        if old and old['p95_ms']:
+            line += f"   p95 {(row['p95_ms'] / old['p95_ms'] - 1) * 100:+.0f}%"
+            line += f", sql {row['sql_statements_avg'] - old['sql_statements_avg']:+.2f}"
+        print(line)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    # Бенчмарк не должен упираться в защиту от подбора паролей
+    os.environ.setdefault('LOGIN_RATE_IP_CAPACITY', '1000000')
+    os.environ.setdefault('LOGIN_RATE_LOGIN_CAPACITY', '1000000')
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load_test.db')
+    app = create_bench_app(database_url)
+
+    from database import db
+    from models.user import User
+    from models.repair_request import RepairRequest
+    from sqlalchemy import func
+
+    print(f"Наполнение БД: {args.users} заказчиков, {args.requests} заявок, {args.comments} комментариев...")
+    with app.app_context():
+        seed(specialists=args.specialists, clients=args.users, requests=args.requests, comments=args.comments)
+        fixtures = {
+            'logins': [login for (login,) in db.session.query(User.login).filter(
+                User.user_type.in_(['Менеджер', 'Специалист'])).all()],
+            'client_ids': [user_id for (user_id,) in db.session.query(User.user_id).filter_by(
+                user_type='Заказчик').limit(1000).all()],
+            'specialist_ids': [user_id for (user_id,) in db.session.query(User.user_id).filter_by(
+                user_type='Специалист').all()],
+            'max_request_id': db.session.query(func.max(RepairRequest.request_id)).scalar() or 1,
+        }
+        fixtures['pages'] = max(1, min(args.requests // 20, 500))
+
+    server = start_server(app)
+    print(f"Сервер: http://127.0.0.1:{server.server_port}, {args.concurrency} потоков, {args.duration} с")
+
+    results = []
+    deadline = time.monotonic() + args.duration
+    workers = [Worker(server.server_port, fixtures, deadline, results, seed_value=i)
+               for i in range(args.concurrency)]
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    duration = time.monotonic() - started
+    server.shutdown()
+
+    summary = summarize(results, duration)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['endpoints']
+    print()
+    print_summary(summary, baseline)
+    print(f"\nВсего: {len(results)} запросов за {duration:.1f} с ({len(results) / duration:.1f} rps)")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+            'volumes': {
+                'specialists': args.specialists,
+                'users': args.users,
+                'requests': args.requests,
+                'comments': args.comments,
+            },
+            'concurrency': args.concurrency,
+            'duration_s': round(duration, 2),
+        },
+        'endpoints': summary,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.output}")
+
+    return 1 if any(row['errors'] for row in summary.values()) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='БД для теста (будет пересоздана), по умолчанию временный SQLite-файл')
+    parser.add_argument('--specialists', type=int, default=20)
+    parser.add_argument('--users', type=int, default=1000, help='число заказчиков')
+    parser.add_argument('--requests', type=int, default=20000, help='число заявок')
+    parser.add_argument('--comments', type=int, default=20000, help='число комментариев')
+    parser.add_argument('--concurrency', type=int, default=8, help='число параллельных клиентов')
+    parser.add_argument('--duration', type=float, default=15, help='длительность нагрузки, с')
+    parser.add_argument('--output', help='куда сохранить результаты (JSON)')
+    parser.add_argument('--compare', help='JSON предыдущего прогона для сравнения')
+    return run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
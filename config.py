@@ -11,11 +11,71 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Пул соединений (один engine на процесс, см. database.init_db)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
     JSON_AS_ASCII = False
     JSON_SORT_KEYS = False
+    # Сериализация ответов: auto (orjson, если установлен) | orjson | std
+    JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
 
     SECRET_KEY = os.getenv("SECRET_KEY", "1")
 
+    # Стоимость хеша паролей (PBKDF2-SHA256): подбирается под железо, см. flask auth hash-cost
+    PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+
+    # Ограничение попыток входа (token bucket): ёмкость и пополнение в секунду
+    LOGIN_RATE_IP_CAPACITY = int(os.getenv("LOGIN_RATE_IP_CAPACITY", "20"))
+    LOGIN_RATE_IP_REFILL = float(os.getenv("LOGIN_RATE_IP_REFILL", "0.5"))
+    LOGIN_RATE_LOGIN_CAPACITY = int(os.getenv("LOGIN_RATE_LOGIN_CAPACITY", "5"))
+    LOGIN_RATE_LOGIN_REFILL = float(os.getenv("LOGIN_RATE_LOGIN_REFILL", "0.1"))
+    # Токен для служебных /api/_... (сбор метрик Prometheus): Authorization: Bearer <токен>.
+    # Пусто - только JWT Менеджера
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    # Сколько обратных прокси (nginx) перед приложением: IP клиента берётся из X-Forwarded-For
+    TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+
+    # Порог времени в БД на запрос, после которого запрос пишется в лог как медленный
+    SLOW_DB_TIME_MS = int(os.getenv("SLOW_DB_TIME_MS", "200"))
+
+    # Кэш проверенных JWT (middleware.auth_middleware)
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+    TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+    # Кэш пользователей и списка специалистов (services.user_service):
+    # размер и TTL в памяти процесса, общее хранилище - none | memory (локальная замена Redis)
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+    USER_CACHE_STORE = os.getenv("USER_CACHE_STORE", "none")
+
+    # Отзыв токенов: как часто подтягивать отзывы других воркеров и чистить истёкшие (сек)
+    REVOCATION_SYNC_INTERVAL = int(os.getenv("REVOCATION_SYNC_INTERVAL", "5"))
+    REVOCATION_COMPACT_INTERVAL = int(os.getenv("REVOCATION_COMPACT_INTERVAL", "600"))
+
+    # Дельта-синхронизация заявок: сколько дней хранить следы удалений
+    # (клиент с более старой версией перезагружает список целиком)
+    TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+    # Массовый импорт заявок: строк в одном INSERT/транзакции
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+    # Выгрузка для отчётности (python -m services.analytics_export_service): заявок в пачке чтения
+    ANALYTICS_EXPORT_CHUNK = int(os.getenv("ANALYTICS_EXPORT_CHUNK", "50000"))
+
+    # SSE-уведомления об изменении заявок (services.event_bus):
+    # memory - только внутри процесса, broker - между воркерами через flask events broker
+    EVENT_BACKEND = os.getenv("EVENT_BACKEND", "memory")
+    EVENT_BROKER_ADDRESS = os.getenv("EVENT_BROKER_ADDRESS", "127.0.0.1:5055")
+    # Очередь на одного SSE-клиента (переполнение - клиент отключается) и интервал keep-alive, сек
+    SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+    SSE_HEARTBEAT_INTERVAL = int(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+    # Срок одноразового билета на поток событий (POST /api/events/ticket), секунд
+    SSE_TICKET_TTL = int(os.getenv("SSE_TICKET_TTL", "30"))
+
     FEEDBACK_FORM_URL = os.getenv(
         "FEEDBACK_FORM_URL",
         "https://docs.google.com/forms/d/e/1FAIpQLSdhZcExx6LSIXxk0ub55mSu-WIh23WYdGG9HY5EZhLDo7P8eA/viewform?usp=sf_link",
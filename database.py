@@ -1,19 +1,140 @@
+import threading
+import time
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 db = SQLAlchemy()
 
+# Фабрика сессий для get_db; engine общий с db (один пул на процесс)
+SessionFactory = sessionmaker()
+
+
+class PoolWaitStats:
+    """Статистика ожидания соединения из пула"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'wait_seconds_total': round(self.total_wait, 6),
+                'wait_seconds_avg': round(self.total_wait / self.checkouts, 6) if self.checkouts else 0.0,
+                'wait_seconds_max': round(self.max_wait, 6),
+            }
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool, замеряющий время получения соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait_stats.record(time.perf_counter() - started)
+
+
+def build_engine_options(config):
+    """Параметры engine из config.Config (pool_size/overflow/recycle/pre-ping)"""
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+    # У SQLite свой пул (StaticPool / SingletonThreadPool) без размера и overflow
+    if not config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        options.setdefault('poolclass', MonitoredQueuePool)
+        options.setdefault('pool_size', config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    return options
+
+
 def init_db(app):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config)
     db.init_app(app)
+    app.teardown_appcontext(close_db)
     with app.app_context():
         db.create_all()
 
+
+def add_to_counters(model, key_fields, rows):
+    """
+    Прибавить значения к строкам-счётчикам model (без commit).
+    rows - [{ключевые поля..., колонка: прибавка, ...}, ...], у всех строк одни и те же колонки.
+
+    PostgreSQL и SQLite: один INSERT ... ON CONFLICT (ключ) DO UPDATE SET
+    колонка = колонка + excluded.колонка - параллельное создание одного ключа
+    не падает на первичном ключе. Строки идут в порядке ключа, чтобы параллельные
+    транзакции блокировали их в одном порядке. Другие СУБД: UPDATE, затем INSERT.
+    """
+    if not rows:
+        return
+    rows = sorted(rows, key=lambda row: tuple(row[field] for field in key_fields))
+    columns = [name for name in rows[0] if name not in key_fields]
+    table = model.__table__
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = (postgresql if dialect == 'postgresql' else sqlite).insert(table).values(rows)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=list(key_fields),
+            set_={name: table.c[name] + insert.excluded[name] for name in columns}
+        ))
+        return
+
+    for row in rows:
+        updated = db.session.execute(
+            table.update()
+            .where(*(table.c[field] == row[field] for field in key_fields))
+            .values({name: table.c[name] + row[name] for name in columns})
+        ).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(row))
+
+
 def get_db():
     from flask import g
     if 'db' not in g:
-        from config import Config
-        from sqlalchemy import create_engine
-        engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
-        Session = sessionmaker(bind=engine)
-        g.db = Session()
-    return g.db
\ No newline at end of file
+        g.db = SessionFactory(bind=db.engine)
+    return g.db
+
+
+def close_db(exception=None):
+    """Вернуть соединение сессии get_db в пул по завершении запроса"""
+    from flask import g
+    session = g.pop('db', None)
+    if session is not None:
+        if exception is not None:
+            session.rollback()
+        session.close()
+
+
+def get_pool_metrics():
+    """Состояние пула соединений для мониторинга"""
+    pool = db.engine.pool
+    metrics = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+    metrics.update(pool_wait_stats.to_dict())
+    return metrics
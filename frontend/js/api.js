@@ -44,29 +44,49 @@ function getAuthToken() {
 }
 
 // ---------- fetch wrapper ----------
+// GET-ответы с ETag: url -> { etag, body }. При 304 тело берётся отсюда.
+const etagCache = new Map();
+
 async function apiFetch(path, options = {}) {
   const base = API_BASE || "";
   const url = base.replace(/\/+$/, "") + "/" + path.replace(/^\/+/, "");
   const token = getAuthToken();
+  const isGet = (options.method || "GET").toUpperCase() === "GET";
+  const cached = isGet ? etagCache.get(url) : null;
 
   const headers = {
     "Content-Type": "application/json",
     ...(options.headers || {}),
   };
   if (token) headers["Authorization"] = `Bearer ${token}`; // важно
+  if (cached) headers["If-None-Match"] = cached.etag;
 
   const res = await fetch(url, {
     ...options,
     headers,
   });
 
+  // Данные не изменились - сервер не строил ответ, отдаём сохранённый
+  // (парсим заново, чтобы вызывающий код не портил кэш мутациями)
+  if (res.status === 304 && cached) return JSON.parse(cached.body);
+
+  let body = "";
+  try {
+    body = await res.text();
+  } catch {
+    body = "";
+  }
+
   let data = null;
   try {
-    data = await res.json();
+    data = JSON.parse(body);
   } catch {
     data = null;
   }
 
+  const etag = res.headers.get("ETag");
+  if (isGet && res.ok && etag && data !== null) etagCache.set(url, { etag, body });
+
   if (!res.ok) {
     const err = (data && data.error) || `HTTP_${res.status}`;
     throw new Error(err);
@@ -93,6 +113,11 @@ async function apiLogin(login, password) {
   return user;
 }
 
+async function apiLogout() {
+  // Отзываем токен на сервере; ошибки не мешают локальному выходу
+  return apiFetch("/api/auth/logout", { method: "POST" });
+}
+
 // ---------- USERS ----------
 async function apiFetchSpecialists() {
   const res = await apiFetch("/api/users/specialists", { method: "GET" });
@@ -7,6 +7,8 @@ const state = {
   activeTab: "requests",
   selectedRequestId: null,
   specialists: [],
+  // версия для /api/requests/changes (null - список ещё не загружен целиком)
+  syncVersion: null,
 };
 
 // ======= фильтры =======
@@ -79,6 +81,10 @@ function clearDomForLogout() {
 }
 
 function logout() {
+  // Отзываем токен на сервере (пока он ещё есть в хранилище)
+  if (state.user) apiLogout().catch(console.error);
+  disconnectEvents();
+
   // Сначала чистим DOM
   clearDomForLogout();
   resetFilters();
@@ -90,6 +96,7 @@ function logout() {
   state.specialists = [];
   state.activeTab = "requests";
   state.selectedRequestId = null;
+  state.syncVersion = null;
   clearAuthStorage();
 
   renderAll(state);
@@ -103,11 +110,24 @@ async function loginAndInit(login, password) {
   setUser(user);
   await loadSpecialists();
   await refreshRequests();
+  connectEvents();
 }
 
 async function apiFetchRequestsWrapped() {
-  const resp = await apiFetch("/api/requests/"); // защищённая ручка
-  return resp.data || [];
+  // Все видимые заявки keyset-страницами (защищённая ручка)
+  const all = [];
+  let cursor = "";
+  do {
+    const resp = await apiFetch(`/api/requests/?cursor=${encodeURIComponent(cursor)}&limit=100`);
+    all.push(...(resp.data || []));
+    cursor = resp.pagination?.next_cursor || "";
+  } while (cursor);
+  return all;
+}
+
+async function apiFetchRequestChanges(since) {
+  const query = since ? `?since=${encodeURIComponent(since)}` : "";
+  return apiFetch(`/api/requests/changes${query}`);
 }
 
 async function apiCreateRequest(payload) {
@@ -173,27 +193,69 @@ async function loadSpecialists() {
   }
 }
 
+function mapRequestFromBackend(r) {
+  return {
+    id: r.request_id,
+    created_at: r.start_date,
+    equipment_type: r.climate_tech_type,
+    model: r.climate_tech_model,
+    problem: r.problem_description,
+    customer_name: "",
+    phone: "",
+    status: mapStatusFromBackend(r.request_status),
+    assignee_id: r.master_id ? String(r.master_id) : "",
+    assignee: "",
+    deadline: null,
+    completed_at: r.completion_date,
+    fault_type: r.repair_parts || "",
+    comments: [],
+  };
+}
+
+// Влить изменения в state.requests на месте (локальные комментарии сохраняются)
+function mergeRequestChanges(changed, deleted) {
+  const byId = new Map(state.requests.map((r) => [r.id, r]));
+  for (const raw of changed) {
+    const next = mapRequestFromBackend(raw);
+    const prev = byId.get(next.id);
+    if (prev) {
+      Object.assign(prev, next, { comments: prev.comments });
+      normalizeAssigneeForRequest(prev);
+    } else {
+      normalizeAssigneeForRequest(next);
+      state.requests.push(next);
+      byId.set(next.id, next);
+    }
+  }
+  if (deleted.length) {
+    const gone = new Set(deleted);
+    state.requests = state.requests.filter((r) => !gone.has(r.id));
+  }
+}
+
+async function reloadAllRequests() {
+  // Версию берём до загрузки: изменения во время загрузки придут следующей дельтой
+  const { version } = await apiFetchRequestChanges(null);
+  const raw = await apiFetchRequestsWrapped();
+  state.requests = raw.map(mapRequestFromBackend);
+  for (const r of state.requests) normalizeAssigneeForRequest(r);
+  state.syncVersion = version;
+}
+
 async function refreshRequests() {
   if (!state.user) return;
   try {
-    const raw = await apiFetchRequestsWrapped();
-    state.requests = raw.map((r) => ({
-      id: r.request_id,
-      created_at: r.start_date,
-      equipment_type: r.climate_tech_type,
-      model: r.climate_tech_model,
-      problem: r.problem_description,
-      customer_name: "",
-      phone: "",
-      status: mapStatusFromBackend(r.request_status),
-      assignee_id: r.master_id ? String(r.master_id) : "",
-      assignee: "",
-      deadline: null,
-      completed_at: r.completion_date,
-      fault_type: r.repair_parts || "",
-      comments: [],
-    }));
-    for (const r of state.requests) normalizeAssigneeForRequest(r);
+    if (state.syncVersion) {
+      const delta = await apiFetchRequestChanges(state.syncVersion);
+      if (delta.reset) {
+        await reloadAllRequests();
+      } else {
+        mergeRequestChanges(delta.changed || [], delta.deleted || []);
+        state.syncVersion = delta.version;
+      }
+    } else {
+      await reloadAllRequests();
+    }
     renderAll(state);
   } catch (e) {
     console.error(e);
@@ -201,6 +263,69 @@ async function refreshRequests() {
   }
 }
 
+// ======= push-уведомления об изменениях заявок (SSE) =======
+
+let eventSource = null;
+let pushRefreshTimer = null;
+let eventsReconnectTimer = null;
+// Номер попытки подключения: отменяет подключение, начатое до disconnectEvents
+let eventsAttempt = 0;
+
+function schedulePushRefresh() {
+  // Пачку событий подряд превращаем в один запрос дельты
+  clearTimeout(pushRefreshTimer);
+  pushRefreshTimer = setTimeout(() => refreshRequests(), 300);
+}
+
+async function connectEvents(afterGap = false) {
+  disconnectEvents();
+  if (!getAuthToken() || typeof EventSource === "undefined") return;
+  const attempt = eventsAttempt;
+
+  // Токен в URL попал бы в логи прокси - поток открывается по одноразовому билету
+  let ticket;
+  try {
+    ({ ticket } = await apiFetch("/api/events/ticket", { method: "POST" }));
+  } catch (e) {
+    console.error(e);
+    if (attempt === eventsAttempt) scheduleEventsReconnect();
+    return;
+  }
+  if (attempt !== eventsAttempt) return;
+
+  const source = new EventSource(`/api/events/?ticket=${encodeURIComponent(ticket)}`);
+  eventSource = source;
+  source.addEventListener("request", schedulePushRefresh);
+  // Сервер отключил нас за медленное чтение - догоняем дельтой
+  source.addEventListener("resync", schedulePushRefresh);
+  // После переподключения могли пропустить события
+  source.addEventListener("open", () => {
+    if (afterGap) schedulePushRefresh();
+  });
+  // Токен отозван или истёк - не переподключаемся
+  source.addEventListener("unauthorized", () => disconnectEvents());
+  // Билет одноразовый: встроенный повтор EventSource с тем же URL не пройдёт, берём новый
+  source.addEventListener("error", () => {
+    if (eventSource !== source) return;
+    source.close();
+    eventSource = null;
+    scheduleEventsReconnect();
+  });
+}
+
+function scheduleEventsReconnect() {
+  clearTimeout(eventsReconnectTimer);
+  eventsReconnectTimer = setTimeout(() => connectEvents(true), 5000);
+}
+
+function disconnectEvents() {
+  eventsAttempt += 1;
+  clearTimeout(pushRefreshTimer);
+  clearTimeout(eventsReconnectTimer);
+  if (eventSource) eventSource.close();
+  eventSource = null;
+}
+
 // ======= маппинг статусов =======
 
 function mapStatusFromBackend(s) {
@@ -435,6 +560,7 @@ function initApp() {
     state.specialists = [];
     state.activeTab = "requests";
     state.selectedRequestId = null;
+    state.syncVersion = null;
 
     const login = $("#loginUser").value.trim();
     const password = $("#loginPass").value.trim();
@@ -494,6 +620,7 @@ function initApp() {
   if (state.user) {
     loadSpecialists()
       .then(() => refreshRequests())
+      .then(() => connectEvents())
       .catch(console.error);
   }
 
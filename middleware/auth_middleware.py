@@ -1,8 +1,63 @@
 # middleware/auth_middleware.py
 
+import hashlib
+import hmac
 from functools import wraps
 from flask import request, jsonify
+from config import Config
 from services.auth_service import AuthService
+from services.cache import LRUCache
+from services.token_revocation_service import revocation_store
+
+# Кэш проверенных токенов: sha256(токен) -> payload.
+# Запись живёт не дольше TOKEN_CACHE_TTL и не дольше exp самого токена.
+token_cache = LRUCache(maxsize=Config.TOKEN_CACHE_SIZE, ttl=Config.TOKEN_CACHE_TTL)
+
+
+def verify_token_cached(token):
+    """
+    Проверить JWT с кэшированием результата.
+    Возвращает (payload, None) или (None, текст ошибки), как AuthService.verify_token.
+    """
+    key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    payload = token_cache.get(key)
+    if payload is None:
+        payload, error = AuthService.verify_token(token)
+        if error:
+            return None, error
+        token_cache.set(key, payload, expires_at=payload.get('exp'))
+
+    # Отзыв проверяется и для закэшированных токенов (O(1), без запроса к БД)
+    if revocation_store.is_revoked(payload.get('jti')):
+        token_cache.invalidate(key)
+        return None, 'Token revoked'
+
+    # Копия, чтобы обработчики не портили закэшированный payload
+    return dict(payload), None
+
+
+def authenticate_request():
+    """
+    Разобрать заголовок Authorization и проверить токен.
+    Возвращает (payload, None) или (None, (ответ, код)).
+    """
+    auth_header = request.headers.get('Authorization')
+
+    if not auth_header:
+        return None, (jsonify({'error': 'Missing Authorization header'}), 401)
+
+    if not auth_header.startswith('Bearer '):
+        return None, (jsonify({'error': 'Invalid Authorization header format'}), 401)
+
+    token = auth_header.split(' ')[1]
+
+    payload, error = verify_token_cached(token)
+    if error:
+        return None, (jsonify({'error': error}), 401)
+
+    return payload, None
+
 
 def require_auth(f):
     """
@@ -15,22 +70,9 @@ def require_auth(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Получение токена из header
-        auth_header = request.headers.get('Authorization')
-
-        if not auth_header:
-            return jsonify({'error': 'Missing Authorization header'}), 401
-
-        if not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Invalid Authorization header format'}), 401
-
-        token = auth_header.split(' ')[1]
-
-        # Проверка токена
-        payload, error = AuthService.verify_token(token)
-
-        if error:
-            return jsonify({'error': error}), 401
+        payload, error_response = authenticate_request()
+        if error_response:
+            return error_response
 
         # Передача данных пользователя в функцию
         kwargs['current_user'] = payload
@@ -51,19 +93,9 @@ def require_role(*allowed_roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Получение токена
-            auth_header = request.headers.get('Authorization')
-
-            if not auth_header or not auth_header.startswith('Bearer '):
-                return jsonify({'error': 'Missing or invalid Authorization header'}), 401
-
-            token = auth_header.split(' ')[1]
-
-            # Проверка токена
-            payload, error = AuthService.verify_token(token)
-
-            if error:
-                return jsonify({'error': error}), 401
+            payload, error_response = authenticate_request()
+            if error_response:
+                return error_response
 
             # Проверка роли
             user_type = payload.get('user_type')
@@ -82,3 +114,32 @@ def require_role(*allowed_roles):
         return decorated_function
 
     return decorator
+
+
+def require_internal(f):
+    """
+    Декоратор служебных маршрутов /api/_... (пул, кэши, метрики): только Менеджер
+    или, если задан METRICS_TOKEN, "Authorization: Bearer <METRICS_TOKEN>"
+    (сбор метрик Prometheus без JWT пользователя)
+
+    Использование:
+    @require_internal
+    def pool_metrics():
+        ...
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        metrics_token = Config.METRICS_TOKEN
+        auth_header = request.headers.get('Authorization', '')
+        if metrics_token and hmac.compare_digest(auth_header.encode('utf-8'),
+                                                 f'Bearer {metrics_token}'.encode('utf-8')):
+            return f(*args, **kwargs)
+
+        payload, error_response = authenticate_request()
+        if error_response:
+            return error_response
+        if payload.get('user_type') != 'Менеджер':
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        return f(*args, **kwargs)
+
+    return decorated_function
@@ -0,0 +1,60 @@
+# middleware/conditional_get.py
+
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from services.table_version_service import TableVersionService
+
+
+def conditional_get(*tables, when=None):
+    """
+    Декоратор условного GET: слабый ETag из версий таблиц, URL и пользователя.
+    Если клиент прислал тот же ETag в If-None-Match - 304 без выполнения маршрута.
+    when() -> False - ответ зависит не только от URL и таблиц (например, от текущей даты):
+    маршрут выполняется как обычно, без ETag.
+
+    Использование (после @require_auth, чтобы учесть роль и заказчика):
+    @require_auth
+    @conditional_get('repair_requests')
+    def get_all_requests(current_user):
+        ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if when is not None and not when():
+                return f(*args, **kwargs)
+            try:
+                etag = _make_etag(tables, kwargs.get('current_user'))
+            except Exception as e:
+                # Без версий просто отдаём полный ответ
+                current_app.logger.warning("ETag versions unavailable: %s", e)
+                return f(*args, **kwargs)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            # Браузер обязан перепроверять ответ, но может хранить его у себя
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        return decorated_function
+
+    return decorator
+
+
+def _make_etag(tables, current_user):
+    versions = '.'.join(str(version) for version in TableVersionService.get(*tables))
+    # Ответ зависит от параметров запроса и от того, кто спрашивает
+    scope = request.full_path
+    if current_user:
+        scope += f"|{current_user.get('user_type')}|{current_user.get('user_id')}"
+    digest = hashlib.sha1(scope.encode('utf-8')).hexdigest()[:16]
+    return f'{versions}-{digest}'
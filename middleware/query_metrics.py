@@ -0,0 +1,189 @@
+# middleware/query_metrics.py
+
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+from database import db, get_pool_metrics
+
+# Границы корзин гистограммы длительности запросов, секунды
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestMetrics:
+    """Накопленные метрики HTTP-запросов и SQL по эндпоинтам (для /api/_metrics)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.duration_sum = defaultdict(float)
+        self.duration_buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self.statements = defaultdict(int)
+        self.db_time = defaultdict(float)
+        self.slow_requests = defaultdict(int)
+
+    def record(self, endpoint, method, status, duration, statements, db_time, slow):
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            self.duration_sum[endpoint] += duration
+            buckets = self.duration_buckets[endpoint]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[i] += 1
+            self.statements[endpoint] += statements
+            self.db_time[endpoint] += db_time
+            if slow:
+                self.slow_requests[endpoint] += 1
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus"""
+        lines = []
+        with self._lock:
+            lines += [
+                '# HELP http_requests_total HTTP requests by endpoint, method and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (endpoint, method, status), value in sorted(self.requests.items()):
+                lines.append(
+                    f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {value}'
+                )
+
+            lines += [
+                '# HELP http_request_duration_seconds HTTP request duration.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for endpoint, buckets in sorted(self.duration_buckets.items()):
+                count = sum(value for (name, _, _), value in self.requests.items() if name == endpoint)
+                for bound, value in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {value}')
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {count}')
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self.duration_sum[endpoint]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {count}')
+
+            for name, help_text, values, fmt in (
+                ('db_statements_total', 'SQL statements executed while serving requests.', self.statements, '{}'),
+                ('db_time_seconds_total', 'Time spent in SQL statements while serving requests.', self.db_time, '{:.6f}'),
+                ('db_slow_requests_total', 'Requests whose DB time exceeded SLOW_DB_TIME_MS.', self.slow_requests, '{}'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {fmt.format(value)}')
+
+        pool = get_pool_metrics()
+        lines += ['# HELP db_pool_checked_out Connections currently checked out of the pool.',
+                  '# TYPE db_pool_checked_out gauge',
+                  f"db_pool_checked_out {pool.get('checked_out', 0)}",
+                  '# HELP db_pool_overflow Connections above pool_size.',
+                  '# TYPE db_pool_overflow gauge',
+                  f"db_pool_overflow {pool.get('overflow', 0)}",
+                  '# HELP db_pool_wait_seconds_total Time spent waiting for a pooled connection.',
+                  '# TYPE db_pool_wait_seconds_total counter',
+                  f"db_pool_wait_seconds_total {pool['wait_seconds_total']}"]
+
+        from middleware.auth_middleware import token_cache
+        cache = token_cache.stats()
+        lines += ['# HELP token_cache_hits_total Verified-token cache hits.',
+                  '# TYPE token_cache_hits_total counter',
+                  f"token_cache_hits_total {cache['hits']}",
+                  '# HELP token_cache_misses_total Verified-token cache misses.',
+                  '# TYPE token_cache_misses_total counter',
+                  f"token_cache_misses_total {cache['misses']}"]
+
+        from services.user_service import user_cache
+        cache = user_cache.stats()
+        for name, help_text, value in (
+            ('user_cache_hits_total', 'User cache hits in process memory.', cache['hits']),
+            ('user_cache_misses_total', 'User cache misses in process memory.', cache['misses']),
+            ('user_cache_store_hits_total', 'User cache hits in the shared store.', cache['store_hits']),
+            ('user_cache_store_misses_total', 'User cache misses in the shared store.', cache['store_misses']),
+            ('user_cache_loads_total', 'User cache loads from the database.', cache['loads']),
+            ('user_cache_invalidations_total', 'User cache invalidations after writes.', cache['invalidations']),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter', f'{name} {value}']
+
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+def init_query_metrics(app):
+    """
+    Подключить учёт SQL по запросам: число запросов, суммарное время в БД и самый
+    медленный запрос. Результат - заголовок Server-Timing, метрики /api/_metrics
+    и предупреждение в лог, если время в БД больше SLOW_DB_TIME_MS.
+    """
+    with app.app_context():
+        engine = db.engine
+
+    # Время старта хранится в контексте выполнения, а не в соединении:
+    # упавший запрос не оставляет значение, которое потом сдвинет замеры
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _record_statement(context, statement)
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(exception_context):
+        # Время упавшего запроса тоже входит во время в БД
+        if exception_context.execution_context is not None:
+            _record_statement(exception_context.execution_context, exception_context.statement)
+
+    def _record_statement(context, statement):
+        started = getattr(context, '_query_started', None)
+        if started is None:
+            return
+        context._query_started = None
+        elapsed = time.perf_counter() - started
+        if not has_request_context() or 'db_statements' not in g:
+            return
+        g.db_statements += 1
+        g.db_time += elapsed
+        if elapsed > g.db_slowest[0]:
+            g.db_slowest = (elapsed, statement)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_started = time.perf_counter()
+        g.db_statements = 0
+        g.db_time = 0.0
+        g.db_slowest = (0.0, None)
+
+    @app.after_request
+    def finish_request_metrics(response):
+        if 'request_started' not in g:
+            return response
+
+        duration = time.perf_counter() - g.request_started
+        slow = g.db_time * 1000 > app.config['SLOW_DB_TIME_MS']
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={g.db_time * 1000:.2f};desc="statements={g.db_statements}", app;dur={duration * 1000:.2f}'
+        )
+
+        request_metrics.record(
+            endpoint=request.endpoint or 'unknown',
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            statements=g.db_statements,
+            db_time=g.db_time,
+            slow=slow
+        )
+
+        if slow:
+            slowest_time, slowest_sql = g.db_slowest
+            app.logger.warning(
+                'Slow DB time %.1f ms on %s %s (%d statements); slowest %.1f ms: %s',
+                g.db_time * 1000, request.method, request.path, g.db_statements,
+                slowest_time * 1000, ' '.join((slowest_sql or '').split())
+            )
+
+        return response
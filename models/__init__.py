@@ -0,0 +1,9 @@
+# Все модели импортируются вместе, чтобы связи (relationship) по именам
+# классов разрешались независимо от того, какой модуль загружен первым.
+from models.user import User
+from models.repair_request import RepairRequest
+from models.comment import Comment
+from models.statistics_snapshot import StatisticsCounter
+from models.revoked_token import RevokedToken
+from models.table_version import TableVersion
+from models.request_tombstone import RequestTombstone
@@ -4,6 +4,10 @@ from datetime import datetime
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        # Комментарии заявки по порядку: WHERE request_id = ? ORDER BY created_at, comment_id
+        db.Index('idx_comments_request_created', 'request_id', 'created_at', 'comment_id'),
+    )
 
     comment_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     message = db.Column(db.Text, nullable=False)
@@ -11,11 +15,9 @@ class Comment(db.Model):
     request_id = db.Column(db.Integer, db.ForeignKey('repair_requests.request_id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    master = db.relationship('User')
+    request = db.relationship('RepairRequest', back_populates='comments')
+
     def to_dict(self):
-        return {
-            'comment_id': self.comment_id,
-            'message': self.message,
-            'master_id': self.master_id,
-            'request_id': self.request_id,
-            'created_at': str(self.created_at) if self.created_at else None
-        }
+        from services.serialization import comment_serializer
+        return comment_serializer.from_object(self)
@@ -1,8 +1,33 @@
 from database import db
 from datetime import datetime
+from sqlalchemy import func, text
+from sqlalchemy.dialects import postgresql  # noqa: F401 - регистрирует func.to_tsvector и др.
+
+# Допустимые статусы (как CHECK в Кондиционерв.sql)
+REQUEST_STATUSES = ('Новая заявка', 'В процессе ремонта', 'Ожидание комплектующих', 'Готова к выдаче')
+
+# Полнотекстовый поиск (services.search_service): конфигурация PostgreSQL
+# и поля заявки с весами ранжирования (A - важнее всего)
+SEARCH_CONFIG = 'russian'
+SEARCH_FIELDS = (('climate_tech_model', 'A'), ('problem_description', 'B'), ('repair_parts', 'C'))
+
 
 class RepairRequest(db.Model):
     __tablename__ = 'repair_requests'
+    __table_args__ = (
+        # список заявок заказчика + пагинация по request_id
+        db.Index('idx_requests_client_id', 'client_id', 'request_id'),
+        # фильтр по статусу + сортировка по дате приёма
+        db.Index('idx_requests_status_start', 'request_status', 'start_date'),
+        # нагрузка специалиста по статусам
+        db.Index('idx_requests_master_status', 'master_id', 'request_status'),
+        # keyset-пагинация order=start_date
+        db.Index('idx_requests_start_id', 'start_date', 'request_id'),
+        # дельта-синхронизация: изменённые после версии клиента
+        db.Index('idx_requests_updated', 'updated_at', 'request_id'),
+        # идемпотентный импорт: повтор той же строки не создаёт дубликат
+        db.UniqueConstraint('external_id', name='uq_requests_external_id'),
+    )
 
     request_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
 
@@ -20,16 +45,42 @@ class RepairRequest(db.Model):
     # клиент
     client_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
 
+    # ключ заявки во внешней системе (массовый импорт, flask requests import)
+    external_id = db.Column(db.String(100))
+
+    # время последнего изменения (GET /api/requests/changes)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    master = db.relationship('User', foreign_keys=[master_id])
+    client = db.relationship('User', foreign_keys=[client_id])
+    # passive_deletes: удаление заявки не трогает комментарии (как и до появления связи)
+    comments = db.relationship(
+        'Comment',
+        back_populates='request',
+        order_by='Comment.created_at, Comment.comment_id',
+        passive_deletes=True
+    )
+
     def to_dict(self):
-        return {
-            'request_id': self.request_id,
-            'start_date': str(self.start_date),
-            'climate_tech_type': self.climate_tech_type,
-            'climate_tech_model': self.climate_tech_model,
-            'problem_description': self.problem_description,
-            'request_status': self.request_status,
-            'completion_date': str(self.completion_date) if self.completion_date else None,
-            'repair_parts': self.repair_parts,
-            'master_id': self.master_id,
-            'client_id': self.client_id,
-        }
+        from services.serialization import request_serializer
+        return request_serializer.from_object(self)
+
+
+def search_document():
+    """
+    tsvector заявки для полнотекстового поиска (PostgreSQL).
+    Запрос должен использовать ровно это выражение - иначе GIN-индекс не подойдёт.
+    """
+    config = text(f"'{SEARCH_CONFIG}'::regconfig")
+    document = None
+    for field, weight in SEARCH_FIELDS:
+        part = func.setweight(
+            func.to_tsvector(config, func.coalesce(getattr(RepairRequest, field), text("''"))),
+            text(f"'{weight}'")
+        )
+        document = part if document is None else document.op('||')(part)
+    return document
+
+
+# GIN-индекс по выражению есть только в PostgreSQL (в SQLite - индекс в памяти, см. search_service)
+db.Index('idx_requests_search', search_document(), postgresql_using='gin').ddl_if(dialect='postgresql')
@@ -0,0 +1,22 @@
+from database import db
+from datetime import datetime
+
+
+class RequestTombstone(db.Model):
+    """След удалённой заявки - чтобы клиенты дельта-синхронизации убрали её у себя"""
+    __tablename__ = 'request_tombstones'
+    __table_args__ = (
+        db.Index('idx_request_tombstones_deleted', 'deleted_at'),
+    )
+
+    request_id = db.Column(db.Integer, primary_key=True)
+    # заказчик удалённой заявки (Заказчик видит только свои удаления)
+    client_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'request_id': self.request_id,
+            'client_id': self.client_id,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
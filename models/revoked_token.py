@@ -0,0 +1,24 @@
+from database import db
+from datetime import datetime
+
+
+class RevokedToken(db.Model):
+    """Отозванный JWT (по claim jti) - хранится до истечения самого токена"""
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = (
+        db.Index('idx_revoked_tokens_expires', 'expires_at'),
+        db.Index('idx_revoked_tokens_revoked', 'revoked_at'),
+    )
+
+    jti = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'jti': self.jti,
+            'user_id': self.user_id,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None
+        }
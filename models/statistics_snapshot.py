@@ -0,0 +1,43 @@
+from database import db
+
+
+class StatisticsCounter(db.Model):
+    """Счётчик снимка статистики: (метрика, ключ) -> значение"""
+    __tablename__ = 'statistics_snapshot'
+
+    metric = db.Column(db.String(50), primary_key=True)
+    key = db.Column(db.String(150), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'metric': self.metric,
+            'key': self.key,
+            'value': self.value
+        }
+
+
+class StatisticsDaily(db.Model):
+    """
+    Дневная сводка по заявкам для графиков: (день, тип техники, мастер) -> счётчики.
+    created - заявки, принятые в этот день; completed и completion_days_sum -
+    выполненные в этот день и сумма их сроков. Мастер - текущий ответственный (0 - не назначен).
+    """
+    __tablename__ = 'statistics_daily'
+
+    day = db.Column(db.Date, primary_key=True)
+    climate_tech_type = db.Column(db.String(100), primary_key=True)
+    master_id = db.Column(db.Integer, primary_key=True, default=0)
+    created = db.Column(db.BigInteger, nullable=False, default=0)
+    completed = db.Column(db.BigInteger, nullable=False, default=0)
+    completion_days_sum = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'climate_tech_type': self.climate_tech_type,
+            'master_id': self.master_id,
+            'created': self.created,
+            'completed': self.completed,
+            'completion_days_sum': self.completion_days_sum
+        }
@@ -0,0 +1,20 @@
+from database import db
+
+
+class TableVersion(db.Model):
+    """
+    Часть версии таблицы: версия - сумма version по всем slot таблицы,
+    каждая запись увеличивает один случайный slot (для ETag списков и статистики)
+    """
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(50), primary_key=True)
+    slot = db.Column(db.SmallInteger, primary_key=True, default=0)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'table_name': self.table_name,
+            'slot': self.slot,
+            'version': self.version
+        }
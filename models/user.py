@@ -1,8 +1,12 @@
 from database import db
+from sqlalchemy import DDL, event, func, text
 
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('idx_users_type', 'user_type'),
+    )
 
     user_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     full_name = db.Column(db.String(100), nullable=False)
@@ -12,11 +16,31 @@ class User(db.Model):
     user_type = db.Column(db.String(50), nullable=False)
 
     def to_dict(self):
-        return {
-            'user_id': self.user_id,
-            'full_name': self.full_name,
-            'phone': self.phone,
-            'login': self.login,
-            'user_type': self.user_type
-        }
+        from services.serialization import user_serializer
+        return user_serializer.from_object(self)
 
+
+def normalized_phone():
+    """Телефон только из цифр (PostgreSQL) - то же выражение, что у индекса idx_users_phone_trgm"""
+    return func.regexp_replace(User.phone, text(r"'\D'"), text("''"), text("'g'"))
+
+
+# Поиск пользователей по подстроке и с опечатками (pg_trgm, services.user_search_service).
+# Триграммные GIN-индексы есть только в PostgreSQL
+db.Index(
+    'idx_users_full_name_trgm', func.lower(User.full_name).label('full_name_key'),
+    postgresql_using='gin', postgresql_ops={'full_name_key': 'gin_trgm_ops'}
+).ddl_if(dialect='postgresql')
+db.Index(
+    'idx_users_login_trgm', func.lower(User.login).label('login_key'),
+    postgresql_using='gin', postgresql_ops={'login_key': 'gin_trgm_ops'}
+).ddl_if(dialect='postgresql')
+db.Index(
+    'idx_users_phone_trgm', normalized_phone().label('phone_key'),
+    postgresql_using='gin', postgresql_ops={'phone_key': 'gin_trgm_ops'}
+).ddl_if(dialect='postgresql')
+
+event.listen(
+    User.__table__, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
@@ -1,15 +1,27 @@
+import click
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
 import jwt
+import math
 import os
-from models.user import User
+import time
+import uuid
+from config import Config
 from database import db
-from werkzeug.security import check_password_hash
+from middleware.auth_middleware import require_auth
+from services.auth_service import AuthService
+from services.user_service import UserService
+from services.rate_limiter import TokenBucketLimiter
+from services.token_revocation_service import revocation_store
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
 
+# Ограничение попыток входа (до проверки хеша пароля)
+login_ip_limiter = TokenBucketLimiter(Config.LOGIN_RATE_IP_CAPACITY, Config.LOGIN_RATE_IP_REFILL)
+login_name_limiter = TokenBucketLimiter(Config.LOGIN_RATE_LOGIN_CAPACITY, Config.LOGIN_RATE_LOGIN_REFILL)
+
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
@@ -21,25 +33,27 @@ def login():
 
         login_str = data.get('login')
         password = data.get('password')
-
-        # Поиск пользователя по логину
-        user = User.query.filter_by(login=login_str).first()
+        if not isinstance(login_str, str) or not isinstance(password, str):
+            return jsonify({'error': 'Login and password must be strings'}), 400
+
+        # Ограничение частоты до дорогой проверки хеша: по IP и по паре (логин, IP) -
+        # чужие неудачные попытки не блокируют вход пользователю с его адреса
+        name_key = (login_str, request.remote_addr)
+        for limiter, key in ((login_ip_limiter, request.remote_addr), (login_name_limiter, name_key)):
+            allowed, retry_after = limiter.consume(key)
+            if not allowed:
+                response = jsonify({'error': 'Too many login attempts, try again later'})
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+                return response, 429
+
+        # Проверка пароля (хеш ИЛИ открытый текст), с перехешированием устаревших
+        user = AuthService.authenticate(login_str, password)
 
         if not user:
             return jsonify({'error': 'Invalid login or password'}), 401
 
-        # ✅ УНИВЕРСАЛЬНАЯ проверка пароля (хеш ИЛИ открытый текст)
-        password_valid = False
-
-        # Если пароль похож на хеш (длинный) - проверяем через check_password_hash
-        if len(user.password) > 50:  # Хеши обычно длиннее 50 символов
-            password_valid = check_password_hash(user.password, password)
-        else:
-            # Старый формат - открытый текст
-            password_valid = (user.password == password)
-
-        if not password_valid:
-            return jsonify({'error': 'Invalid login or password'}), 401
+        # Успешный вход не расходует попытки по логину
+        login_name_limiter.reset(name_key)
 
         # Генерация JWT токена
         token_payload = {
@@ -47,7 +61,8 @@ def login():
             'login': user.login,
             'full_name': user.full_name,
             'user_type': user.user_type,
-            'exp': datetime.utcnow() + timedelta(hours=24)
+            'exp': datetime.utcnow() + timedelta(hours=24),
+            'jti': uuid.uuid4().hex
         }
 
         token = jwt.encode(token_payload, SECRET_KEY, algorithm='HS256')
@@ -61,15 +76,23 @@ def login():
         }), 200
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
 @auth_bp.route('/logout', methods=['POST'])
-def logout():
-    """Выход пользователя"""
+@require_auth
+def logout(current_user):
+    """Выход пользователя: токен отзывается до истечения срока действия"""
     try:
+        revocation_store.revoke(
+            current_user.get('jti'),
+            current_user.get('exp'),
+            user_id=current_user.get('user_id')
+        )
         return jsonify({'message': 'Logout successful'}), 200
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
@@ -84,18 +107,23 @@ def refresh_token():
             return jsonify({'error': 'Missing token'}), 400
 
         payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        if revocation_store.is_revoked(payload.get('jti')):
+            return jsonify({'error': 'Token revoked'}), 401
 
-        # Получаем обновленную информацию пользователя
-        user = User.query.get(payload['user_id'])
+        # Получаем обновленную информацию пользователя (через кэш пользователей)
+        user = UserService.get_user_by_id(payload['user_id'])
         if not user:
             return jsonify({'error': 'User not found'}), 404
+        if 'error' in user:
+            return jsonify(user), 500
 
         new_token_payload = {
-            'user_id': user.user_id,
-            'login': user.login,
-            'full_name': user.full_name,
-            'user_type': user.user_type,
-            'exp': datetime.utcnow() + timedelta(hours=24)
+            'user_id': user['user_id'],
+            'login': user['login'],
+            'full_name': user['full_name'],
+            'user_type': user['user_type'],
+            'exp': datetime.utcnow() + timedelta(hours=24),
+            'jti': uuid.uuid4().hex
         }
 
         new_token = jwt.encode(new_token_payload, SECRET_KEY, algorithm='HS256')
@@ -108,3 +136,25 @@ def refresh_token():
         return jsonify({'error': 'Invalid token'}), 401
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+# ============================================================================
+# flask auth compact-revocations
+# ============================================================================
+
+@auth_bp.cli.command('compact-revocations')
+def compact_revocations_command():
+    """Удалить истёкшие записи из списка отозванных токенов"""
+    removed = revocation_store.compact()
+    click.echo(f"Removed {removed} expired revoked tokens")
+
+
+@auth_bp.cli.command('hash-cost')
+def hash_cost_command():
+    """Замерить время хеширования пароля при текущем PASSWORD_HASH_ITERATIONS"""
+    rounds = 5
+    started = time.perf_counter()
+    for _ in range(rounds):
+        AuthService.hash_password('benchmark-password')
+    elapsed = (time.perf_counter() - started) / rounds
+    click.echo(f"{AuthService.password_hash_method()}: {elapsed * 1000:.1f} ms per hash")
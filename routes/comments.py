@@ -1,20 +1,50 @@
 from flask import Blueprint, request, jsonify
 from database import db
+from middleware.auth_middleware import require_auth, require_role
+from services.comment_service import CommentService
+from services.pagination import MAX_PAGE_LIMIT, clamp_limit
 
 comments_bp = Blueprint('comments', __name__, url_prefix='/api/comments')
 
+# Роли, которые могут оставлять комментарии к заявкам
+COMMENT_ROLES = ('Специалист', 'Менеджер', 'Менеджер по качеству')
+
+
+def _can_access_request(current_user, request_id):
+    """Заказчик видит комментарии только к своим заявкам"""
+    from models.repair_request import RepairRequest
+    if current_user.get('user_type') != 'Заказчик':
+        return True
+    client_id = db.session.query(RepairRequest.client_id).filter_by(request_id=request_id).scalar()
+    return client_id == current_user.get('user_id')
+
+
+def _parse_ids(raw):
+    """'1,2,3' -> [1, 2, 3] (ValueError при мусоре)"""
+    try:
+        return sorted({int(part) for part in raw.split(',') if part.strip()})
+    except ValueError:
+        raise ValueError('Invalid request_ids, expected comma-separated integers') from None
+
+
+# ============================================================================
+# POST /api/comments/ - Добавить комментарий
+# ============================================================================
+
 @comments_bp.route('/', methods=['POST'])
-def create_comment():
+@require_role(*COMMENT_ROLES)
+def create_comment(current_user):
+    """Тело: {"request_id": 1, "message": "..."}; автор - текущий пользователь (master_id из тела не читается)"""
     from models.comment import Comment
     data = request.get_json()
-    required_fields = ['message', 'master_id', 'request_id']
-    if not all(field in data for field in required_fields):
+    required_fields = ['message', 'request_id']
+    if not data or not all(field in data for field in required_fields):
         return jsonify({'error': 'Missing required fields'}), 400
-    
+
     try:
         new_comment = Comment(
             message=data['message'],
-            master_id=data['master_id'],
+            master_id=current_user['user_id'],
             request_id=data['request_id']
         )
         db.session.add(new_comment)
@@ -24,22 +54,100 @@ def create_comment():
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+
+# ============================================================================
+# POST /api/comments/batch - Добавить несколько комментариев одним запросом
+# ============================================================================
+
+@comments_bp.route('/batch', methods=['POST'])
+@require_role(*COMMENT_ROLES)
+def create_comments_batch(current_user):
+    """
+    Тело: {"comments": [{"request_id": 1, "message": "..."}, ...]}
+    Автор - текущий пользователь; все строки вставляются одним INSERT.
+    """
+    data = request.get_json()
+    items = (data or {}).get('comments')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Missing comments'}), 400
+    if len(items) > MAX_PAGE_LIMIT:
+        return jsonify({'error': f'Too many comments, max {MAX_PAGE_LIMIT}'}), 400
+    if not all(isinstance(item, dict) and item.get('message') and isinstance(item.get('request_id'), int)
+               for item in items):
+        return jsonify({'error': 'Each comment needs request_id and message'}), 400
+
+    result = CommentService.create_comments_batch(current_user.get('user_id'), items)
+    if isinstance(result, dict) and 'error' in result:
+        status = 404 if 'request_ids' in result else 500
+        return jsonify(result), status
+    return jsonify(result), 201
+
+
+# ============================================================================
+# GET /api/comments/request/<id>?cursor=&limit= - Комментарии заявки постранично
+# ============================================================================
+
 @comments_bp.route('/request/<int:request_id>', methods=['GET'])
-def get_comments_for_request(request_id):
-    from models.comment import Comment
+@require_auth
+def get_comments_for_request(request_id, current_user):
     try:
-        comments = Comment.query.filter_by(request_id=request_id).all()
-        return jsonify([c.to_dict() for c in comments]), 200
+        if not _can_access_request(current_user, request_id):
+            return jsonify({'error': 'Access denied'}), 403
+
+        limit = clamp_limit(request.args.get('limit', 20, type=int), default=20)
+        result = CommentService.get_comments_by_request(request_id, request.args.get('cursor'), limit)
+        if 'error' in result:
+            return jsonify(result), 500
+        return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# ============================================================================
+# GET /api/comments/summary?request_ids=1,2,3 - Число и последний комментарий по заявкам
+# ============================================================================
+
+@comments_bp.route('/summary', methods=['GET'])
+@require_auth
+def get_comments_summary(current_user):
+    """Сводка для списка заявок одним запросом (вместо запроса на каждую строку)"""
+    try:
+        request_ids = _parse_ids(request.args.get('request_ids', ''))
+        if not request_ids:
+            return jsonify({'error': 'Missing request_ids'}), 400
+        if len(request_ids) > MAX_PAGE_LIMIT:
+            return jsonify({'error': f'Too many request_ids, max {MAX_PAGE_LIMIT}'}), 400
+
+        client_id = current_user.get('user_id') if current_user.get('user_type') == 'Заказчик' else None
+        summaries = CommentService.get_comment_summaries(request_ids, client_id=client_id)
+        if 'error' in summaries:
+            return jsonify(summaries), 500
+
+        # Заявки без комментариев тоже попадают в ответ
+        empty = {'comments_count': 0, 'latest_comment': None}
+        return jsonify({str(request_id): summaries.get(request_id, empty) for request_id in request_ids}), 200
+    except ValueError as e:
         return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# ============================================================================
+# GET /api/comments/<id> - Один комментарий
+# ============================================================================
 
 @comments_bp.route('/<int:comment_id>', methods=['GET'])
-def get_comment(comment_id):
+@require_auth
+def get_comment(comment_id, current_user):
     from models.comment import Comment
     try:
         comment = Comment.query.get(comment_id)
         if not comment:
             return jsonify({'error': 'Comment not found'}), 404
+        if not _can_access_request(current_user, comment.request_id):
+            return jsonify({'error': 'Access denied'}), 403
         return jsonify(comment.to_dict()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
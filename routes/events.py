@@ -0,0 +1,118 @@
+import time
+
+import click
+from flask import Blueprint, Response, current_app, request, jsonify
+from config import Config
+from middleware.auth_middleware import authenticate_request, require_auth
+from services.auth_service import AuthService
+from services.event_bus import event_bus, event_visible_to, run_broker
+from services.token_revocation_service import revocation_store
+
+events_bp = Blueprint('events', __name__, url_prefix='/api/events')
+
+# ============================================================================
+# POST /api/events/ticket - Одноразовый билет на поток событий
+# ============================================================================
+
+@events_bp.route('/ticket', methods=['POST'])
+@require_auth
+def create_ticket(current_user):
+    """
+    Билет для GET /api/events/?ticket=: EventSource не умеет передавать заголовки,
+    а токен в URL остался бы в логах прокси. Билет одноразовый и живёт SSE_TICKET_TTL секунд.
+    """
+    ttl = current_app.config['SSE_TICKET_TTL']
+    return jsonify({'ticket': AuthService.generate_stream_ticket(current_user, ttl), 'expires_in': ttl}), 200
+
+
+# ============================================================================
+# GET /api/events/ - Поток изменений заявок (Server-Sent Events)
+# ============================================================================
+
+@events_bp.route('/', methods=['GET'])
+def stream_events():
+    """
+    SSE-поток изменений статуса и назначения заявок, видимых пользователю.
+    Авторизация - заголовок Authorization или ?ticket= (POST /api/events/ticket).
+
+    События: request (данные - services.event_bus.request_event) и resync -
+    клиент не успевал читать и был отключён, нужно догнать через /api/requests/changes.
+    Токен перепроверяется перед каждым событием и keep-alive: после отзыва или
+    истечения приходит unauthorized и поток закрывается.
+    """
+    ticket = request.args.get('ticket')
+    if ticket:
+        current_user, error = _redeem_ticket(ticket)
+        if error:
+            return jsonify({'error': error}), 401
+    else:
+        current_user, error_response = authenticate_request()
+        if error_response:
+            return error_response
+
+    subscription = event_bus.subscribe(event_visible_to(current_user))
+    stream = _event_stream(
+        subscription, current_user, current_app._get_current_object(), current_app.config['SSE_HEARTBEAT_INTERVAL']
+    )
+
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # не буферизовать поток в nginx
+        'X-Accel-Buffering': 'no',
+    })
+
+
+def _redeem_ticket(ticket):
+    """Билет -> (пользователь с jti/exp исходного токена, None) или (None, ошибка); второй раз не примется"""
+    payload, error = AuthService.verify_stream_ticket(ticket)
+    if error:
+        return None, error
+    # Использованный билет помечается как отозванный токен: общая для воркеров таблица
+    if not revocation_store.revoke(payload['jti'], payload['exp'], user_id=payload['user'].get('user_id')):
+        return None, 'Ticket already used'
+    current_user = dict(payload['user'], jti=payload['token_jti'], exp=payload['token_exp'])
+    if revocation_store.is_revoked(current_user['jti']):
+        return None, 'Token revoked'
+    return current_user, None
+
+
+def _event_stream(subscription, current_user, app, heartbeat):
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            event = subscription.get(timeout=heartbeat)
+            if not _token_active(app, current_user):
+                yield 'event: unauthorized\ndata: {}\n\n'
+                return
+            if subscription.overflowed:
+                yield 'event: resync\ndata: {}\n\n'
+                return
+            if event is None:
+                # комментарий SSE: держит соединение открытым через прокси
+                yield ': keepalive\n\n'
+                continue
+            yield f'event: request\ndata: {app.json.dumps(event)}\n\n'
+    finally:
+        event_bus.unsubscribe(subscription)
+
+
+def _token_active(app, current_user):
+    """Токен потока не отозван и не истёк (генератор работает уже без контекста запроса)"""
+    exp = current_user.get('exp')
+    if exp is not None and exp <= time.time():
+        return False
+    # is_revoked периодически подтягивает отзывы других воркеров из БД - нужен контекст приложения
+    with app.app_context():
+        return not revocation_store.is_revoked(current_user.get('jti'))
+
+
+# ============================================================================
+# flask events broker
+# ============================================================================
+
+@events_bp.cli.command('broker')
+@click.option('--address', default=Config.EVENT_BROKER_ADDRESS, show_default=True)
+def broker_command(address):
+    """Брокер событий для EVENT_BACKEND=broker (пересылает события между воркерами)"""
+    click.echo(f"Event broker listening on {address}")
+    run_broker(address)
@@ -1,58 +1,90 @@
-from flask import Blueprint, request, jsonify
+import click
+import csv
+import io
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from middleware.auth_middleware import require_auth, require_role
-from models.repair_request import RepairRequest
+from models.repair_request import RepairRequest, REQUEST_STATUSES
+from models.user import User
+from services.statistics_snapshot_service import StatisticsSnapshotService
+from services.table_version_service import TableVersionService
+from services.event_bus import event_bus, request_event
+from services.request_import_service import RequestImportService, IMPORT_FORMATS, MAX_IMPORT_BATCH_SIZE
+from middleware.conditional_get import conditional_get
+from models.comment import Comment
+from models.request_tombstone import RequestTombstone
+from services.pagination import MAX_PAGE_LIMIT, clamp_limit, encode_cursor, decode_cursor
+from services.serialization import request_serializer
+from services.search_service import SearchService
 from database import db
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from sqlalchemy import tuple_, update
+from sqlalchemy.orm import joinedload, selectinload
 
 requests_bp = Blueprint('requests', __name__, url_prefix='/api/requests')
 
+# Ключи сортировки keyset-пагинации
+KEYSET_ORDERS = ('request_id', 'start_date')
+
+# Размер пачки потоковой выгрузки
+EXPORT_BATCH_SIZE = 1000
+
+# Дельта-синхронизация: больше изменений - клиенту проще перезагрузить список;
+# запас по времени покрывает транзакции, закоммиченные позже своего updated_at
+CHANGES_LIMIT = 1000
+CHANGES_OVERLAP = timedelta(seconds=60)
+
+# Кто может менять заявки (PUT /<id> и массовое обновление)
+UPDATE_ROLES = ('Специалист', 'Менеджер', 'Менеджер по качеству')
+
+# Массовое обновление: не больше заявок за один запрос; поля фильтра - точное совпадение
+BULK_UPDATE_LIMIT = 1000
+BULK_FILTER_FIELDS = ('request_status', 'climate_tech_type', 'climate_tech_model', 'master_id', 'client_id')
+
+# Старые значения заявки для снимка статистики и событий
+BULK_STATE_COLUMNS = (
+    RepairRequest.request_id, RepairRequest.client_id, RepairRequest.request_status,
+    RepairRequest.climate_tech_type, RepairRequest.master_id,
+    RepairRequest.start_date, RepairRequest.completion_date,
+)
+
+# Заказчик и мастер - JOIN, комментарии с авторами - один SELECT ... WHERE request_id IN (...)
+FULL_REQUEST_OPTIONS = (
+    joinedload(RepairRequest.client),
+    joinedload(RepairRequest.master),
+    selectinload(RepairRequest.comments).joinedload(Comment.master),
+)
+
 # ============================================================================
 # GET /api/requests/ - Получить все заявки
 # ============================================================================
 
 @requests_bp.route('/', methods=['GET'])
 @require_auth
+@conditional_get('repair_requests')
 def get_all_requests(current_user):
-    """Получить все заявки (в зависимости от роли)"""
+    """
+    Получить все заявки (в зависимости от роли)
+
+    Режимы пагинации:
+    - ?page=&limit= - постраничный (OFFSET + COUNT), как раньше;
+    - ?cursor=<token> или ?after=<request_id> - keyset по request_id
+      или (start_date, request_id) при order=start_date; COUNT только при with_total=1.
+      Пустой cursor= открывает первую страницу.
+    """
     try:
         page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 10, type=int)
-        status = request.args.get('status', None)
-        search = request.args.get('search', None)
-
-        query = RepairRequest.query
-
-        # Для Заказчиков показываем только их заявки
-        if current_user.get('user_type') == 'Заказчик':
-            query = query.filter_by(client_id=current_user.get('user_id'))
+        limit = clamp_limit(request.args.get('limit', 10, type=int))
 
-        # Фильтр по статусу
-        if status:
-            query = query.filter_by(request_status=status)
+        query = _filtered_requests_query(current_user)
 
-        # Поиск по ID
-        if search:
-            try:
-                query = query.filter_by(request_id=int(search))
-            except ValueError:
-                pass
+        if 'cursor' in request.args or 'after' in request.args:
+            return _keyset_page(query, limit)
 
-        # Пагинация
-        paginated = query.paginate(page=page, per_page=limit)
+        # Пагинация: строки читаются кортежами колонок, без объектов модели
+        paginated = query.with_entities(*request_serializer.columns).paginate(page=page, per_page=limit)
 
         return jsonify({
-            'data': [{
-                'request_id': r.request_id,
-                'start_date': r.start_date.isoformat() if r.start_date else None,
-                'climate_tech_type': r.climate_tech_type,
-                'climate_tech_model': r.climate_tech_model,
-                'problem_description': r.problem_description,
-                'request_status': r.request_status,
-                'completion_date': r.completion_date.isoformat() if r.completion_date else None,
-                'repair_parts': r.repair_parts,
-                'master_id': r.master_id,
-                'client_id': r.client_id
-            } for r in paginated.items],
+            'data': request_serializer.many(paginated.items),
             'pagination': {
                 'page': page,
                 'limit': limit,
@@ -64,16 +96,306 @@ def get_all_requests(current_user):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+def _filtered_requests_query(current_user):
+    """Заявки, видимые пользователю, с фильтрами ?status= и ?search= (ID или текст)"""
+    status = request.args.get('status', None)
+    search = request.args.get('search', None)
+
+    query = RepairRequest.query
+
+    # Для Заказчиков показываем только их заявки
+    if current_user.get('user_type') == 'Заказчик':
+        query = query.filter_by(client_id=current_user.get('user_id'))
+
+    # Фильтр по статусу
+    if status:
+        query = query.filter_by(request_status=status)
+
+    # Поиск: число - по ID, иначе полнотекстовый (модель, описание, запчасти)
+    if search:
+        try:
+            query = query.filter_by(request_id=int(search))
+        except ValueError:
+            query = query.filter(SearchService.match_filter(search))
+
+    return query
+
+
+def _keyset_page(query, limit):
+    """Страница keyset-пагинации: WHERE ключ > курсор ORDER BY ключ LIMIT n+1"""
+    order = request.args.get('order', 'request_id')
+    if order not in KEYSET_ORDERS:
+        return jsonify({'error': f'Invalid order, expected one of: {", ".join(KEYSET_ORDERS)}'}), 400
+
+    try:
+        position = _cursor_position(order)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    total = query.order_by(None).count() if request.args.get('with_total', type=int) else None
+
+    if order == 'start_date':
+        if position:
+            query = query.filter(
+                tuple_(RepairRequest.start_date, RepairRequest.request_id) > (position['d'], position['id'])
+            )
+        query = query.order_by(RepairRequest.start_date, RepairRequest.request_id)
+    else:
+        if position:
+            query = query.filter(RepairRequest.request_id > position['id'])
+        query = query.order_by(RepairRequest.request_id)
+
+    rows = query.with_entities(*request_serializer.columns).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_position = {'o': order, 'id': last.request_id}
+        if order == 'start_date':
+            next_position['d'] = last.start_date.isoformat()
+        next_cursor = encode_cursor(next_position)
+
+    pagination = {'limit': limit, 'order': order, 'has_more': has_more, 'next_cursor': next_cursor}
+    if total is not None:
+        pagination['total'] = total
+
+    return jsonify({
+        'data': request_serializer.many(rows),
+        'pagination': pagination
+    }), 200
+
+
+def _cursor_position(order):
+    """Позиция курсора из ?cursor= или ?after= (None - первая страница)"""
+    token = request.args.get('cursor', '')
+    if token:
+        position = decode_cursor(token)
+        if position.get('o') != order or not isinstance(position.get('id'), int):
+            raise ValueError('Cursor does not match requested order')
+        if order == 'start_date':
+            position['d'] = date.fromisoformat(str(position.get('d', '')))
+        return position
+
+    after = request.args.get('after', '')
+    if not after:
+        return None
+    try:
+        after_id = int(after)
+    except ValueError:
+        raise ValueError('Invalid after, expected request_id') from None
+
+    position = {'o': order, 'id': after_id}
+    if order == 'start_date':
+        start_date = db.session.query(RepairRequest.start_date).filter_by(request_id=after_id).scalar()
+        if start_date is None:
+            raise ValueError('Request from after not found')
+        position['d'] = start_date
+    return position
+
+
+# ============================================================================
+# GET /api/requests/search?q= - Полнотекстовый поиск заявок
+# ============================================================================
+
+@requests_bp.route('/search', methods=['GET'])
+@require_auth
+@conditional_get('repair_requests')
+def search_requests(current_user):
+    """
+    Поиск по модели техники, описанию неисправности и запчастям (?q=).
+    Результаты по убыванию релевантности (поле rank), keyset-пагинация ?cursor=&limit=.
+    Видимость по роли и ?status= - как у списка заявок.
+    """
+    try:
+        query_text = request.args.get('q', '').strip()
+        if not query_text:
+            return jsonify({'error': 'q is required'}), 400
+        limit = clamp_limit(request.args.get('limit', 20, type=int), default=20)
+
+        position = None
+        token = request.args.get('cursor', '')
+        if token:
+            try:
+                position = decode_cursor(token)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if (position.get('q') != query_text or not isinstance(position.get('id'), int)
+                    or not isinstance(position.get('r'), (int, float))):
+                return jsonify({'error': 'Cursor does not match search query'}), 400
+
+        page, has_more = SearchService.search_page(_filtered_requests_query(current_user), query_text, position, limit)
+
+        data = []
+        for row, rank in page:
+            item = request_serializer.from_row(row)
+            item['rank'] = rank
+            data.append(item)
+
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor({'q': query_text, 'r': data[-1]['rank'], 'id': data[-1]['request_id']})
+
+        return jsonify({
+            'data': data,
+            'pagination': {'limit': limit, 'has_more': has_more, 'next_cursor': next_cursor}
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ============================================================================
+# GET /api/requests/export - Потоковая выгрузка заявок (NDJSON / CSV)
+# ============================================================================
+
+@requests_bp.route('/export', methods=['GET'])
+@require_auth
+def export_requests(current_user):
+    """
+    Выгрузить все видимые пользователю заявки потоком: ?format=ndjson|csv (+ ?status=).
+    Строки читаются серверным курсором пачками по EXPORT_BATCH_SIZE,
+    поэтому память не зависит от размера таблицы.
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({'error': 'Invalid format, expected ndjson or csv'}), 400
+
+        rows = _filtered_requests_query(current_user).with_entities(
+            *request_serializer.columns
+        ).order_by(RepairRequest.request_id).yield_per(EXPORT_BATCH_SIZE)
+
+        if export_format == 'csv':
+            body, mimetype = _export_csv(rows), 'text/csv; charset=utf-8'
+        else:
+            body, mimetype = _export_ndjson(rows), 'application/x-ndjson; charset=utf-8'
+
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=requests.{export_format}'}
+        )
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _export_ndjson(rows):
+    dumps = current_app.json.dumps
+    for row in rows:
+        yield dumps(request_serializer.from_row(row)) + '\n'
+
+
+def _export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(request_serializer.fields)
+    for i, row in enumerate(rows, 1):
+        writer.writerow([_export_value(value) for value in row])
+        # Отдаём накопленное пачками, чтобы не дёргать генератор на каждую строку
+        if i % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+# ============================================================================
+# GET /api/requests/changes?since=<version> - Изменения с версии клиента
+# ============================================================================
+
+@requests_bp.route('/changes', methods=['GET'])
+@require_auth
+def get_request_changes(current_user):
+    """
+    Заявки, созданные/изменённые (changed) и удалённые (deleted) с версии since.
+    Ответ содержит новую версию для следующего запроса. reset=true - версия
+    устарела или изменений слишком много: клиент загружает список заново.
+    Без since возвращается только текущая версия (reset=true).
+    """
+    try:
+        now = datetime.utcnow()
+        reset = {'version': encode_cursor({'t': now.isoformat()}), 'reset': True, 'changed': [], 'deleted': []}
+
+        since = request.args.get('since', '')
+        if not since:
+            return jsonify(reset), 200
+        try:
+            since_time = datetime.fromisoformat(str(decode_cursor(since).get('t', '')))
+        except ValueError:
+            return jsonify({'error': 'Invalid since version'}), 400
+
+        # Следы удалений старше срока хранения уже вычищены
+        retention = timedelta(days=current_app.config['TOMBSTONE_RETENTION_DAYS'])
+        if since_time < now - retention:
+            return jsonify(reset), 200
+
+        window_start = since_time - CHANGES_OVERLAP
+        changed = _filtered_requests_query(current_user).filter(
+            RepairRequest.updated_at >= window_start
+        ).with_entities(*request_serializer.columns).order_by(
+            RepairRequest.updated_at, RepairRequest.request_id
+        ).limit(CHANGES_LIMIT + 1).all()
+        if len(changed) > CHANGES_LIMIT:
+            return jsonify(reset), 200
+
+        deleted = db.session.query(RequestTombstone.request_id).filter(
+            RequestTombstone.deleted_at >= window_start
+        )
+        if current_user.get('user_type') == 'Заказчик':
+            deleted = deleted.filter(RequestTombstone.client_id == current_user.get('user_id'))
+
+        return jsonify({
+            'version': reset['version'],
+            'reset': False,
+            'changed': request_serializer.many(changed),
+            'deleted': [request_id for (request_id,) in deleted]
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ============================================================================
 # GET /api/requests/<int:request_id> - Получить одну заявку
 # ============================================================================
 
 @requests_bp.route('/<int:request_id>', methods=['GET'])
 @require_auth
+@conditional_get('repair_requests')
 def get_request(request_id, current_user):
     """Получить информацию о заявке"""
     try:
-        req = RepairRequest.query.get(request_id)
+        row = db.session.execute(
+            request_serializer.select().where(RepairRequest.request_id == request_id)
+        ).first()
+        if not row:
+            return jsonify({'error': 'Request not found'}), 404
+
+        # Для Заказчика - только его заявки
+        if current_user.get('user_type') == 'Заказчик' and row.client_id != current_user.get('user_id'):
+            return jsonify({'error': 'Access denied'}), 403
+
+        return jsonify(request_serializer.from_row(row)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ============================================================================
+# GET /api/requests/<int:request_id>/full - Заявка с заказчиком, мастером и комментариями
+# GET /api/requests/full?ids=1,2,3         - То же для списка заявок
+# ============================================================================
+
+@requests_bp.route('/<int:request_id>/full', methods=['GET'])
+@require_auth
+def get_request_full(request_id, current_user):
+    """Полная карточка заявки за ограниченное число запросов (2 SELECT)"""
+    try:
+        req = db.session.get(RepairRequest, request_id, options=FULL_REQUEST_OPTIONS)
         if not req:
             return jsonify({'error': 'Request not found'}), 404
 
@@ -81,22 +403,53 @@ def get_request(request_id, current_user):
         if current_user.get('user_type') == 'Заказчик' and req.client_id != current_user.get('user_id'):
             return jsonify({'error': 'Access denied'}), 403
 
+        return jsonify(_request_full_json(req)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@requests_bp.route('/full', methods=['GET'])
+@require_auth
+def get_requests_full(current_user):
+    """Полные карточки нескольких заявок: ?ids=1,2,3 (не больше MAX_PAGE_LIMIT)"""
+    try:
+        try:
+            ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            return jsonify({'error': 'Invalid ids, expected comma-separated request_id list'}), 400
+        if not ids:
+            return jsonify({'error': 'Missing ids'}), 400
+        if len(ids) > MAX_PAGE_LIMIT:
+            return jsonify({'error': f'Too many ids, max {MAX_PAGE_LIMIT}'}), 400
+
+        query = RepairRequest.query.options(*FULL_REQUEST_OPTIONS).filter(RepairRequest.request_id.in_(ids))
+
+        # Для Заказчиков - только их заявки
+        if current_user.get('user_type') == 'Заказчик':
+            query = query.filter_by(client_id=current_user.get('user_id'))
+
+        found = {req.request_id: req for req in query.all()}
+
         return jsonify({
-            'request_id': req.request_id,
-            'start_date': req.start_date.isoformat() if req.start_date else None,
-            'climate_tech_type': req.climate_tech_type,
-            'climate_tech_model': req.climate_tech_model,
-            'problem_description': req.problem_description,
-            'request_status': req.request_status,
-            'completion_date': req.completion_date.isoformat() if req.completion_date else None,
-            'repair_parts': req.repair_parts,
-            'master_id': req.master_id,
-            'client_id': req.client_id
+            'data': [_request_full_json(found[request_id]) for request_id in ids if request_id in found],
+            'missing': [request_id for request_id in ids if request_id not in found]
         }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+def _request_full_json(req):
+    result = request_serializer.from_object(req)
+    result['client'] = req.client.to_dict() if req.client else None
+    result['master'] = req.master.to_dict() if req.master else None
+    result['comments'] = [{
+        **comment.to_dict(),
+        'master_name': comment.master.full_name if comment.master else None
+    } for comment in req.comments]
+    return result
+
 # ============================================================================
 # POST /api/requests/ - Создать заявку
 # ============================================================================
@@ -128,7 +481,12 @@ def create_request(current_user):
         )
 
         db.session.add(new_request)
+        # request_id нужен дневным сводкам (watermark обратного заполнения)
+        db.session.flush()
+        StatisticsSnapshotService.apply_change(None, StatisticsSnapshotService.request_state(new_request))
+        TableVersionService.bump('repair_requests')
         db.session.commit()
+        event_bus.publish(request_event(new_request))
 
         return jsonify({
             'message': 'Request created successfully',
@@ -140,6 +498,36 @@ def create_request(current_user):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+# ============================================================================
+# POST /api/requests/import?format=jsonl|csv - Массовый импорт заявок
+# ============================================================================
+
+@requests_bp.route('/import', methods=['POST'])
+@require_role('Менеджер', 'Оператор')
+def import_requests(current_user):
+    """
+    Импорт заявок из тела запроса (JSONL или CSV, UTF-8), читается потоком.
+    Каждая строка - поля RepairRequest + обязательный external_id; повторная
+    загрузка того же файла ничего не дублирует. Ответ - отчёт с ошибками по строкам.
+    """
+    try:
+        file_format = request.args.get('format', 'jsonl')
+        if file_format not in IMPORT_FORMATS:
+            return jsonify({'error': f'Invalid format, expected one of: {", ".join(IMPORT_FORMATS)}'}), 400
+        batch_size = request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE'], type=int)
+        batch_size = max(1, min(batch_size, MAX_IMPORT_BATCH_SIZE))
+
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        report = RequestImportService.import_stream(stream, file_format, batch_size)
+        return jsonify(report), 200
+
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': 'Body must be UTF-8 encoded'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # ============================================================================
 # PUT /api/requests/<int:request_id> - Обновить заявку
 # ============================================================================
@@ -149,7 +537,7 @@ def create_request(current_user):
 def update_request(request_id, current_user):
     """Обновить заявку (Специалист, Менеджер, Менеджер по качеству)"""
     try:
-        if current_user.get('user_type') not in ['Специалист', 'Менеджер', 'Менеджер по качеству']:
+        if current_user.get('user_type') not in UPDATE_ROLES:
             return jsonify({'error': 'Permission denied'}), 403
 
         req = RepairRequest.query.get(request_id)
@@ -157,6 +545,7 @@ def update_request(request_id, current_user):
             return jsonify({'error': 'Request not found'}), 404
 
         data = request.get_json()
+        old_state = StatisticsSnapshotService.request_state(req)
 
         # Обновляем только указанные поля
         if 'request_status' in data and data['request_status']:
@@ -173,7 +562,12 @@ def update_request(request_id, current_user):
         if 'completion_date' in data and data['completion_date']:
             req.completion_date = datetime.fromisoformat(data['completion_date']).date()
 
+        StatisticsSnapshotService.apply_change(old_state, StatisticsSnapshotService.request_state(req))
+        TableVersionService.bump('repair_requests')
+        event = request_event(req, old_state)
         db.session.commit()
+        if event:
+            event_bus.publish(event)
 
         return jsonify({
             'message': 'Request updated successfully',
@@ -185,6 +579,139 @@ def update_request(request_id, current_user):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+# ============================================================================
+# POST /api/requests/bulk - Массовая смена статуса / мастера
+# ============================================================================
+
+@requests_bp.route('/bulk', methods=['POST'])
+@require_role(*UPDATE_ROLES)
+def bulk_update_requests(current_user):
+    """
+    Сменить статус и/или мастера у многих заявок (роли - как у PUT /<id>).
+
+    Тело: request_ids: [...] и/или filter: {поле: значение} - какие заявки менять;
+    request_status, master_id (null - снять назначение), completion_date - новые значения.
+    Выполняется одним UPDATE ... WHERE request_id IN (...) RETURNING в одной транзакции;
+    заявки, у которых значения уже такие, не трогаются. Ответ - id изменённых заявок.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        query, error = _bulk_target_query(data)
+        if error:
+            return jsonify({'error': error}), 400
+        values, error = _bulk_values(data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        # Старые значения - под блокировкой строк до конца транзакции
+        old_rows = (query.with_entities(*BULK_STATE_COLUMNS)
+                    .order_by(RepairRequest.request_id)
+                    .limit(BULK_UPDATE_LIMIT + 1)
+                    .with_for_update()
+                    .all())
+        if len(old_rows) > BULK_UPDATE_LIMIT:
+            db.session.rollback()
+            return jsonify({'error': f'More than {BULK_UPDATE_LIMIT} requests match, narrow the filter'}), 400
+
+        pending = {
+            row.request_id: row for row in old_rows
+            if any(getattr(row, field) != value for field, value in values.items())
+        }
+        updated = []
+        events = []
+        if pending:
+            updated = db.session.execute(
+                update(RepairRequest)
+                .where(RepairRequest.request_id.in_(list(pending)))
+                .values(values)
+                .returning(RepairRequest.request_id, RepairRequest.request_status,
+                           RepairRequest.master_id, RepairRequest.client_id),
+                execution_options={'synchronize_session': False}
+            ).all()
+
+            changes = []
+            for row in updated:
+                old_state = StatisticsSnapshotService.request_state(pending[row.request_id])
+                changes.append((old_state, {**old_state, **values}))
+                events.append(request_event(row, old_state))
+            StatisticsSnapshotService.apply_changes(changes)
+            TableVersionService.bump('repair_requests')
+
+        db.session.commit()
+        for event in events:
+            if event:
+                event_bus.publish(event)
+
+        updated_ids = sorted(row.request_id for row in updated)
+        return jsonify({
+            'message': 'Requests updated successfully',
+            'matched': len(old_rows),
+            'updated': len(updated_ids),
+            'request_ids': updated_ids
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+def _bulk_target_query(data):
+    """Заявки для массового обновления: request_ids и/или filter -> (query, None) или (None, ошибка)"""
+    request_ids = data.get('request_ids')
+    filters = data.get('filter')
+    if not request_ids and not filters:
+        return None, 'request_ids or filter is required'
+
+    query = RepairRequest.query
+    if request_ids:
+        if not isinstance(request_ids, list) or not all(
+                isinstance(value, int) and not isinstance(value, bool) for value in request_ids):
+            return None, 'request_ids must be a list of integers'
+        if len(request_ids) > BULK_UPDATE_LIMIT:
+            return None, f'At most {BULK_UPDATE_LIMIT} request_ids per call'
+        query = query.filter(RepairRequest.request_id.in_(request_ids))
+    if filters:
+        if not isinstance(filters, dict):
+            return None, 'filter must be an object'
+        unknown = sorted(str(key) for key in filters if key not in BULK_FILTER_FIELDS)
+        if unknown:
+            return None, f'Unknown filter fields: {", ".join(unknown)}'
+        for field, value in filters.items():
+            column_type = RepairRequest.__table__.c[field].type.python_type
+            if value is not None and (not isinstance(value, column_type) or isinstance(value, bool)):
+                expected = 'an integer' if column_type is int else 'a string'
+                return None, f'filter.{field} must be {expected} or null'
+        # master_id: null в фильтре - неназначенные заявки (IS NULL)
+        query = query.filter_by(**filters)
+    return query, None
+
+
+def _bulk_values(data):
+    """Новые значения массового обновления -> (values, None) или (None, ошибка)"""
+    values = {}
+    if data.get('request_status'):
+        if data['request_status'] not in REQUEST_STATUSES:
+            return None, f"Invalid request_status: {data['request_status']!r}"
+        values['request_status'] = data['request_status']
+
+    if 'master_id' in data:
+        master_id = data['master_id'] or None
+        if master_id is not None:
+            master = db.session.get(User, master_id) if isinstance(master_id, int) else None
+            if not master or master.user_type != 'Специалист':
+                return None, f'Specialist {master_id} not found'
+        values['master_id'] = master_id
+
+    if not values:
+        return None, 'request_status or master_id is required'
+
+    if data.get('completion_date'):
+        try:
+            values['completion_date'] = date.fromisoformat(data['completion_date'])
+        except (TypeError, ValueError):
+            return None, 'Invalid completion_date, expected YYYY-MM-DD'
+    return values, None
+
 # ============================================================================
 # DELETE /api/requests/<int:request_id> - Удалить заявку
 # ============================================================================
@@ -201,8 +728,13 @@ def delete_request(request_id, current_user):
         if not req:
             return jsonify({'error': 'Request not found'}), 404
 
+        StatisticsSnapshotService.apply_change(StatisticsSnapshotService.request_state(req), None)
+        TableVersionService.bump('repair_requests')
+        db.session.add(RequestTombstone(request_id=req.request_id, client_id=req.client_id))
+        event = request_event(req, deleted=True)
         db.session.delete(req)
         db.session.commit()
+        event_bus.publish(event)
 
         return jsonify({
             'message': 'Request deleted successfully',
@@ -212,3 +744,39 @@ def delete_request(request_id, current_user):
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+
+# ============================================================================
+# flask requests compact-tombstones
+# ============================================================================
+
+@requests_bp.cli.command('compact-tombstones')
+def compact_tombstones_command():
+    """Удалить следы удалений старше TOMBSTONE_RETENTION_DAYS"""
+    horizon = datetime.utcnow() - timedelta(days=current_app.config['TOMBSTONE_RETENTION_DAYS'])
+    removed = RequestTombstone.query.filter(RequestTombstone.deleted_at < horizon).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f"Removed {removed} request tombstones")
+
+
+# ============================================================================
+# flask requests import <file>
+# ============================================================================
+
+@requests_bp.cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='формат файла (по умолчанию - по расширению)')
+@click.option('--batch-size', type=int, default=None, help='строк в одном INSERT (IMPORT_BATCH_SIZE)')
+def import_command(path, file_format, batch_size):
+    """Импортировать заявки из JSONL/CSV-файла (повторный запуск не дублирует строки)"""
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        report = RequestImportService.import_stream(f, file_format, batch_size)
+
+    for error in report['errors']:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f"Inserted {report['inserted']}, skipped {report['skipped']}, "
+               f"failed {report['failed']} in {report['batches']} batches")
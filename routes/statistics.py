@@ -1,43 +1,218 @@
-from flask import Blueprint, jsonify
+import click
+from flask import Blueprint, request, jsonify
+from datetime import date, timedelta
 from services.statistics_service import StatisticsService
+from services.statistics_snapshot_service import StatisticsSnapshotService
+from services.statistics_rollup_service import (
+    StatisticsRollupService, ROLLUP_BACKFILL_CHUNK, TIMESERIES_GRANULARITIES, TIMESERIES_GROUPS,
+    MAX_TIMESERIES_DAYS, DEFAULT_TIMESERIES_DAYS, ROLLUPS_NOT_BUILT
+)
+from middleware.conditional_get import conditional_get
+
+# Статистика меняется только вместе с заявками и пользователями (имена специалистов)
+STATISTICS_TABLES = ('repair_requests', 'users')
+
+
+def _period_in_url():
+    """Период динамики задан в URL: без date_to он заканчивается сегодня и меняется со сменой дня"""
+    return bool(request.args.get('date_to'))
 
 statistics_bp = Blueprint('statistics', __name__, url_prefix='/api/statistics')
 
 
 @statistics_bp.route('/', methods=['GET'])
+@conditional_get(*STATISTICS_TABLES)
 def get_all_statistics():
-    """Получить всю статистику"""
+    """Получить всю статистику (из снимка statistics_snapshot)"""
     try:
-        completed_count = StatisticsService.get_completed_requests_count()
-        average_time = StatisticsService.get_average_completion_time()
-        by_equipment = StatisticsService.get_statistics_by_equipment_type()
-        workload = StatisticsService.get_specialist_workload()
-
-        return jsonify({
-            'completed_requests': completed_count,
-            'average_completion_time': average_time,
-            'equipment_statistics': by_equipment,
-            'specialist_workload': workload
-        }), 200
+        result = StatisticsSnapshotService.get_dashboard()
+        if 'error' in result:
+            return jsonify(result), 500
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @statistics_bp.route('/completed-count', methods=['GET'])
+@conditional_get(*STATISTICS_TABLES)
 def get_completed_count():
-    result = StatisticsService.get_completed_requests_count()
-    return jsonify(result), 200
+    result = StatisticsSnapshotService.get_dashboard()
+    if 'error' in result:
+        return jsonify(result), 500
+    return jsonify(result['completed_requests']), 200
 
 @statistics_bp.route('/average-time', methods=['GET'])
+@conditional_get(*STATISTICS_TABLES)
 def get_average_time():
-    result = StatisticsService.get_average_completion_time()
+    """Срок выполнения заявок: ?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD&equipment_type=..."""
+    try:
+        date_from = request.args.get('date_from', None)
+        date_to = request.args.get('date_to', None)
+        date_from = date.fromisoformat(date_from) if date_from else None
+        date_to = date.fromisoformat(date_to) if date_to else None
+    except ValueError:
+        return jsonify({'error': 'Invalid date format, expected YYYY-MM-DD'}), 400
+    equipment_type = request.args.get('equipment_type', None)
+
+    if not (date_from or date_to or equipment_type):
+        result = StatisticsSnapshotService.get_dashboard()
+        if 'error' in result:
+            return jsonify(result), 500
+        return jsonify(result['average_completion_time']), 200
+
+    result = StatisticsService.get_average_completion_time(
+        date_from=date_from,
+        date_to=date_to,
+        equipment_type=equipment_type
+    )
+    if 'error' in result:
+        return jsonify(result), 500
     return jsonify(result), 200
 
 @statistics_bp.route('/by-equipment-type', methods=['GET'])
+@conditional_get(*STATISTICS_TABLES)
 def get_by_equipment_type():
-    result = StatisticsService.get_statistics_by_equipment_type()
-    return jsonify(result), 200
+    result = StatisticsSnapshotService.get_dashboard()
+    if 'error' in result:
+        return jsonify(result), 500
+    return jsonify(result['equipment_statistics']), 200
 
 @statistics_bp.route('/specialist-workload', methods=['GET'])
+@conditional_get(*STATISTICS_TABLES)
 def get_specialist_workload():
-    result = StatisticsService.get_specialist_workload()
-    return jsonify(result), 200
+    result = StatisticsSnapshotService.get_dashboard()
+    if 'error' in result:
+        return jsonify(result), 500
+    return jsonify(result['specialist_workload']), 200
+
+
+
+# ============================================================================
+# GET /api/statistics/timeseries - Динамика по дням / неделям / месяцам
+# ============================================================================
+
+@statistics_bp.route('/timeseries', methods=['GET'])
+@conditional_get(*STATISTICS_TABLES, when=_period_in_url)
+def get_timeseries():
+    """
+    Принятые и выполненные заявки, средний срок и незакрытые на конец периода:
+    ?granularity=day|week|month&date_from=&date_to=&equipment_type=&master_id=
+    &group_by=equipment_type|master. Читаются только дневные сводки statistics_daily;
+    до flask statistics backfill-rollups - 503.
+    """
+    return _timeseries_response(request.args.get('group_by') or None)
+
+@statistics_bp.route('/timeseries/by-equipment-type', methods=['GET'])
+@conditional_get(*STATISTICS_TABLES, when=_period_in_url)
+def get_timeseries_by_equipment_type():
+    return _timeseries_response('equipment_type')
+
+@statistics_bp.route('/timeseries/by-specialist', methods=['GET'])
+@conditional_get(*STATISTICS_TABLES, when=_period_in_url)
+def get_timeseries_by_specialist():
+    return _timeseries_response('master')
+
+
+def _timeseries_response(group_by):
+    try:
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in TIMESERIES_GRANULARITIES:
+            return jsonify({'error': f'Invalid granularity, expected one of: {", ".join(TIMESERIES_GRANULARITIES)}'}), 400
+        if group_by not in (None,) + TIMESERIES_GROUPS:
+            return jsonify({'error': f'Invalid group_by, expected one of: {", ".join(TIMESERIES_GROUPS)}'}), 400
+
+        try:
+            date_to = request.args.get('date_to', None)
+            date_to = date.fromisoformat(date_to) if date_to else date.today()
+            date_from = request.args.get('date_from', None)
+            date_from = date.fromisoformat(date_from) if date_from else date_to - timedelta(days=DEFAULT_TIMESERIES_DAYS - 1)
+        except ValueError:
+            return jsonify({'error': 'Invalid date format, expected YYYY-MM-DD'}), 400
+        if date_from > date_to:
+            return jsonify({'error': 'date_from is later than date_to'}), 400
+        if (date_to - date_from).days >= MAX_TIMESERIES_DAYS:
+            return jsonify({'error': f'Period is longer than {MAX_TIMESERIES_DAYS} days'}), 400
+
+        master_id = request.args.get('master_id', None)
+        if master_id is not None:
+            try:
+                master_id = int(master_id)
+            except ValueError:
+                return jsonify({'error': 'Invalid master_id'}), 400
+
+        result = StatisticsRollupService.timeseries(
+            granularity=granularity,
+            date_from=date_from,
+            date_to=date_to,
+            equipment_type=request.args.get('equipment_type', None),
+            master_id=master_id,
+            group_by=group_by
+        )
+        if result.get('built') is False:
+            return jsonify({'error': result['error']}), 503
+        if 'error' in result:
+            return jsonify(result), 500
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ============================================================================
+# flask statistics rebuild-snapshot / check-snapshot
+# ============================================================================
+
+@statistics_bp.cli.command('rebuild-snapshot')
+def rebuild_snapshot_command():
+    """Пересобрать снимок статистики с нуля"""
+    result = StatisticsSnapshotService.rebuild()
+    if 'error' in result:
+        raise click.ClickException(result['error'])
+    click.echo(f"Snapshot rebuilt: {result['counters']} counters")
+
+
+@statistics_bp.cli.command('check-snapshot')
+def check_snapshot_command():
+    """Сравнить снимок статистики с пересчётом с нуля"""
+    result = StatisticsSnapshotService.check()
+    if 'error' in result:
+        raise click.ClickException(result['error'])
+    if not result['built']:
+        raise click.ClickException('Snapshot is not built, run "flask statistics rebuild-snapshot"')
+    for diff in result['differences']:
+        click.echo(f"{diff['metric']}[{diff['key']}]: snapshot={diff['snapshot']} actual={diff['actual']}")
+    if not result['consistent']:
+        raise click.ClickException(f"Snapshot is inconsistent: {len(result['differences'])} differences")
+    click.echo('Snapshot is consistent')
+
+
+# ============================================================================
+# flask statistics backfill-rollups / check-rollups
+# ============================================================================
+
+@statistics_bp.cli.command('backfill-rollups')
+@click.option('--chunk-size', type=int, default=ROLLUP_BACKFILL_CHUNK, show_default=True,
+              help='заявок в одной транзакции')
+@click.option('--restart', is_flag=True, help='удалить дневные сводки и заполнить заново')
+def backfill_rollups_command(chunk_size, restart):
+    """Заполнить дневные сводки statistics_daily по истории заявок (можно прервать и продолжить)"""
+    def progress(chunks, requests, watermark):
+        click.echo(f"chunk {chunks}: {requests} requests, up to request_id {watermark}")
+
+    result = StatisticsRollupService.backfill(chunk_size=max(1, chunk_size), restart=restart, progress=progress)
+    if 'error' in result:
+        raise click.ClickException(result['error'])
+    click.echo(f"{result['message']}: {result['requests']} requests in {result['chunks']} chunks")
+
+
+@statistics_bp.cli.command('check-rollups')
+def check_rollups_command():
+    """Сравнить дневные сводки с пересчётом по repair_requests"""
+    result = StatisticsRollupService.check()
+    if 'error' in result:
+        raise click.ClickException(result['error'])
+    if not result['built']:
+        raise click.ClickException(ROLLUPS_NOT_BUILT)
+    for diff in result['differences'][:50]:
+        click.echo(f"{diff['day']} {diff['climate_tech_type']} master={diff['master_id']} "
+                   f"{diff['column']}: rollup={diff['rollup']} actual={diff['actual']}")
+    if not result['consistent']:
+        raise click.ClickException(f"Rollups are inconsistent: {len(result['differences'])} differences")
+    click.echo('Rollups are consistent')
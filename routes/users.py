@@ -2,17 +2,26 @@ from flask import Blueprint, request, jsonify
 
 from middleware.auth_middleware import require_auth
 from services.user_service import UserService
+from services.auth_service import AuthService
+from services.table_version_service import TableVersionService
+from services.user_search_service import UserSearchService, USER_SEARCH_LIMIT
+from services.pagination import clamp_limit
+from middleware.conditional_get import conditional_get
 from models.user import User
 from database import db
 
 users_bp = Blueprint("users", __name__, url_prefix="/api/users")
 
+# Роли, которым поиск показывает любых пользователей (остальным - только специалистов)
+USER_SEARCH_ROLES = ("Менеджер", "Оператор")
+
 
 # ============================================================================
 # GET /api/users/        - Получить всех пользователей (только Менеджер)
 # ============================================================================
 @users_bp.route("/", methods=["GET"])
 @require_auth
+@conditional_get("users")
 def get_all_users(current_user):
     """Получить всех пользователей (только для Менеджера)."""
     try:
@@ -60,6 +69,7 @@ def get_user(user_id, current_user):
 # ============================================================================
 @users_bp.route("/specialists", methods=["GET"])
 @require_auth
+@conditional_get("users")
 def get_specialists(current_user):
     """Получить всех специалистов."""
     try:
@@ -69,6 +79,36 @@ def get_specialists(current_user):
         return jsonify({"error": str(e)}), 500
 
 
+# ============================================================================
+# GET /api/users/search?q=  - Подсказки при выборе пользователя
+# ============================================================================
+@users_bp.route("/search", methods=["GET"])
+@require_auth
+def search_users(current_user):
+    """
+    Поиск пользователей по ФИО, логину или телефону (?q=), лучшие ?limit= совпадений.
+    ?role= (можно несколько) ограничивает роли. Менеджер и Оператор ищут среди всех,
+    остальные - только среди специалистов.
+    """
+    try:
+        query_text = request.args.get("q", "").strip()
+        if not query_text:
+            return jsonify({"error": "q is required"}), 400
+
+        limit = clamp_limit(request.args.get("limit", USER_SEARCH_LIMIT, type=int), default=USER_SEARCH_LIMIT)
+
+        roles = request.args.getlist("role")
+        if current_user.get("user_type") not in USER_SEARCH_ROLES:
+            if any(role != "Специалист" for role in roles):
+                return jsonify({"error": "Permission denied"}), 403
+            roles = ["Специалист"]
+
+        result = UserSearchService.search(query_text, roles, limit)
+        return jsonify({"data": result}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # ============================================================================
 # POST /api/users/        - Создать нового пользователя (только Менеджер)
 # ============================================================================
@@ -146,7 +186,10 @@ def delete_user(user_id, current_user):
             return jsonify({"error": "Cannot delete yourself"}), 400
 
         db.session.delete(user)
+        TableVersionService.bump("users")
+        UserService.invalidate_user(user_id)
         db.session.commit()
+        UserService.invalidate_user(user_id)
 
         return jsonify({"message": "User deleted successfully", "user_id": user_id}), 200
     except Exception as e:
@@ -179,15 +222,16 @@ def update_user(user_id, current_user):
         if "phone" in data:
             user.phone = data["phone"]
         if "password" in data:
-            from werkzeug.security import generate_password_hash
-
-            user.password = generate_password_hash(data["password"])
+            user.password = AuthService.hash_password(data["password"])
 
         # Только Менеджер может менять роль
         if "user_type" in data and current_user.get("user_type") == "Менеджер":
             user.user_type = data["user_type"]
 
+        TableVersionService.bump("users")
+        UserService.invalidate_user(user_id)
         db.session.commit()
+        UserService.invalidate_user(user_id)
 
         return jsonify({"message": "User updated successfully", "user": user.to_dict()}), 200
     except Exception as e:
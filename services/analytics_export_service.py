@@ -0,0 +1,390 @@
+"""
+Выгрузка заявок для квартальной отчётности: колонки NumPy и сводные показатели.
+
+Заявки читаются пачками напрямую через engine по таблице RepairRequest
+(без Flask-приложения), даты переводятся в порядковые номера дней,
+статус / тип / модель - в коды справочников. Распределение сроков выполнения,
+частота обращений по моделям и производительность специалистов считаются
+векторно по этим колонкам. Результат - .npz (или Parquet при наличии pyarrow)
+и сводка JSON в stdout:
+
+    python -m services.analytics_export_service --quarter 2026Q3 -o report-2026Q3.npz
+    python -m services.analytics_export_service --database-url sqlite:///local.db \\
+        --date-from 2026-01-01 --date-to 2026-06-30 --format parquet -o report.parquet
+"""
+
+import argparse
+import json
+import sys
+from datetime import date
+
+import numpy as np
+from sqlalchemy import create_engine, select
+
+from config import Config
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pip install pyarrow - для --format parquet
+    pa = pq = None
+
+EXPORT_FORMATS = ('npz', 'parquet')
+
+# Колонки выгрузки и их типы; даты - date.toordinal(), справочные поля - коды
+COLUMN_DTYPES = {
+    'request_id': 'int64',
+    'client_id': 'int32',
+    'master_id': 'int32',
+    'start_day': 'int32',
+    'completion_day': 'int32',
+    'request_status': 'int16',
+    'climate_tech_type': 'int16',
+    'climate_tech_model': 'int32',
+}
+CATEGORICAL_FIELDS = ('request_status', 'climate_tech_type', 'climate_tech_model')
+
+# Заявка не завершена / мастер не назначен (порядковые номера дней и id начинаются с 1)
+NO_DATE = 0
+NO_MASTER = 0
+
+# date.toordinal() дня 1970-01-01 - начало отсчёта datetime64[D]
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+TURNAROUND_PERCENTILES = (50, 75, 90, 95, 99)
+
+
+class RequestColumns:
+    """
+    Заявки по колонкам (COLUMN_DTYPES). completion_day == NO_DATE - не завершена,
+    master_id == NO_MASTER - не назначена; коды справочных полей - индексы в categories[поле].
+    """
+
+    def __init__(self, arrays, categories):
+        self.arrays = arrays
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.arrays['request_id'])
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def completed(self):
+        """(маска завершённых заявок, срок выполнения в днях для них)"""
+        done = self.arrays['completion_day'] != NO_DATE
+        return done, self.arrays['completion_day'][done] - self.arrays['start_day'][done]
+
+
+class AnalyticsExportService:
+    @staticmethod
+    def load_columns(engine, date_from=None, date_to=None, chunk_size=Config.ANALYTICS_EXPORT_CHUNK):
+        """Прочитать заявки (фильтр по дате приёма) пачками по chunk_size -> RequestColumns"""
+        from models.repair_request import RepairRequest
+
+        table = RepairRequest.__table__
+        statement = select(
+            table.c.request_id, table.c.client_id, table.c.master_id, table.c.start_date,
+            table.c.completion_date, table.c.request_status, table.c.climate_tech_type,
+            table.c.climate_tech_model
+        ).order_by(table.c.request_id)
+        if date_from:
+            statement = statement.where(table.c.start_date >= date_from)
+        if date_to:
+            statement = statement.where(table.c.start_date <= date_to)
+
+        vocabularies = {field: {} for field in CATEGORICAL_FIELDS}
+        chunks = {name: [] for name in COLUMN_DTYPES}
+        with engine.connect() as connection:
+            # yield_per: в PostgreSQL - серверный курсор, в память попадает одна пачка строк
+            result = connection.execution_options(yield_per=chunk_size).execute(statement)
+            for rows in result.partitions():
+                (request_ids, client_ids, master_ids, start_dates, completion_dates,
+                 statuses, tech_types, tech_models) = zip(*rows)
+                chunks['request_id'].append(np.array(request_ids, dtype=COLUMN_DTYPES['request_id']))
+                chunks['client_id'].append(np.array(client_ids, dtype=COLUMN_DTYPES['client_id']))
+                chunks['master_id'].append(np.fromiter(
+                    (master_id or NO_MASTER for master_id in master_ids),
+                    dtype=COLUMN_DTYPES['master_id'], count=len(rows)
+                ))
+                chunks['start_day'].append(_day_ordinals(start_dates))
+                chunks['completion_day'].append(_day_ordinals(completion_dates))
+                for field, values in zip(CATEGORICAL_FIELDS, (statuses, tech_types, tech_models)):
+                    chunks[field].append(_encode(values, vocabularies[field], COLUMN_DTYPES[field]))
+
+        arrays = {
+            name: np.concatenate(parts) if parts else np.empty(0, dtype=COLUMN_DTYPES[name])
+            for name, parts in chunks.items()
+        }
+        categories = {field: list(vocabulary) for field, vocabulary in vocabularies.items()}
+        return RequestColumns(arrays, categories)
+
+    @staticmethod
+    def turnaround_distribution(columns):
+        """Сроки выполнения завершённых заявок: среднее, перцентили, гистограмма, по типам оборудования"""
+        done, days = columns.completed()
+        types = columns['climate_tech_type'][done]
+        type_names = columns.categories['climate_tech_type']
+        result = {
+            'completed_count': int(days.size),
+            'avg_days': None,
+            'percentiles': {},
+            # histogram[d] - заявок, выполненных за d дней (отрицательный срок - ошибка данных, в 0)
+            'histogram': np.bincount(np.maximum(days, 0)) if days.size else np.zeros(0, dtype=np.int64),
+            'by_equipment_type': [],
+        }
+        if not days.size:
+            return result
+
+        # linear - та же интерполяция, что percentile_cont в StatisticsService
+        result['avg_days'] = round(float(days.mean()), 1)
+        result['percentiles'] = {
+            f'p{p}': round(float(value), 1)
+            for p, value in zip(TURNAROUND_PERCENTILES, np.percentile(days, TURNAROUND_PERCENTILES))
+        }
+
+        # Группы по типу: сортировка (тип, срок), медиана каждого отрезка
+        counts = np.bincount(types, minlength=len(type_names))
+        sums = np.bincount(types, weights=days, minlength=len(type_names))
+        sorted_days = days[np.lexsort((days, types))]
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        for code in np.flatnonzero(counts):
+            result['by_equipment_type'].append({
+                'equipment_type': type_names[code],
+                'completed_count': int(counts[code]),
+                'avg_days': round(float(sums[code] / counts[code]), 1),
+                'median_days': round(float(np.median(sorted_days[bounds[code]:bounds[code + 1]])), 1),
+            })
+        return result
+
+    @staticmethod
+    def model_failure_frequencies(columns, period_days):
+        """
+        Обращения по моделям: число, доля от всех и от своего типа, в месяц, средний срок.
+        Группа - пара (тип, модель): одно название модели у разных типов техники - разные строки.
+        """
+        model_names = columns.categories['climate_tech_model']
+        type_names = columns.categories['climate_tech_type']
+        done, days = columns.completed()
+
+        # Код пары (тип, модель) -> номер группы
+        pair_codes = columns['climate_tech_type'].astype(np.int64) * len(model_names) + columns['climate_tech_model']
+        pairs, groups = np.unique(pair_codes, return_inverse=True)
+        groups = groups.reshape(-1)
+        pair_types, pair_models = np.divmod(pairs, max(len(model_names), 1))
+
+        requests = np.bincount(groups, minlength=len(pairs))
+        completed = np.bincount(groups[done], minlength=len(pairs))
+        days_sum = np.bincount(groups[done], weights=days, minlength=len(pairs))
+        type_requests = np.bincount(columns['climate_tech_type'], minlength=len(type_names))
+        months = max(period_days, 1) / 30.4375
+
+        result = []
+        for i in np.argsort(-requests, kind='stable'):
+            result.append({
+                'model': model_names[pair_models[i]],
+                'equipment_type': type_names[pair_types[i]],
+                'requests': int(requests[i]),
+                'share': round(float(requests[i] / len(columns)), 4),
+                'share_of_type': round(float(requests[i] / type_requests[pair_types[i]]), 4),
+                'per_month': round(float(requests[i] / months), 2),
+                'completed': int(completed[i]),
+                'avg_completion_days': round(float(days_sum[i] / completed[i]), 1) if completed[i] else None,
+            })
+        return result
+
+    @staticmethod
+    def specialist_throughput(columns, period_days):
+        """По специалистам: назначено, выполнено, в работе, выполнено в неделю, средний срок"""
+        assigned = columns['master_id'] != NO_MASTER
+        done = columns['completion_day'] != NO_DATE
+        master_ids, inverse = np.unique(columns['master_id'][assigned], return_inverse=True)
+        inverse = inverse.reshape(-1)
+        done_assigned = done[assigned]
+        days = (columns['completion_day'] - columns['start_day'])[assigned][done_assigned]
+
+        assigned_count = np.bincount(inverse, minlength=len(master_ids))
+        completed = np.bincount(inverse[done_assigned], minlength=len(master_ids))
+        days_sum = np.bincount(inverse[done_assigned], weights=days, minlength=len(master_ids))
+        weeks = max(period_days, 1) / 7
+
+        result = []
+        for i in np.argsort(-completed, kind='stable'):
+            result.append({
+                'specialist_id': int(master_ids[i]),
+                'assigned': int(assigned_count[i]),
+                'completed': int(completed[i]),
+                'open': int(assigned_count[i] - completed[i]),
+                'completed_per_week': round(float(completed[i] / weeks), 2),
+                'avg_completion_days': round(float(days_sum[i] / completed[i]), 1) if completed[i] else None,
+            })
+        return result
+
+    @staticmethod
+    def export(database_url, output, file_format='npz', date_from=None, date_to=None,
+               chunk_size=Config.ANALYTICS_EXPORT_CHUNK):
+        """Выгрузить колонки и показатели в output; возвращает сводку (dict) или {'error': ...}"""
+        try:
+            if file_format not in EXPORT_FORMATS:
+                raise ValueError(f'Invalid format, expected one of: {", ".join(EXPORT_FORMATS)}')
+            if file_format == 'parquet' and pa is None:
+                raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+
+            engine = create_engine(database_url)
+            try:
+                columns = AnalyticsExportService.load_columns(engine, date_from, date_to, chunk_size)
+                period_days = _period_days(columns, date_from, date_to)
+                turnaround = AnalyticsExportService.turnaround_distribution(columns)
+                models = AnalyticsExportService.model_failure_frequencies(columns, period_days)
+                specialists = AnalyticsExportService.specialist_throughput(columns, period_days)
+                names = _specialist_names(engine, [item['specialist_id'] for item in specialists])
+            finally:
+                engine.dispose()
+            for item in specialists:
+                item['specialist_name'] = names.get(item['specialist_id'])
+
+            if file_format == 'npz':
+                _write_npz(output, columns, turnaround, models, specialists)
+            else:
+                _write_parquet(output, columns)
+
+            histogram = turnaround.pop('histogram')
+            return {
+                'output': str(output),
+                'format': file_format,
+                'date_from': date_from.isoformat() if date_from else None,
+                'date_to': date_to.isoformat() if date_to else None,
+                'period_days': period_days,
+                'requests': len(columns),
+                'turnaround': dict(turnaround, max_days=int(len(histogram) - 1) if len(histogram) else None),
+                'models': models,
+                'specialists': specialists,
+            }
+        except Exception as e:
+            return {'error': str(e)}
+
+
+def _day_ordinals(values):
+    """Даты (None - нет даты) -> date.toordinal() с NO_DATE вместо None"""
+    days = np.array(values, dtype='datetime64[D]')
+    ordinals = days.astype(np.int64) + EPOCH_ORDINAL
+    ordinals[np.isnat(days)] = NO_DATE
+    return ordinals.astype(COLUMN_DTYPES['start_day'])
+
+
+def _encode(values, vocabulary, dtype):
+    """
+    Строки -> коды справочника vocabulary (значение -> код, пополняется новыми).
+    Словарь обходится только по различным значениям пачки, строки кодируются через np.unique.
+    """
+    distinct, inverse = np.unique(np.array(values, dtype=object), return_inverse=True)
+    codes = np.fromiter(
+        (vocabulary.setdefault(value, len(vocabulary)) for value in distinct), dtype=dtype, count=len(distinct)
+    )
+    return codes[inverse.reshape(-1)]
+
+
+def _period_days(columns, date_from, date_to):
+    """Длина отчётного периода в днях: заданные границы или от первой до последней даты в данных"""
+    if not len(columns):
+        first = last = None
+    else:
+        completion = columns['completion_day'][columns['completion_day'] != NO_DATE]
+        first = int(columns['start_day'].min())
+        last = int(max(columns['start_day'].max(), completion.max() if completion.size else 0))
+    first = date_from.toordinal() if date_from else first
+    last = date_to.toordinal() if date_to else last
+    if first is None or last is None:
+        return 0
+    return max(last - first + 1, 0)
+
+
+def _specialist_names(engine, user_ids):
+    from models.user import User
+
+    if not user_ids:
+        return {}
+    table = User.__table__
+    with engine.connect() as connection:
+        return dict(connection.execute(
+            select(table.c.user_id, table.c.full_name).where(table.c.user_id.in_(user_ids))
+        ).all())
+
+
+def _write_npz(output, columns, turnaround, models, specialists):
+    """Колонки, справочники (<поле>_categories) и показатели в сжатый .npz"""
+    arrays = dict(columns.arrays)
+    for field, values in columns.categories.items():
+        arrays[f'{field}_categories'] = np.array(values, dtype=str)
+    arrays['turnaround_histogram'] = turnaround['histogram']
+    arrays['model_names'] = np.array([item['model'] for item in models], dtype=str)
+    arrays['model_equipment_types'] = np.array([item['equipment_type'] for item in models], dtype=str)
+    arrays['model_requests'] = np.array([item['requests'] for item in models], dtype=np.int64)
+    arrays['specialist_ids'] = np.array([item['specialist_id'] for item in specialists], dtype=np.int32)
+    arrays['specialist_completed'] = np.array([item['completed'] for item in specialists], dtype=np.int64)
+    arrays['specialist_assigned'] = np.array([item['assigned'] for item in specialists], dtype=np.int64)
+    np.savez_compressed(output, **arrays)
+
+
+def _write_parquet(output, columns):
+    """Колонки в Parquet: справочные поля - dictionary, даты - date32 (null - нет даты)"""
+    fields = {}
+    for name in ('request_id', 'client_id'):
+        fields[name] = pa.array(columns[name])
+    fields['master_id'] = pa.array(columns['master_id'], mask=columns['master_id'] == NO_MASTER)
+    for name, field in (('start_day', 'start_date'), ('completion_day', 'completion_date')):
+        fields[field] = pa.array(
+            columns[name] - EPOCH_ORDINAL, mask=columns[name] == NO_DATE
+        ).cast(pa.date32())
+    for field in CATEGORICAL_FIELDS:
+        fields[field] = pa.DictionaryArray.from_arrays(
+            pa.array(columns[field]), pa.array(columns.categories[field], type=pa.string())
+        )
+    pq.write_table(pa.table(fields), output, compression='zstd')
+
+
+def _quarter_bounds(value):
+    """'2026Q3' -> (date(2026, 7, 1), date(2026, 9, 30))"""
+    year, _, quarter = value.upper().partition('Q')
+    year, quarter = int(year), int(quarter)
+    if not 1 <= quarter <= 4:
+        raise ValueError(f'Invalid quarter: {value}')
+    start = date(year, 3 * quarter - 2, 1)
+    end = date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+    return start, date.fromordinal(end.toordinal() - 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-o', '--output', required=True, help='файл выгрузки (.npz или .parquet)')
+    parser.add_argument('--database-url', default=Config.SQLALCHEMY_DATABASE_URI,
+                        help='БД (по умолчанию DATABASE_URL из окружения / .env)')
+    parser.add_argument('--format', dest='file_format', choices=EXPORT_FORMATS, default=None,
+                        help='формат (по умолчанию - по расширению файла)')
+    parser.add_argument('--quarter', help='отчётный квартал, например 2026Q3')
+    parser.add_argument('--date-from', type=date.fromisoformat, help='дата приёма с (YYYY-MM-DD)')
+    parser.add_argument('--date-to', type=date.fromisoformat, help='дата приёма по (YYYY-MM-DD)')
+    parser.add_argument('--chunk-size', type=int, default=Config.ANALYTICS_EXPORT_CHUNK,
+                        help='заявок в одной пачке чтения')
+    args = parser.parse_args(argv)
+
+    date_from, date_to = args.date_from, args.date_to
+    if args.quarter:
+        try:
+            date_from, date_to = _quarter_bounds(args.quarter)
+        except ValueError:
+            parser.error(f'invalid --quarter: {args.quarter} (expected e.g. 2026Q3)')
+    file_format = args.file_format or ('parquet' if args.output.lower().endswith('.parquet') else 'npz')
+
+    summary = AnalyticsExportService.export(
+        args.database_url, args.output, file_format, date_from, date_to, max(1, args.chunk_size)
+    )
+    if 'error' in summary:
+        print(f"Ошибка: {summary['error']}", file=sys.stderr)
+        return 1
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
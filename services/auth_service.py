@@ -1,65 +1,72 @@
 ﻿# services/auth_service.py
 
+import hmac
 import jwt
+import uuid
 import datetime
 from models.user import User
 from database import db
 from config import Config
-from werkzeug.security import check_password_hash
+from werkzeug.security import check_password_hash, generate_password_hash
 
 
 class AuthService:
     SECRET_KEY = 'your-secret-key-change-in-production'
     ALGORITHM = 'HS256'
+    # aud билета потока событий: verify_token (без audience) такой JWT не примет
+    STREAM_TICKET_AUDIENCE = 'events-stream'
+
+    @staticmethod
+    def password_hash_method():
+        return f'pbkdf2:sha256:{Config.PASSWORD_HASH_ITERATIONS}'
+
+    @staticmethod
+    def hash_password(password: str):
+        return generate_password_hash(password, method=AuthService.password_hash_method())
+
+    @staticmethod
+    def check_password(stored: str, password: str):
+        """
+        Проверить пароль. Возвращает (верен, нужно перехешировать).
+        Поддерживает устаревшие пароли открытым текстом из начальных данных.
+        """
+        method = stored.split('$', 1)[0] if '$' in stored else None
+        if method and method.startswith(('pbkdf2:', 'scrypt')):
+            if not check_password_hash(stored, password):
+                return False, False
+            return True, method != AuthService.password_hash_method()
+
+        # Старый формат - открытый текст
+        return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8')), True
+
+    @staticmethod
+    def authenticate(login: str, password: str):
+        """
+        Найти пользователя и проверить пароль (None - неверный логин или пароль).
+        При успешном входе пароль открытым текстом или с устаревшими параметрами
+        хеша прозрачно переводится на текущую схему.
+        """
+        user = User.query.filter_by(login=login).first()
+        if not user:
+            return None
+
+        password_valid, needs_rehash = AuthService.check_password(user.password, password)
+        if not password_valid:
+            return None
+
+        if needs_rehash:
+            user.password = AuthService.hash_password(password)
+            db.session.commit()
+
+        return user
 
     @staticmethod
     def login_user(login: str, password: str):
         try:
-            user = User.query.filter_by(login=login).first()
-
+            user = AuthService.authenticate(login, password)
             if not user:
                 return {'error': 'Invalid login or password'}, 401
 
-            # === DEBUG OUTPUT ===
-            print("\n" + "=" * 70)
-            print(f"LOGIN ATTEMPT: {login}")
-            print(f"Password from DB (first 40 chars): {user.password[:40]}")
-            print(f"Password from DB length: {len(user.password)}")
-            print(f"Entered password: '{password}'")
-            print(f"Entered password length: {len(password)}")
-            print("=" * 70)
-
-            password_valid = False
-
-            # Check hashed password
-            if len(user.password) > 20:
-                try:
-                    result = check_password_hash(user.password, password)
-                    print(f"check_password_hash result: {result}")
-                    if result:
-                        password_valid = True
-                        print("SUCCESS: Hash check passed!")
-                    else:
-                        print("FAIL: Hash check failed!")
-                except Exception as e:
-                    print(f"ERROR in check_password_hash: {e}")
-
-            # Check plain text
-            if not password_valid:
-                if user.password == password:
-                    password_valid = True
-                    print("SUCCESS: Plain text match!")
-                else:
-                    print("FAIL: Plain text mismatch!")
-
-            if not password_valid:
-                print("AUTHENTICATION FAILED!")
-                print("=" * 70 + "\n")
-                return {'error': 'Invalid login or password'}, 401
-
-            print("AUTHENTICATION SUCCESS!")
-            print("=" * 70 + "\n")
-
             token = AuthService.generate_token(user)
 
             return {
@@ -73,9 +80,7 @@ class AuthService:
             }, 200
 
         except Exception as e:
-            print(f"CRITICAL ERROR: {e}")
-            import traceback
-            traceback.print_exc()
+            db.session.rollback()
             return {'error': str(e)}, 500
 
     @staticmethod
@@ -85,7 +90,8 @@ class AuthService:
             'login': user.login,
             'user_type': user.user_type,
             'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24),
-            'iat': datetime.datetime.utcnow()
+            'iat': datetime.datetime.utcnow(),
+            'jti': uuid.uuid4().hex
         }
         return jwt.encode(payload, AuthService.SECRET_KEY, algorithm=AuthService.ALGORITHM)
 
@@ -99,12 +105,51 @@ class AuthService:
         except jwt.InvalidTokenError:
             return None, 'Invalid token'
 
+    @staticmethod
+    def generate_stream_ticket(payload, ttl):
+        """
+        Короткий билет для GET /api/events/?ticket= (EventSource не передаёт заголовки,
+        а JWT в URL попадает в логи прокси). Живёт ttl секунд, но не дольше токена;
+        в нём пользователь и jti/exp исходного токена - поток следит за его отзывом.
+        """
+        now = datetime.datetime.utcnow()
+        expires = now + datetime.timedelta(seconds=ttl)
+        if payload.get('exp') is not None:
+            expires = min(expires, datetime.datetime.utcfromtimestamp(payload['exp']))
+        ticket = {
+            'aud': AuthService.STREAM_TICKET_AUDIENCE,
+            'exp': expires,
+            'iat': now,
+            'jti': uuid.uuid4().hex,
+            'user': {key: value for key, value in payload.items() if key not in ('exp', 'iat', 'jti')},
+            'token_jti': payload.get('jti'),
+            'token_exp': payload.get('exp'),
+        }
+        return jwt.encode(ticket, AuthService.SECRET_KEY, algorithm=AuthService.ALGORITHM)
+
+    @staticmethod
+    def verify_stream_ticket(ticket: str):
+        """Билет потока -> (payload билета, None) или (None, текст ошибки)"""
+        try:
+            payload = jwt.decode(ticket, AuthService.SECRET_KEY, algorithms=[AuthService.ALGORITHM],
+                                 audience=AuthService.STREAM_TICKET_AUDIENCE)
+            return payload, None
+        except jwt.ExpiredSignatureError:
+            return None, 'Ticket expired'
+        except jwt.InvalidTokenError:
+            return None, 'Invalid ticket'
+
     @staticmethod
     def get_current_user(token: str):
+        """Пользователь по токену -> (dict из кэша пользователей, None) или (None, ошибка)"""
+        from services.user_service import UserService
+
         payload, error = AuthService.verify_token(token)
         if error:
             return None, error
-        user = User.query.get(payload['user_id'])
+        user = UserService.get_user_by_id(payload['user_id'])
         if not user:
             return None, 'User not found'
+        if 'error' in user:
+            return None, user['error']
         return user, None
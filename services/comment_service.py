@@ -1,5 +1,8 @@
 from database import db
 from datetime import datetime
+from sqlalchemy import func, insert, tuple_
+from services.pagination import encode_cursor, decode_cursor
+from services.serialization import comment_serializer
 
 class CommentService:
     @staticmethod
@@ -26,10 +29,126 @@ class CommentService:
             return {'error': str(e)}
     
     @staticmethod
-    def get_comments_by_request(request_id):
+    def get_comments_by_request(request_id, cursor=None, limit=20):
+        """
+        Комментарии заявки по порядку (created_at, comment_id), keyset-пагинация.
+        cursor - next_cursor предыдущей страницы; неверный курсор - ValueError.
+        """
+        position = None
+        if cursor:
+            position = decode_cursor(cursor)
+            try:
+                position = (datetime.fromisoformat(position['c']), int(position['id']))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError('Invalid cursor') from None
+
+        try:
+            from models.comment import Comment
+            query = Comment.query.filter_by(request_id=request_id)
+
+            if position:
+                query = query.filter(tuple_(Comment.created_at, Comment.comment_id) > position)
+
+            comments = query.with_entities(*comment_serializer.columns).order_by(
+                Comment.created_at, Comment.comment_id).limit(limit + 1).all()
+            has_more = len(comments) > limit
+            comments = comments[:limit]
+
+            next_cursor = None
+            if has_more:
+                last = comments[-1]
+                next_cursor = encode_cursor({'c': last.created_at.isoformat(), 'id': last.comment_id})
+
+            return {
+                'data': comment_serializer.many(comments),
+                'pagination': {'limit': limit, 'has_more': has_more, 'next_cursor': next_cursor}
+            }
+        except Exception as e:
+            return {'error': str(e)}
+
+    @staticmethod
+    def get_comment_summaries(request_ids, client_id=None):
+        """
+        Число комментариев и последний комментарий для каждой заявки из списка -
+        одним запросом с оконными функциями. client_id ограничивает заявками заказчика.
+        """
+        try:
+            from models.comment import Comment
+            from models.repair_request import RepairRequest
+
+            ranked = db.session.query(
+                Comment.request_id,
+                Comment.comment_id,
+                Comment.message,
+                Comment.master_id,
+                Comment.created_at,
+                func.count().over(partition_by=Comment.request_id).label('comments_count'),
+                func.row_number().over(
+                    partition_by=Comment.request_id,
+                    order_by=(Comment.created_at.desc(), Comment.comment_id.desc())
+                ).label('position')
+            ).filter(Comment.request_id.in_(request_ids))
+
+            if client_id is not None:
+                ranked = ranked.join(RepairRequest, RepairRequest.request_id == Comment.request_id).filter(
+                    RepairRequest.client_id == client_id
+                )
+
+            ranked = ranked.subquery()
+            rows = db.session.query(ranked).filter(ranked.c.position == 1).all()
+
+            return {
+                row.request_id: {
+                    'comments_count': row.comments_count,
+                    'latest_comment': {
+                        'comment_id': row.comment_id,
+                        'message': row.message,
+                        'master_id': row.master_id,
+                        'created_at': row.created_at.isoformat() if row.created_at else None
+                    }
+                } for row in rows
+            }
+        except Exception as e:
+            return {'error': str(e)}
+
+    @staticmethod
+    def create_comments_batch(master_id, items):
+        """
+        Добавить несколько комментариев одним INSERT.
+        items - [{'request_id': ..., 'message': ...}, ...]
+        """
         try:
             from models.comment import Comment
-            comments = Comment.query.filter_by(request_id=request_id).all()
-            return [c.to_dict() for c in comments]
+            from models.repair_request import RepairRequest
+
+            request_ids = {item['request_id'] for item in items}
+            existing = {
+                request_id for (request_id,) in db.session.query(RepairRequest.request_id).filter(
+                    RepairRequest.request_id.in_(request_ids))
+            }
+            missing = sorted(request_ids - existing)
+            if missing:
+                return {'error': 'Requests not found', 'request_ids': missing}
+
+            created_at = datetime.utcnow()
+            rows = db.session.execute(
+                insert(Comment).returning(Comment.comment_id, Comment.request_id, sort_by_parameter_order=True),
+                [{
+                    'message': item['message'],
+                    'master_id': master_id,
+                    'request_id': item['request_id'],
+                    'created_at': created_at
+                } for item in items]
+            ).all()
+            db.session.commit()
+
+            return [{
+                'comment_id': comment_id,
+                'message': item['message'],
+                'master_id': master_id,
+                'request_id': request_id,
+                'created_at': created_at.isoformat()
+            } for (comment_id, request_id), item in zip(rows, items)]
         except Exception as e:
+            db.session.rollback()
             return {'error': str(e)}
@@ -0,0 +1,340 @@
+import json
+import queue
+import socket
+import socketserver
+import threading
+import time
+import uuid
+
+from config import Config
+
+# Очередь исходящих строк: воркер -> брокер и брокер -> каждый воркер
+BROKER_QUEUE_SIZE = 1000
+
+
+class Subscription:
+    """
+    Подписка одного SSE-клиента: ограниченная очередь + фильтр по роли.
+    Если клиент не успевает читать и очередь переполнилась, подписка
+    помечается overflowed и отключается - клиент догоняет через
+    /api/requests/changes, а публикующий код никогда не ждёт.
+    """
+
+    def __init__(self, accepts, maxsize):
+        self.accepts = accepts
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            return False
+
+    def get(self, timeout):
+        """Следующее событие или None, если за timeout секунд ничего не пришло"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class MemoryBackend:
+    """События видны только внутри процесса (один воркер, разработка)"""
+
+    def start(self, deliver):
+        pass
+
+    def publish(self, event):
+        pass
+
+    def stats(self):
+        return {'backend': 'memory'}
+
+
+class BrokerBackend:
+    """
+    Пересылка событий между воркерами через локальный брокер (flask events broker).
+    Каждый воркер держит одно TCP-соединение: свои события кладёт в ограниченную
+    очередь, откуда их строками JSON отправляет фоновый поток (publish не ждёт сеть),
+    в другом фоновом потоке принимает чужие. Брокер недоступен или очередь полна -
+    событие остаётся локальным, соединение восстанавливается раз в reconnect_interval секунд.
+    """
+
+    def __init__(self, address, reconnect_interval=2.0, outbox_size=BROKER_QUEUE_SIZE):
+        host, port = address.rsplit(':', 1)
+        self.address = (host, int(port))
+        self.reconnect_interval = reconnect_interval
+        self.origin = uuid.uuid4().hex
+        self._sock = None
+        self._lock = threading.Lock()
+        self._outbox = queue.Queue(maxsize=outbox_size)
+        self._deliver = None
+        self.dropped = 0
+
+    def start(self, deliver):
+        self._deliver = deliver
+        threading.Thread(target=self._read_loop, name='event-broker-reader', daemon=True).start()
+        threading.Thread(target=self._write_loop, name='event-broker-writer', daemon=True).start()
+
+    def publish(self, event):
+        line = (json.dumps({'origin': self.origin, 'event': event}, ensure_ascii=False) + '\n').encode('utf-8')
+        try:
+            self._outbox.put_nowait(line)
+        except queue.Full:
+            self._count_dropped()
+
+    def stats(self):
+        return {
+            'backend': 'broker',
+            'address': '%s:%d' % self.address,
+            'connected': self._sock is not None,
+            'queued': self._outbox.qsize(),
+            'dropped': self.dropped,
+        }
+
+    def _write_loop(self):
+        while True:
+            line = self._outbox.get()
+            with self._lock:
+                sock = self._sock
+            if sock is None:
+                self._count_dropped()
+                continue
+            # Пишет только этот поток; блокировка на время отправки не держится
+            try:
+                sock.sendall(line)
+            except OSError:
+                with self._lock:
+                    if self._sock is sock:
+                        self._close()
+                self._count_dropped()
+
+    def _count_dropped(self):
+        with self._lock:
+            self.dropped += 1
+
+    def _read_loop(self):
+        while True:
+            try:
+                sock = socket.create_connection(self.address, timeout=5)
+                sock.settimeout(None)
+            except OSError:
+                time.sleep(self.reconnect_interval)
+                continue
+
+            with self._lock:
+                self._sock = sock
+            try:
+                for line in sock.makefile('rb'):
+                    message = json.loads(line)
+                    if message.get('origin') != self.origin:
+                        self._deliver(message['event'])
+            except (OSError, ValueError):
+                pass
+            with self._lock:
+                if self._sock is sock:
+                    self._close()
+            time.sleep(self.reconnect_interval)
+
+    def _close(self):
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        self._sock = None
+
+
+class EventBus:
+    """
+    Pub/sub событий по заявкам внутри процесса. Доставка подписчикам - неблокирующая;
+    backend дополнительно рассылает события другим воркерам.
+    """
+
+    def __init__(self, backend, queue_size=100):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._started = False
+        self.published = 0
+        self.disconnected_slow = 0
+
+    def subscribe(self, accepts):
+        """accepts(event) -> bool решает, нужно ли событие этому подписчику"""
+        self._ensure_started()
+        subscription = Subscription(accepts, self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        self._ensure_started()
+        with self._lock:
+            self.published += 1
+        self._deliver(event)
+        # Вне блокировки шины; backend сам не ждёт сеть
+        self.backend.publish(event)
+
+    def stats(self):
+        return {
+            'subscribers': len(self._subscriptions),
+            'published': self.published,
+            'disconnected_slow': self.disconnected_slow,
+            **self.backend.stats(),
+        }
+
+    def _deliver(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.overflowed or not subscription.accepts(event):
+                continue
+            if not subscription.offer(event):
+                # Медленный клиент: отключаем, чтобы не копить для него события
+                with self._lock:
+                    self._subscriptions.discard(subscription)
+                    self.disconnected_slow += 1
+
+    def _ensure_started(self):
+        # Фоновые потоки backend запускаются в воркере, а не в мастер-процессе gunicorn
+        if self._started:
+            return
+        with self._lock:
+            if not self._started:
+                self.backend.start(self._deliver)
+                self._started = True
+
+
+def request_event(req, old_state=None, deleted=False):
+    """
+    Событие об изменении заявки для SSE (строится до commit, публикуется после).
+    None - у заявки не изменились ни статус, ни мастер.
+    """
+    if old_state and not deleted and (
+        old_state['request_status'] == req.request_status and old_state['master_id'] == req.master_id
+    ):
+        return None
+    old_state = old_state or {}
+    return {
+        'type': 'request_deleted' if deleted else ('request_updated' if old_state else 'request_created'),
+        'request_id': req.request_id,
+        'request_status': req.request_status,
+        'master_id': req.master_id,
+        'client_id': req.client_id,
+        'previous_status': old_state.get('request_status'),
+        'previous_master_id': old_state.get('master_id'),
+    }
+
+
+def event_visible_to(user):
+    """Фильтр событий по роли: заказчик - свои заявки, специалист - назначенные ему"""
+    user_type = user.get('user_type')
+    user_id = user.get('user_id')
+    if user_type == 'Заказчик':
+        return lambda event: event.get('client_id') == user_id
+    if user_type == 'Специалист':
+        return lambda event: user_id in (event.get('master_id'), event.get('previous_master_id'))
+    return lambda event: True
+
+
+# ============================================================================
+# Локальный брокер (замена Redis pub/sub для нескольких воркеров на одной машине)
+# ============================================================================
+
+class _BrokerServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _BrokerPeer:
+    """
+    Соединение брокера с одним воркером: своя ограниченная очередь и поток записи.
+    Медленный или зависший воркер не задерживает доставку остальным - при
+    переполнении очереди его соединение закрывается (воркер переподключится).
+    """
+
+    def __init__(self, connection, wfile, maxsize):
+        self.connection = connection
+        self.wfile = wfile
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def offer(self, line):
+        try:
+            self.queue.put_nowait(line)
+            return True
+        except queue.Full:
+            return False
+
+    def write_loop(self, on_error):
+        while True:
+            line = self.queue.get()
+            if line is None:
+                return
+            try:
+                self.wfile.write(line)
+                self.wfile.flush()
+            except OSError:
+                on_error(self)
+                return
+
+    def close(self):
+        try:
+            # Остановить поток записи; при полной очереди он остановится на ошибке записи
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        peer = _BrokerPeer(self.connection, self.wfile, BROKER_QUEUE_SIZE)
+        with server.clients_lock:
+            server.clients.add(peer)
+        threading.Thread(target=peer.write_loop, args=(self._drop,), name='event-broker-peer', daemon=True).start()
+        try:
+            for line in self.rfile:
+                with server.clients_lock:
+                    peers = [client for client in server.clients if client is not peer]
+                for client in peers:
+                    if not client.offer(line):
+                        self._drop(client)
+        finally:
+            self._drop(peer)
+
+    def _drop(self, peer):
+        server = self.server
+        with server.clients_lock:
+            if peer not in server.clients:
+                return
+            server.clients.discard(peer)
+        peer.close()
+
+
+def run_broker(address):
+    """Запустить брокер событий: каждая строка от воркера пересылается остальным"""
+    host, port = address.rsplit(':', 1)
+    with _BrokerServer((host, int(port)), _BrokerHandler) as server:
+        server.clients = set()
+        server.clients_lock = threading.Lock()
+        server.serve_forever()
+
+
+def _make_backend():
+    if Config.EVENT_BACKEND == 'broker':
+        return BrokerBackend(Config.EVENT_BROKER_ADDRESS)
+    return MemoryBackend()
+
+
+event_bus = EventBus(_make_backend(), queue_size=Config.SSE_QUEUE_SIZE)
@@ -0,0 +1,30 @@
+import base64
+import json
+
+# Максимальный размер страницы, который отдаёт сервер
+MAX_PAGE_LIMIT = 100
+
+
+def clamp_limit(limit, default=10):
+    """Ограничить limit из запроса диапазоном 1..MAX_PAGE_LIMIT"""
+    if not limit or limit < 1:
+        return default
+    return min(limit, MAX_PAGE_LIMIT)
+
+
+def encode_cursor(values):
+    """Непрозрачный курсор keyset-пагинации: base64url(JSON) без паддинга"""
+    raw = json.dumps(values, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Разобрать курсор, созданный encode_cursor (ValueError при порче)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, dict):
+        raise ValueError('Invalid cursor')
+    return values
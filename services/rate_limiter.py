@@ -0,0 +1,43 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """
+    Ограничение частоты по ключу (IP, логин): ведро на capacity токенов,
+    пополняется со скоростью refill_rate токенов в секунду.
+    Хранится не больше maxsize вёдер - самые старые вытесняются.
+    """
+
+    def __init__(self, capacity, refill_rate, maxsize=100_000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, tokens=1):
+        """Списать токены. Возвращает (разрешено, через сколько секунд повторить)"""
+        now = time.monotonic()
+        with self._lock:
+            available, updated = self._buckets.get(key, (self.capacity, now))
+            available = min(self.capacity, available + (now - updated) * self.refill_rate)
+
+            if available >= tokens:
+                available -= tokens
+                allowed, retry_after = True, 0.0
+            else:
+                allowed = False
+                retry_after = (tokens - available) / self.refill_rate if self.refill_rate else float('inf')
+
+            self._buckets[key] = (available, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+
+        return allowed, retry_after
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
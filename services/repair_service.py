@@ -1,4 +1,7 @@
 from database import db
+from services.statistics_snapshot_service import StatisticsSnapshotService
+from services.table_version_service import TableVersionService
+from services.event_bus import event_bus, request_event
 
 class RepairService:
     @staticmethod
@@ -44,7 +47,10 @@ class RepairService:
                 client_id=client_id
             )
             db.session.add(new_request)
+            StatisticsSnapshotService.apply_change(None, StatisticsSnapshotService.request_state(new_request))
+            TableVersionService.bump('repair_requests')
             db.session.commit()
+            event_bus.publish(request_event(new_request))
             return new_request.to_dict()
         except Exception as e:
             db.session.rollback()
@@ -57,8 +63,14 @@ class RepairService:
             request = RepairRequest.query.get(request_id)
             if not request:
                 return {'error': 'Request not found'}
+            old_state = StatisticsSnapshotService.request_state(request)
             request.request_status = new_status
+            StatisticsSnapshotService.apply_change(old_state, StatisticsSnapshotService.request_state(request))
+            TableVersionService.bump('repair_requests')
+            event = request_event(request, old_state)
             db.session.commit()
+            if event:
+                event_bus.publish(event)
             return request.to_dict()
         except Exception as e:
             db.session.rollback()
@@ -71,8 +83,14 @@ class RepairService:
             request = RepairRequest.query.get(request_id)
             if not request:
                 return {'error': 'Request not found'}
+            old_state = StatisticsSnapshotService.request_state(request)
             request.master_id = master_id
+            StatisticsSnapshotService.apply_change(old_state, StatisticsSnapshotService.request_state(request))
+            TableVersionService.bump('repair_requests')
+            event = request_event(request, old_state)
             db.session.commit()
+            if event:
+                event_bus.publish(event)
             return request.to_dict()
         except Exception as e:
             db.session.rollback()
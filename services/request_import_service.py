@@ -0,0 +1,215 @@
+import csv
+import json
+from datetime import date
+
+from sqlalchemy import Date, Integer, String, insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import db
+from services.event_bus import event_bus
+from services.statistics_snapshot_service import StatisticsSnapshotService
+from services.table_version_service import TableVersionService
+
+IMPORT_FORMATS = ('jsonl', 'csv')
+
+# Поля строки импорта (колонки RepairRequest); external_id обязателен - по нему повтор не дублирует
+IMPORT_FIELDS = (
+    'external_id', 'start_date', 'climate_tech_type', 'climate_tech_model', 'problem_description',
+    'request_status', 'completion_date', 'repair_parts', 'master_id', 'client_id'
+)
+REQUIRED_FIELDS = ('external_id', 'climate_tech_type', 'climate_tech_model', 'problem_description', 'client_id')
+
+# Верхняя граница batch_size (число параметров одного INSERT ограничено драйвером)
+MAX_IMPORT_BATCH_SIZE = 5000
+
+# Сколько ошибок по строкам возвращать в отчёте (остальные только считаются)
+MAX_REPORTED_ERRORS = 1000
+
+
+class RequestImportService:
+    """
+    Массовый импорт заявок из JSONL/CSV.
+
+    Строки читаются потоком и проверяются по схеме RepairRequest; ошибочные
+    попадают в отчёт и не мешают остальным. Корректные вставляются пачками
+    по batch_size одним INSERT ... VALUES (...), (...) с отдельным commit.
+    Строки с уже импортированным external_id пропускаются (skipped).
+    """
+
+    @staticmethod
+    def import_stream(stream, file_format, batch_size):
+        """stream - текстовый поток; возвращает отчёт {inserted, skipped, failed, errors}"""
+        if file_format not in IMPORT_FORMATS:
+            raise ValueError(f'Invalid format, expected one of: {", ".join(IMPORT_FORMATS)}')
+
+        report = {'inserted': 0, 'skipped': 0, 'failed': 0, 'batches': 0, 'errors': []}
+        rows = _read_jsonl(stream) if file_format == 'jsonl' else _read_csv(stream)
+        seen = set()
+        batch = []
+
+        for line_no, raw, error in rows:
+            values = None
+            if error is None:
+                values, error = _validate(raw)
+            if error:
+                _add_error(report, line_no, raw, error)
+                continue
+            # Повтор внутри одного файла
+            if values['external_id'] in seen:
+                report['skipped'] += 1
+                continue
+            seen.add(values['external_id'])
+
+            batch.append((line_no, values))
+            if len(batch) >= batch_size:
+                _insert_batch(batch, report)
+                batch = []
+
+        if batch:
+            _insert_batch(batch, report)
+
+        if report['inserted']:
+            event_bus.publish({'type': 'requests_imported', 'count': report['inserted']})
+        return report
+
+
+def _read_jsonl(stream):
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(raw, dict):
+            yield line_no, None, 'Expected a JSON object'
+            continue
+        yield line_no, raw, None
+
+
+def _read_csv(stream):
+    reader = csv.DictReader(stream)
+    for raw in reader:
+        # Пустая ячейка CSV - отсутствующее значение
+        yield reader.line_num, {key: (value if value != '' else None) for key, value in raw.items()}, None
+
+
+def _validate(raw):
+    """Проверить строку по типам колонок RepairRequest -> (values, None) или (None, ошибка)"""
+    from models.repair_request import RepairRequest, REQUEST_STATUSES
+
+    unknown = sorted(str(key) for key in raw if key not in IMPORT_FIELDS)
+    if unknown:
+        return None, f'Unknown fields: {", ".join(unknown)}'
+    missing = [field for field in REQUIRED_FIELDS if raw.get(field) in (None, '')]
+    if missing:
+        return None, f'Missing required fields: {", ".join(missing)}'
+
+    values = {}
+    columns = RepairRequest.__table__.columns
+    for field in IMPORT_FIELDS:
+        value = raw.get(field)
+        if value is None:
+            values[field] = None
+            continue
+        column_type = columns[field].type
+        try:
+            if isinstance(column_type, Integer):
+                # Только число или строка: int() от списка / объекта JSON бросает TypeError
+                if isinstance(value, bool) or not isinstance(value, (str, int)):
+                    raise ValueError
+                value = int(value)
+            elif isinstance(column_type, Date):
+                value = date.fromisoformat(str(value))
+            else:
+                if not isinstance(value, (str, int)):
+                    raise ValueError
+                value = str(value).strip()
+                if isinstance(column_type, String) and column_type.length and len(value) > column_type.length:
+                    return None, f'{field} is longer than {column_type.length} characters'
+        except (TypeError, ValueError):
+            return None, f'Invalid {field}: {raw.get(field)!r}'
+        values[field] = value
+
+    values['start_date'] = values['start_date'] or date.today()
+    values['request_status'] = values['request_status'] or 'Новая заявка'
+    if values['request_status'] not in REQUEST_STATUSES:
+        return None, f"Invalid request_status: {values['request_status']!r}"
+    if values['completion_date'] and values['completion_date'] < values['start_date']:
+        return None, 'completion_date is earlier than start_date'
+    return values, None
+
+
+def _insert_batch(batch, report):
+    """Вставить пачку одним INSERT; ошибка БД помечает только строки этой пачки"""
+    from models.repair_request import RepairRequest
+    from models.user import User
+
+    report['batches'] += 1
+    pending = batch
+    try:
+        # Ссылки на пользователей и уже импортированные строки - по запросу на пачку
+        user_ids = {values['client_id'] for _, values in batch}
+        user_ids |= {values['master_id'] for _, values in batch if values['master_id']}
+        existing_users = {
+            user_id for (user_id,) in db.session.query(User.user_id).filter(User.user_id.in_(user_ids))
+        }
+        imported = {
+            external_id for (external_id,) in db.session.query(RepairRequest.external_id).filter(
+                RepairRequest.external_id.in_([values['external_id'] for _, values in batch]))
+        }
+
+        pending = []
+        for line_no, values in batch:
+            if values['external_id'] in imported:
+                report['skipped'] += 1
+            elif values['client_id'] not in existing_users:
+                _add_error(report, line_no, values, f"Client {values['client_id']} not found")
+            elif values['master_id'] and values['master_id'] not in existing_users:
+                _add_error(report, line_no, values, f"Master {values['master_id']} not found")
+            else:
+                pending.append((line_no, values))
+        if not pending:
+            return
+
+        rows = [values for _, values in pending]
+
+        # request_id нужен сводкам (StatisticsRollupService: watermark обратного заполнения)
+        inserted = dict(db.session.execute(
+            _insert_ignoring_duplicates(RepairRequest).values(rows)
+            .returning(RepairRequest.external_id, RepairRequest.request_id)
+        ).all())
+        StatisticsSnapshotService.apply_changes([
+            (None, dict(values, request_id=inserted[values['external_id']]))
+            for values in rows if values['external_id'] in inserted
+        ])
+        TableVersionService.bump('repair_requests')
+        db.session.commit()
+        report['inserted'] += len(inserted)
+        # Строки, вставленные параллельным повтором того же файла между проверкой и INSERT
+        report['skipped'] += len(rows) - len(inserted)
+    except Exception as e:
+        db.session.rollback()
+        for line_no, values in pending:
+            _add_error(report, line_no, values, f'Batch failed: {e}')
+
+
+def _insert_ignoring_duplicates(model):
+    """INSERT, пропускающий строки с уже существующим external_id (где диалект это умеет)"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model).on_conflict_do_nothing(index_elements=['external_id'])
+    if dialect == 'sqlite':
+        return sqlite.insert(model).on_conflict_do_nothing(index_elements=['external_id'])
+    return insert(model)
+
+
+def _add_error(report, line_no, raw, error):
+    report['failed'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({
+            'line': line_no,
+            'external_id': (raw or {}).get('external_id'),
+            'error': error
+        })
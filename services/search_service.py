@@ -0,0 +1,287 @@
+import bisect
+import functools
+import math
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import REAL, and_, bindparam, cast, func, or_, text
+
+from config import Config
+from database import db
+from services.cache import LRUCache
+from services.serialization import request_serializer
+from services.table_version_service import TableVersionService
+
+# Вес совпадения по полю для индекса в памяти (как веса A/B/C у ts_rank по умолчанию)
+FIELD_WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2}
+
+# Запас при дочитывании изменений: транзакции, закоммиченные позже своего updated_at
+SYNC_OVERLAP = timedelta(seconds=60)
+
+# Сколько найденных id проверять одним SELECT ... WHERE request_id IN (...)
+FETCH_CHUNK_SIZE = 500
+
+# Частые служебные слова, которые не ищутся (в PostgreSQL их отбрасывает словарь russian)
+STOP_WORDS = frozenset((
+    'а', 'в', 'во', 'да', 'для', 'до', 'же', 'за', 'и', 'из', 'или', 'к', 'как', 'ко', 'на', 'над',
+    'не', 'нет', 'ни', 'но', 'о', 'об', 'от', 'по', 'под', 'при', 'с', 'со', 'то', 'у', 'что',
+))
+
+# Окончания для упрощённого стемминга (длинные проверяются первыми)
+_ENDINGS = tuple(sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ешь', 'ете', 'ить', 'ать', 'ять',
+    'ет', 'ут', 'ют', 'ит', 'ат', 'ят', 'ых', 'их', 'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее',
+    'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ия', 'ие', 'ию', 'ии', 'ть', 'ся', 'сь',
+    'а', 'я', 'о', 'е', 'и', 'ы', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True))
+
+_WORD_RE = re.compile(r'\w+')
+
+
+class SearchService:
+    """
+    Полнотекстовый поиск заявок по модели техники, описанию неисправности и запчастям.
+
+    PostgreSQL: to_tsvector('russian', ...) с GIN-индексом idx_requests_search
+    и ранжированием ts_rank. Остальные СУБД (SQLite в разработке и бенчмарках) -
+    инвертированный индекс в памяти процесса (RequestSearchIndex).
+    """
+
+    @staticmethod
+    def uses_database():
+        return db.session.get_bind().dialect.name == 'postgresql'
+
+    @staticmethod
+    def match_filter(query_text):
+        """Условие WHERE "заявка находится по query_text" (без ранжирования)"""
+        from models.repair_request import RepairRequest, search_document
+
+        if SearchService.uses_database():
+            return search_document().op('@@')(_tsquery(query_text))
+        # Список заявок (?search=) фильтрует все совпадения в порядке request_id / даты, обрезать
+        # по релевантности нельзя - id подставляются в SQL числами, а не параметрами
+        # (у SQLite ограничено число параметров запроса)
+        return RepairRequest.request_id.in_(
+            bindparam('search_ids', search_index.match(query_text), expanding=True, literal_execute=True)
+        )
+
+    @staticmethod
+    def search_page(query, query_text, position, limit):
+        """
+        Страница результатов по убыванию релевантности: ([(row, rank), ...], has_more).
+        query - заявки, уже отфильтрованные по роли и статусу; position - {'r': rank, 'id'}
+        последней заявки предыдущей страницы (None - первая страница).
+        """
+        if SearchService.uses_database():
+            return _database_page(query, query_text, position, limit)
+        return _memory_page(query, query_text, position, limit)
+
+
+def _tsquery(query_text):
+    from models.repair_request import SEARCH_CONFIG
+
+    # websearch_to_tsquery понимает "фразы", OR и -исключение, не падает на мусоре
+    return func.websearch_to_tsquery(text(f"'{SEARCH_CONFIG}'::regconfig"), query_text)
+
+
+def _database_page(query, query_text, position, limit):
+    """WHERE документ @@ запрос ORDER BY ts_rank DESC, request_id - keyset по (rank, request_id)"""
+    from models.repair_request import RepairRequest, search_document
+
+    document = search_document()
+    rank = func.ts_rank(document, _tsquery(query_text))
+    query = query.filter(document.op('@@')(_tsquery(query_text)))
+    if position:
+        # ts_rank - real: сравниваем в том же типе, иначе граница страницы "плывёт"
+        last_rank = cast(position['r'], REAL)
+        query = query.filter(or_(
+            rank < last_rank,
+            and_(rank == last_rank, RepairRequest.request_id > position['id'])
+        ))
+
+    rows = (query.with_entities(*request_serializer.columns, rank)
+            .order_by(rank.desc(), RepairRequest.request_id)
+            .limit(limit + 1)
+            .all())
+    page = [(tuple(row[:-1]), float(row[-1])) for row in rows[:limit]]
+    return page, len(rows) > limit
+
+
+def _memory_page(query, query_text, position, limit):
+    """
+    Ранжирование в индексе, затем проверка видимости пачками id через query: первая
+    пачка - limit + 1 лучших после курсора, следующие (если часть id не видна роли
+    или фильтру) вдвое больше, не больше FETCH_CHUNK_SIZE
+    """
+    from models.repair_request import RepairRequest
+
+    ranked = search_index.ranked(query_text)
+    offset = 0
+    if position:
+        offset = bisect.bisect_right(ranked, (-position['r'], position['id']))
+
+    page = []
+    chunk_size = min(limit + 1, FETCH_CHUNK_SIZE)
+    while offset < len(ranked):
+        chunk = ranked[offset:offset + chunk_size]
+        offset += len(chunk)
+        chunk_size = min(chunk_size * 2, FETCH_CHUNK_SIZE)
+        rows = {
+            row.request_id: row for row in query.filter(
+                RepairRequest.request_id.in_([request_id for _, request_id in chunk])
+            ).with_entities(*request_serializer.columns)
+        }
+        for score, request_id in chunk:
+            if request_id in rows:
+                page.append((tuple(rows[request_id]), -score))
+                if len(page) > limit:
+                    return page[:limit], True
+    return page, False
+
+
+def tokenize(value):
+    """Основы слов строки: нижний регистр, ё -> е, без служебных слов"""
+    words = _WORD_RE.findall((value or '').lower().replace('ё', 'е'))
+    return [_stem(word) for word in words if word not in STOP_WORDS]
+
+
+@functools.lru_cache(maxsize=65536)
+def _stem(word):
+    """
+    Упрощённый стемминг: отрезается самое длинное известное окончание, если остаётся
+    хотя бы три буквы. Грубее snowball-словаря PostgreSQL, но сводит падежи и числа
+    ("компрессора", "компрессоры" -> "компрессор").
+    """
+    if not word.isalpha():
+        return word
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+
+class RequestSearchIndex:
+    """
+    Инвертированный индекс заявок в памяти процесса: основа слова -> {request_id: вес}.
+
+    Перед каждым поиском сверяется версия таблицы repair_requests (table_versions):
+    не изменилась - индекс актуален; изменилась - дочитываются заявки с updated_at
+    и следы удалений (request_tombstones) после прошлой синхронизации.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._version = None
+        self._synced_at = None
+        self._lock = threading.Lock()
+        # Ранжированная выдача по набору основ: листание курсором не пересчитывает её
+        self._results = LRUCache(maxsize=128, ttl=300)
+        self.rebuilds = 0
+
+    def match(self, query_text):
+        """id заявок, содержащих все слова запроса"""
+        return [request_id for _, request_id in self.ranked(query_text)]
+
+    def ranked(self, query_text):
+        """[(-score, request_id), ...] по убыванию score, при равенстве - по request_id"""
+        terms = frozenset(tokenize(query_text))
+        with self._lock:
+            self._sync()
+            if not terms:
+                return []
+            cached = self._results.get(terms)
+            if cached is not None:
+                return cached
+            postings = [self._postings.get(term) for term in terms]
+            if not all(postings):
+                return []
+            total = len(self._documents)
+            postings.sort(key=len)
+            scores = {}
+            for request_id in postings[0]:
+                score = 0.0
+                for posting in postings:
+                    weight = posting.get(request_id)
+                    if weight is None:
+                        break
+                    score += weight * math.log(1 + total / len(posting))
+                else:
+                    scores[request_id] = score
+            ranked = sorted((-score, request_id) for request_id, score in scores.items())
+            self._results.set(terms, ranked)
+        return ranked
+
+    def reset(self):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._version = None
+            self._synced_at = None
+            self._results.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'terms': len(self._postings),
+                'version': self._version,
+                'rebuilds': self.rebuilds,
+                'results_cache': self._results.stats(),
+            }
+
+    def _sync(self):
+        from models.repair_request import RepairRequest, SEARCH_FIELDS
+        from models.request_tombstone import RequestTombstone
+
+        (version,) = TableVersionService.get('repair_requests')
+        if self._synced_at is not None and version == self._version:
+            return
+        self._results.clear()
+
+        started = datetime.utcnow()
+        columns = [RepairRequest.request_id] + [getattr(RepairRequest, field) for field, _ in SEARCH_FIELDS]
+        query = db.session.query(*columns)
+
+        retention = timedelta(days=Config.TOMBSTONE_RETENTION_DAYS)
+        if self._synced_at is None or self._synced_at < started - retention:
+            # Первый запуск или следы удалений уже вычищены - строим заново
+            self._postings.clear()
+            self._documents.clear()
+            self.rebuilds += 1
+        else:
+            since = self._synced_at - SYNC_OVERLAP
+            deleted = db.session.query(RequestTombstone.request_id).filter(RequestTombstone.deleted_at >= since)
+            for (request_id,) in deleted:
+                self._remove(request_id)
+            query = query.filter(RepairRequest.updated_at >= since)
+
+        for row in query.yield_per(5000):
+            self._remove(row[0])
+            self._add(row[0], row[1:])
+
+        self._version = version
+        self._synced_at = started
+
+    def _add(self, request_id, values):
+        from models.repair_request import SEARCH_FIELDS
+
+        weights = defaultdict(float)
+        for value, (_, weight) in zip(values, SEARCH_FIELDS):
+            for term in tokenize(value):
+                weights[term] += FIELD_WEIGHTS[weight]
+        for term, weight in weights.items():
+            self._postings[term][request_id] = weight
+        self._documents[request_id] = tuple(weights)
+
+    def _remove(self, request_id):
+        for term in self._documents.pop(request_id, ()):
+            posting = self._postings[term]
+            posting.pop(request_id, None)
+            if not posting:
+                del self._postings[term]
+
+
+search_index = RequestSearchIndex()
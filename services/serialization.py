@@ -0,0 +1,137 @@
+from operator import itemgetter
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime, select
+
+from database import db
+
+try:
+    import orjson
+except ImportError:  # pip install orjson - необязательная зависимость
+    orjson = None
+
+
+class ModelSerializer:
+    """
+    Сериализатор модели по фиксированному кортежу колонок.
+
+    Порядок полей и преобразования (даты -> isoformat) вычисляются один раз
+    при создании, дальше строка превращается в dict через zip без обращения
+    к инструментированным атрибутам ORM. Строки можно читать сразу кортежами:
+    db.session.execute(serializer.select()) - объекты моделей не создаются.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+        self.columns = tuple(getattr(model, field) for field in self.fields)
+        # Индексы колонок с датой/временем - единственные, что нужно преобразовывать
+        self._temporal = tuple(
+            i for i, column in enumerate(self.columns) if isinstance(column.type, (Date, DateTime))
+        )
+        if len(self.fields) > 1:
+            self._from_state = itemgetter(*self.fields)
+        else:
+            self._from_state = lambda state, field=self.fields[0]: (state[field],)
+
+    def select(self):
+        """SELECT только нужных колонок (без построения объектов модели)"""
+        return select(*self.columns)
+
+    def from_row(self, row):
+        """Кортеж значений в порядке self.fields -> dict"""
+        if not self._temporal:
+            return dict(zip(self.fields, row))
+        values = list(row)
+        for i in self._temporal:
+            if values[i] is not None:
+                values[i] = values[i].isoformat()
+        return dict(zip(self.fields, values))
+
+    def from_object(self, obj):
+        """Объект модели -> dict; значения берутся из __dict__ напрямую"""
+        try:
+            row = self._from_state(obj.__dict__)
+        except KeyError:
+            # Атрибут истёк или отложен - догружаем обычным путём
+            row = tuple(getattr(obj, field) for field in self.fields)
+        return self.from_row(row)
+
+    def many(self, rows):
+        return [self.from_row(row) for row in rows]
+
+    def fetch(self, statement):
+        """Выполнить SELECT из self.select() и вернуть список dict"""
+        return self.many(db.session.execute(statement))
+
+
+def _model_serializers():
+    from models.repair_request import RepairRequest
+    from models.user import User
+    from models.comment import Comment
+
+    return (
+        ModelSerializer(RepairRequest, (
+            'request_id', 'start_date', 'climate_tech_type', 'climate_tech_model', 'problem_description',
+            'request_status', 'completion_date', 'repair_parts', 'master_id', 'client_id'
+        )),
+        ModelSerializer(User, ('user_id', 'full_name', 'phone', 'login', 'user_type')),
+        ModelSerializer(Comment, ('comment_id', 'message', 'master_id', 'request_id', 'created_at')),
+    )
+
+
+request_serializer, user_serializer, comment_serializer = _model_serializers()
+
+
+# ============================================================================
+# JSON-бэкенд ответов (JSON_BACKEND = auto | orjson | std)
+# ============================================================================
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON-провайдер Flask на orjson. Вывод совпадает со стандартным:
+    тот же порядок ключей (sort_keys) и то же преобразование date/Decimal/UUID
+    через DefaultJSONProvider.default.
+    """
+
+    def _options(self):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        data = orjson.dumps(obj, default=self.default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Выбрать JSON-провайдер приложения по JSON_BACKEND (auto - orjson, если установлен)"""
+    backend = app.config.get('JSON_BACKEND', 'auto')
+    if backend not in ('auto', 'orjson', 'std'):
+        raise ValueError(f'Unknown JSON_BACKEND: {backend}')
+    if backend == 'orjson' and orjson is None:
+        app.logger.warning('JSON_BACKEND=orjson, but orjson is not installed; using std json')
+
+    provider_class = OrjsonProvider if orjson is not None and backend != 'std' else DefaultJSONProvider
+    app.json = provider_class(app)
+    # Во Flask 2.3 ключи JSON_AS_ASCII / JSON_SORT_KEYS больше не читаются - переносим вручную
+    app.json.ensure_ascii = app.config.get('JSON_AS_ASCII', True)
+    app.json.sort_keys = app.config.get('JSON_SORT_KEYS', True)
+
+
+def json_backend_name(app):
+    return 'orjson' if isinstance(app.json, OrjsonProvider) else 'std'
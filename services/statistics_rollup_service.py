@@ -0,0 +1,346 @@
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from database import db, add_to_counters
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
+from services.statistics_service import _completion_days_expr
+from services.statistics_snapshot_service import ROLLUP_METRIC
+
+# Отметки в statistics_snapshot: сводки построены целиком /
+# обратное заполнение дошло до request_id включительно
+ROLLUP_BUILT_MARKER = (ROLLUP_METRIC, 'built')
+ROLLUP_WATERMARK_MARKER = (ROLLUP_METRIC, 'watermark')
+
+# Заявок в одной транзакции обратного заполнения
+ROLLUP_BACKFILL_CHUNK = 5000
+
+TIMESERIES_GRANULARITIES = ('day', 'week', 'month')
+TIMESERIES_GROUPS = ('equipment_type', 'master')
+# Самый длинный запрашиваемый период (дней) и период по умолчанию
+MAX_TIMESERIES_DAYS = 3660
+DEFAULT_TIMESERIES_DAYS = 90
+
+ROLLUP_COLUMNS = ('created', 'completed', 'completion_days_sum')
+
+ROLLUPS_NOT_BUILT = 'Rollups are not built, run "flask statistics backfill-rollups"'
+
+
+class StatisticsRollupService:
+    """
+    Дневные сводки statistics_daily для графиков динамики.
+
+    Поддерживаются инкрементально: StatisticsSnapshotService.apply_changes передаёт
+    сюда те же изменения заявок в той же транзакции. Исторические данные заполняет
+    backfill пачками по request_id; пока он не закончен, изменения учитываются только
+    для уже обработанных заявок (request_id <= watermark), остальные посчитает backfill.
+
+    Пока backfill не закончен, запись заявки держит отметки FOR SHARE до своего commit,
+    а пачка backfill блокирует их FOR UPDATE: watermark не может обогнать незакоммиченную
+    заявку (иначе её не посчитал бы ни backfill, ни apply_changes).
+    """
+
+    @staticmethod
+    def apply_changes(changes):
+        """Применить изменения заявок [(old_state, new_state), ...] (без commit)"""
+        built, watermark = _rollup_progress()
+        if not built:
+            built, watermark = _rollup_progress(lock=True, read=True)
+        if not built and watermark is None:
+            return
+
+        delta = Counter()
+        for old_state, new_state in changes:
+            if not built:
+                request_id = (new_state or old_state).get('request_id')
+                if request_id is None or request_id > watermark:
+                    continue
+            delta.update(_contributions(new_state))
+            delta.subtract(_contributions(old_state))
+        _apply_delta(delta)
+
+    @staticmethod
+    def backfill(chunk_size=ROLLUP_BACKFILL_CHUNK, restart=False, progress=None):
+        """
+        Заполнить сводки по repair_requests пачками по chunk_size заявок, каждая -
+        отдельная транзакция. Прерванный запуск продолжается с места остановки.
+        restart=True удаляет сводки и начинает заново.
+        """
+        try:
+            from models.repair_request import RepairRequest
+            from models.statistics_snapshot import StatisticsCounter, StatisticsDaily
+
+            if restart:
+                StatisticsDaily.query.delete(synchronize_session=False)
+                StatisticsCounter.query.filter_by(metric=ROLLUP_METRIC).delete(synchronize_session=False)
+                db.session.commit()
+
+            built, watermark = _rollup_progress()
+            if built:
+                return {'message': 'Rollups are already built', 'chunks': 0, 'requests': 0}
+            if watermark is None:
+                # С этого момента записи заявок с request_id <= watermark идут в сводки.
+                # Отметки ещё нет - блокировать нечего: SHARE-блокировка таблицы дожидается
+                # записей, начатых до неё (они не видели отметку и заявки пропустили)
+                try:
+                    if db.session.get_bind().dialect.name == 'postgresql':
+                        db.session.execute(text(f'LOCK TABLE {RepairRequest.__tablename__} IN SHARE MODE'))
+                    _set_marker(ROLLUP_WATERMARK_MARKER, 0)
+                    db.session.commit()
+                except IntegrityError:
+                    # Параллельный backfill уже начал
+                    db.session.rollback()
+
+            chunks = requests = 0
+            days = _completion_days_expr(db.session.get_bind().dialect.name)
+            master = func.coalesce(RepairRequest.master_id, 0)
+            while True:
+                # Блокировка отметок: параллельные backfill обрабатывают пачки по очереди,
+                # записи заявок (FOR SHARE в apply_changes) - до или после пачки
+                built, watermark = _rollup_progress(lock=True)
+                if built:
+                    db.session.commit()
+                    break
+
+                ids = db.session.scalars(
+                    db.select(RepairRequest.request_id)
+                    .where(RepairRequest.request_id > watermark)
+                    .order_by(RepairRequest.request_id)
+                    .limit(chunk_size)
+                ).all()
+                if not ids:
+                    _set_marker(ROLLUP_BUILT_MARKER, 1)
+                    db.session.commit()
+                    break
+
+                in_chunk = RepairRequest.request_id.between(ids[0], ids[-1])
+                delta = Counter()
+                for day, tech_type, master_id, value in db.session.query(
+                        RepairRequest.start_date, RepairRequest.climate_tech_type, master,
+                        func.count(RepairRequest.request_id)
+                ).filter(in_chunk).group_by(RepairRequest.start_date, RepairRequest.climate_tech_type, master):
+                    delta[((day, tech_type, master_id), 'created')] += value
+                for day, tech_type, master_id, value, days_sum in db.session.query(
+                        RepairRequest.completion_date, RepairRequest.climate_tech_type, master,
+                        func.count(RepairRequest.request_id), func.sum(days)
+                ).filter(in_chunk, RepairRequest.completion_date.isnot(None)).group_by(
+                        RepairRequest.completion_date, RepairRequest.climate_tech_type, master):
+                    delta[((day, tech_type, master_id), 'completed')] += value
+                    delta[((day, tech_type, master_id), 'completion_days_sum')] += int(days_sum or 0)
+
+                _apply_delta(delta)
+                watermark = ids[-1]
+                _set_marker(ROLLUP_WATERMARK_MARKER, watermark)
+                db.session.commit()
+
+                chunks += 1
+                requests += len(ids)
+                if progress:
+                    progress(chunks, requests, watermark)
+
+            return {'message': 'Rollups built', 'chunks': chunks, 'requests': requests}
+        except Exception as e:
+            db.session.rollback()
+            return {'error': str(e)}
+
+    @staticmethod
+    def check():
+        """Сравнить сводки с пересчётом по repair_requests (итоги по дням)"""
+        try:
+            from models.repair_request import RepairRequest
+            from models.statistics_snapshot import StatisticsDaily
+
+            built, _ = _rollup_progress()
+            if not built:
+                return {'consistent': False, 'built': False, 'differences': []}
+
+            stored = Counter()
+            for row in db.session.query(StatisticsDaily):
+                key = (row.day, row.climate_tech_type, row.master_id)
+                for column in ROLLUP_COLUMNS:
+                    stored[(key, column)] = getattr(row, column)
+
+            actual = Counter()
+            for row in db.session.query(
+                    RepairRequest.request_id, RepairRequest.start_date, RepairRequest.climate_tech_type,
+                    RepairRequest.master_id, RepairRequest.completion_date).yield_per(5000):
+                actual.update(_contributions(_state(row)))
+
+            differences = [{
+                'day': key[0].isoformat(),
+                'climate_tech_type': key[1],
+                'master_id': key[2],
+                'column': column,
+                'rollup': stored.get((key, column), 0),
+                'actual': actual.get((key, column), 0)
+            } for key, column in sorted(set(stored) | set(actual))
+                if stored.get((key, column), 0) != actual.get((key, column), 0)]
+            return {'consistent': not differences, 'built': True, 'differences': differences}
+        except Exception as e:
+            return {'error': str(e)}
+
+    @staticmethod
+    def timeseries(granularity='day', date_from=None, date_to=None, equipment_type=None,
+                   master_id=None, group_by=None):
+        """
+        Ряды по периодам: принято, выполнено, средний срок и незакрытые заявки
+        на конец периода. Читаются только сводки; пока backfill не закончен -
+        {'error': ..., 'built': False}.
+        """
+        try:
+            from models.statistics_snapshot import StatisticsDaily
+            from models.user import User
+
+            built, _ = _rollup_progress()
+            if not built:
+                # Заполнение истории - долгая операция, только из CLI
+                return {'error': ROLLUPS_NOT_BUILT, 'built': False}
+
+            group_column = {
+                None: None,
+                'equipment_type': StatisticsDaily.climate_tech_type,
+                'master': StatisticsDaily.master_id,
+            }[group_by]
+
+            filters = []
+            if equipment_type:
+                filters.append(StatisticsDaily.climate_tech_type == equipment_type)
+            if master_id is not None:
+                filters.append(StatisticsDaily.master_id == master_id)
+
+            group = [group_column] if group_column is not None else []
+            sums = [func.sum(getattr(StatisticsDaily, column)) for column in ROLLUP_COLUMNS]
+
+            # Незакрытые на начало периода - итог всех дней до date_from
+            opening = defaultdict(int)
+            for row in db.session.query(*group, sums[0], sums[1]).filter(
+                    StatisticsDaily.day < date_from, *filters).group_by(*group):
+                opening[row[0] if group else None] += int(row[-2] or 0) - int(row[-1] or 0)
+
+            totals = defaultdict(lambda: [0, 0, 0])
+            for row in db.session.query(StatisticsDaily.day, *group, *sums).filter(
+                    StatisticsDaily.day.between(date_from, date_to), *filters
+            ).group_by(StatisticsDaily.day, *group):
+                period = totals[(row[1] if group else None, _period_start(granularity, row[0]))]
+                for i, value in enumerate(row[-3:]):
+                    period[i] += int(value or 0)
+
+            keys = set(opening) | {key for key, _ in totals}
+            if not group:
+                keys.add(None)
+            names = {}
+            if group_by == 'master' and keys:
+                names = dict(db.session.query(User.user_id, User.full_name).filter(User.user_id.in_(keys)))
+
+            result = []
+            for key in sorted(keys, key=lambda value: (value is None, str(value))):
+                backlog = opening[key]
+                points = []
+                for start in _period_starts(granularity, date_from, date_to):
+                    created, completed, days_sum = totals.get((key, start), (0, 0, 0))
+                    backlog += created - completed
+                    points.append({
+                        'period': start.isoformat(),
+                        'created': created,
+                        'completed': completed,
+                        'avg_completion_days': round(days_sum / completed, 1) if completed else None,
+                        'backlog': backlog
+                    })
+                item = {'points': points}
+                if group_by == 'equipment_type':
+                    item['equipment_type'] = key
+                elif group_by == 'master':
+                    item['specialist_id'] = key or None
+                    item['specialist_name'] = names.get(key)
+                result.append(item)
+
+            return {
+                'granularity': granularity,
+                'date_from': date_from.isoformat(),
+                'date_to': date_to.isoformat(),
+                'group_by': group_by,
+                'series': result
+            }
+        except Exception as e:
+            return {'error': str(e)}
+
+
+def _state(row):
+    return {
+        'request_id': row.request_id,
+        'start_date': row.start_date,
+        'climate_tech_type': row.climate_tech_type,
+        'master_id': row.master_id,
+        'completion_date': row.completion_date,
+    }
+
+
+def _contributions(state):
+    """Вклад одной заявки в дневные сводки: {((день, тип, мастер), колонка): значение}"""
+    if state is None:
+        return {}
+    master_id = state['master_id'] or 0
+    result = Counter({((state['start_date'], state['climate_tech_type'], master_id), 'created'): 1})
+    if state['completion_date']:
+        key = (state['completion_date'], state['climate_tech_type'], master_id)
+        result[(key, 'completed')] += 1
+        result[(key, 'completion_days_sum')] += (state['completion_date'] - state['start_date']).days
+    return result
+
+
+def _apply_delta(delta):
+    """Прибавить изменения к строкам statistics_daily (upsert, см. database.add_to_counters)"""
+    from models.statistics_snapshot import StatisticsDaily
+
+    rows = defaultdict(dict)
+    for (key, column), diff in delta.items():
+        if diff:
+            rows[key][column] = diff
+
+    add_to_counters(StatisticsDaily, ('day', 'climate_tech_type', 'master_id'), [
+        dict(day=day, climate_tech_type=tech_type, master_id=master_id,
+             **{column: diffs.get(column, 0) for column in ROLLUP_COLUMNS})
+        for (day, tech_type, master_id), diffs in rows.items()
+    ])
+
+
+def _rollup_progress(lock=False, read=False):
+    """(сводки построены, watermark обратного заполнения или None); lock - FOR UPDATE, с read - FOR SHARE"""
+    from models.statistics_snapshot import StatisticsCounter
+
+    query = db.session.query(StatisticsCounter.key, StatisticsCounter.value).filter_by(metric=ROLLUP_METRIC)
+    if lock:
+        query = query.with_for_update(read=read)
+    markers = dict(query)
+    return bool(markers.get(ROLLUP_BUILT_MARKER[1])), markers.get(ROLLUP_WATERMARK_MARKER[1])
+
+
+def _set_marker(marker, value):
+    from models.statistics_snapshot import StatisticsCounter
+
+    counter = db.session.get(StatisticsCounter, marker)
+    if counter is None:
+        db.session.add(StatisticsCounter(metric=marker[0], key=marker[1], value=value))
+    else:
+        counter.value = value
+
+
+def _period_start(granularity, day):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _period_starts(granularity, date_from, date_to):
+    """Начала всех периодов диапазона (пустые периоды тоже попадают в ряд)"""
+    starts = []
+    current = _period_start(granularity, date_from)
+    while current <= date_to:
+        starts.append(current)
+        if granularity == 'month':
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current += timedelta(days=7 if granularity == 'week' else 1)
+    return starts
@@ -1,5 +1,52 @@
 from database import db
-from sqlalchemy import func
+from sqlalchemy import func, case, cast, Integer
+
+# Статусы заявок -> ключи разбивки нагрузки специалиста
+WORKLOAD_STATUS_KEYS = {
+    'Новая заявка': 'new',
+    'В процессе ремонта': 'in_progress',
+    'Ожидание комплектующих': 'waiting_parts',
+    'Готова к выдаче': 'ready',
+}
+
+
+def _completion_days_expr(dialect_name):
+    """Выражение "дней от приёма до завершения" для конкретного диалекта БД"""
+    from models.repair_request import RepairRequest
+    if dialect_name == 'sqlite':
+        return cast(
+            func.julianday(RepairRequest.completion_date) - func.julianday(RepairRequest.start_date),
+            Integer
+        )
+    if dialect_name in ('mysql', 'mariadb'):
+        return func.datediff(RepairRequest.completion_date, RepairRequest.start_date)
+    # PostgreSQL: date - date = integer (дни)
+    return RepairRequest.completion_date - RepairRequest.start_date
+
+
+def _percentiles_from_histogram(histogram, total, fractions):
+    """
+    Перцентили с линейной интерполяцией (как percentile_cont) по потоку пар
+    (значение, количество), отсортированному по значению
+    """
+    positions = [fraction * (total - 1) for fraction in fractions]
+    wanted = sorted({int(p) for p in positions} | {min(int(p) + 1, total - 1) for p in positions})
+    values = {}
+    seen = 0
+    for value, count in histogram:
+        seen += count
+        while wanted and wanted[0] < seen:
+            values[wanted.pop(0)] = value
+        if not wanted:
+            break
+
+    result = []
+    for position in positions:
+        lower = int(position)
+        upper = min(lower + 1, total - 1)
+        result.append(values[lower] + (values[upper] - values[lower]) * (position - lower))
+    return result
+
 
 class StatisticsService:
     @staticmethod
@@ -12,17 +59,58 @@ class StatisticsService:
             return {'error': str(e)}
     
     @staticmethod
-    def get_average_completion_time():
+    def get_average_completion_time(date_from=None, date_to=None, equipment_type=None):
+        """
+        Среднее, медиана и 90-й перцентиль срока выполнения (в днях) завершённых заявок.
+        Считается на стороне БД; фильтры по дате завершения и типу оборудования необязательны.
+        """
         try:
             from models.repair_request import RepairRequest
-            requests = RepairRequest.query.filter(RepairRequest.completion_date.isnot(None)).all()
-            if not requests:
-                return {'avg_completion_days': 0}
-            total_days = sum((r.completion_date - r.start_date).days for r in requests)
-            return {'avg_completion_days': round(total_days / len(requests))}
+            dialect_name = db.session.get_bind().dialect.name
+            days = _completion_days_expr(dialect_name)
+
+            filters = [RepairRequest.completion_date.isnot(None)]
+            if date_from:
+                filters.append(RepairRequest.completion_date >= date_from)
+            if date_to:
+                filters.append(RepairRequest.completion_date <= date_to)
+            if equipment_type:
+                filters.append(RepairRequest.climate_tech_type == equipment_type)
+
+            count, avg_days = db.session.query(
+                func.count(RepairRequest.request_id),
+                func.avg(days)
+            ).filter(*filters).one()
+
+            if not count:
+                return {
+                    'avg_completion_days': 0,
+                    'median_completion_days': None,
+                    'p90_completion_days': None,
+                    'completed_count': 0
+                }
+
+            if dialect_name == 'postgresql':
+                median, p90 = db.session.query(
+                    func.percentile_cont(0.5).within_group(days),
+                    func.percentile_cont(0.9).within_group(days)
+                ).filter(*filters).one()
+            else:
+                # Нет percentile_cont: гистограмма по дням считается в БД, перцентили - по ней
+                histogram = db.session.query(
+                    days, func.count(RepairRequest.request_id)
+                ).filter(*filters).group_by(days).order_by(days).yield_per(1000)
+                median, p90 = _percentiles_from_histogram(histogram, count, (0.5, 0.9))
+
+            return {
+                'avg_completion_days': round(float(avg_days)),
+                'median_completion_days': round(float(median), 1),
+                'p90_completion_days': round(float(p90), 1),
+                'completed_count': count
+            }
         except Exception as e:
             return {'error': str(e)}
-    
+
     @staticmethod
     def get_statistics_by_equipment_type():
         try:
@@ -38,18 +126,31 @@ class StatisticsService:
     
     @staticmethod
     def get_specialist_workload():
+        """Нагрузка специалистов одним запросом: users LEFT JOIN repair_requests + GROUP BY"""
         try:
             from models.repair_request import RepairRequest
             from models.user import User
-            specialists = db.session.query(User).filter_by(user_type='Специалист').all()
-            result = []
-            for specialist in specialists:
-                assigned = RepairRequest.query.filter_by(master_id=specialist.user_id).count()
-                result.append({
-                    'specialist_id': specialist.user_id,
-                    'specialist_name': specialist.full_name,
-                    'total_assigned': assigned
-                })
-            return result
+            status_columns = [
+                func.count(case((RepairRequest.request_status == status, RepairRequest.request_id))).label(key)
+                for status, key in WORKLOAD_STATUS_KEYS.items()
+            ]
+            rows = db.session.query(
+                User.user_id,
+                User.full_name,
+                func.count(RepairRequest.request_id).label('total_assigned'),
+                *status_columns
+            ).outerjoin(
+                RepairRequest, RepairRequest.master_id == User.user_id
+            ).filter(
+                User.user_type == 'Специалист'
+            ).group_by(
+                User.user_id, User.full_name
+            ).order_by(User.user_id).all()
+            return [{
+                'specialist_id': row.user_id,
+                'specialist_name': row.full_name,
+                'total_assigned': row.total_assigned,
+                'by_status': {key: getattr(row, key) for key in WORKLOAD_STATUS_KEYS.values()}
+            } for row in rows]
         except Exception as e:
             return {'error': str(e)}
@@ -0,0 +1,249 @@
+from collections import Counter
+
+from database import db, add_to_counters
+from sqlalchemy import func
+from services.statistics_service import (
+    StatisticsService, WORKLOAD_STATUS_KEYS, _completion_days_expr, _percentiles_from_histogram
+)
+
+# Служебный счётчик: снимок построен и поддерживается инкрементально
+BUILT_MARKER = ('meta', 'built')
+# Метрика отметок дневных сводок - хранятся в той же таблице, но не входят в снимок
+ROLLUP_METRIC = 'rollup'
+
+
+class StatisticsSnapshotService:
+    """
+    Снимок статистики в таблице statistics_snapshot.
+
+    Счётчики обновляются в той же транзакции, что и запись заявки
+    (apply_change), поэтому чтение дашборда не сканирует repair_requests.
+    """
+
+    @staticmethod
+    def request_state(req):
+        """Поля заявки, от которых зависит статистика (None - заявки нет)"""
+        if req is None:
+            return None
+        return {
+            'request_id': req.request_id,
+            'request_status': req.request_status,
+            'climate_tech_type': req.climate_tech_type,
+            'master_id': req.master_id,
+            'start_date': req.start_date,
+            'completion_date': req.completion_date,
+        }
+
+    @staticmethod
+    def apply_change(old_state, new_state):
+        """
+        Применить изменение одной заявки к снимку (без commit - коммитит вызывающий код).
+        old_state = None для созданной заявки, new_state = None для удалённой.
+        """
+        StatisticsSnapshotService.apply_changes([(old_state, new_state)])
+
+    @staticmethod
+    def apply_changes(changes):
+        """
+        Применить изменения многих заявок [(old_state, new_state), ...] одним набором
+        upsert по затронутым счётчикам (для массовых операций).
+        """
+        from models.statistics_snapshot import StatisticsCounter
+        from services.statistics_rollup_service import StatisticsRollupService
+
+        # Дневные сводки для графиков обновляются теми же изменениями
+        StatisticsRollupService.apply_changes(changes)
+
+        if db.session.get(StatisticsCounter, BUILT_MARKER) is None:
+            # Снимок ещё не построен - его соберёт flask statistics rebuild-snapshot
+            return
+
+        delta = Counter()
+        for old_state, new_state in changes:
+            delta.update(_contributions(new_state))
+            delta.subtract(_contributions(old_state))
+
+        add_to_counters(StatisticsCounter, ('metric', 'key'), [
+            {'metric': metric, 'key': key, 'value': diff}
+            for (metric, key), diff in delta.items() if diff
+        ])
+
+    @staticmethod
+    def rebuild():
+        """Полная пересборка снимка с нуля (восстановление после сбоев)"""
+        try:
+            from models.statistics_snapshot import StatisticsCounter
+
+            counters = _compute_counters()
+            # Отметки дневных сводок (services.statistics_rollup_service) не трогаем
+            StatisticsCounter.query.filter(StatisticsCounter.metric != ROLLUP_METRIC).delete(
+                synchronize_session=False)
+            db.session.add_all(
+                StatisticsCounter(metric=metric, key=key, value=value)
+                for (metric, key), value in counters.items()
+            )
+            db.session.add(StatisticsCounter(metric=BUILT_MARKER[0], key=BUILT_MARKER[1], value=1))
+            db.session.commit()
+            return {'message': 'Snapshot rebuilt', 'counters': len(counters)}
+        except Exception as e:
+            db.session.rollback()
+            return {'error': str(e)}
+
+    @staticmethod
+    def check():
+        """Сравнить снимок с пересчётом с нуля"""
+        try:
+            stored = _load_counters()
+            if stored is None:
+                return {'consistent': False, 'built': False, 'differences': []}
+
+            actual = _compute_counters()
+            differences = [{
+                'metric': metric,
+                'key': key,
+                'snapshot': stored.get((metric, key), 0),
+                'actual': actual.get((metric, key), 0)
+            } for metric, key in sorted(set(stored) | set(actual))
+                if stored.get((metric, key), 0) != actual.get((metric, key), 0)]
+
+            return {'consistent': not differences, 'built': True, 'differences': differences}
+        except Exception as e:
+            return {'error': str(e)}
+
+    @staticmethod
+    def get_dashboard():
+        """
+        Вся статистика дашборда из снимка. Пока снимок не построен
+        (flask statistics rebuild-snapshot), считается запросами StatisticsService -
+        GET ничего не пишет.
+        """
+        try:
+            counters = _load_counters()
+            if counters is None:
+                return _dashboard_from_requests()
+
+            return {
+                'completed_requests': {
+                    'completed_requests_count': counters.get(('status', 'Готова к выдаче'), 0)
+                },
+                'average_completion_time': _average_from_counters(counters),
+                'equipment_statistics': [
+                    {'equipment_type': key, 'total_requests': value}
+                    for (metric, key), value in sorted(counters.items())
+                    if metric == 'equipment' and value
+                ],
+                'specialist_workload': _workload_from_counters(counters)
+            }
+        except Exception as e:
+            return {'error': str(e)}
+
+
+def _dashboard_from_requests():
+    """Дашборд агрегирующими запросами по repair_requests (снимка ещё нет)"""
+    result = {
+        'completed_requests': StatisticsService.get_completed_requests_count(),
+        'average_completion_time': StatisticsService.get_average_completion_time(),
+        'equipment_statistics': StatisticsService.get_statistics_by_equipment_type(),
+        'specialist_workload': StatisticsService.get_specialist_workload()
+    }
+    for value in result.values():
+        if isinstance(value, dict) and 'error' in value:
+            return value
+    return result
+
+
+def _contributions(state):
+    """Счётчики, в которые входит одна заявка"""
+    if state is None:
+        return []
+    status = state['request_status']
+    keys = [('status', status), ('equipment', state['climate_tech_type'])]
+    if state['master_id']:
+        keys.append(('master', str(state['master_id'])))
+        keys.append(('master_status', f"{state['master_id']}|{status}"))
+    if state['completion_date']:
+        days = (state['completion_date'] - state['start_date']).days
+        keys.append(('completion_days', str(days)))
+    return keys
+
+
+def _compute_counters():
+    """Пересчитать все счётчики по repair_requests агрегирующими запросами"""
+    from models.repair_request import RepairRequest
+
+    counters = Counter()
+    count = func.count(RepairRequest.request_id)
+
+    for status, value in db.session.query(RepairRequest.request_status, count).group_by(
+            RepairRequest.request_status):
+        counters[('status', status)] = value
+
+    for tech_type, value in db.session.query(RepairRequest.climate_tech_type, count).group_by(
+            RepairRequest.climate_tech_type):
+        counters[('equipment', tech_type)] = value
+
+    for master_id, status, value in db.session.query(
+            RepairRequest.master_id, RepairRequest.request_status, count
+    ).filter(RepairRequest.master_id.isnot(None)).group_by(
+            RepairRequest.master_id, RepairRequest.request_status):
+        counters[('master', str(master_id))] += value
+        counters[('master_status', f'{master_id}|{status}')] = value
+
+    days = _completion_days_expr(db.session.get_bind().dialect.name)
+    for days_value, value in db.session.query(days, count).filter(
+            RepairRequest.completion_date.isnot(None)).group_by(days):
+        counters[('completion_days', str(days_value))] = value
+
+    return counters
+
+
+def _load_counters():
+    """Счётчики из таблицы снимка (None - снимок не построен)"""
+    from models.statistics_snapshot import StatisticsCounter
+
+    counters = {
+        (row.metric, row.key): row.value
+        for row in db.session.query(StatisticsCounter.metric, StatisticsCounter.key, StatisticsCounter.value)
+    }
+    if counters.pop(BUILT_MARKER, None) is None:
+        return None
+    return {key: value for key, value in counters.items() if value and key[0] != ROLLUP_METRIC}
+
+
+def _average_from_counters(counters):
+    histogram = sorted(
+        (int(key), value) for (metric, key), value in counters.items() if metric == 'completion_days'
+    )
+    count = sum(value for _, value in histogram)
+    if not count:
+        return {
+            'avg_completion_days': 0,
+            'median_completion_days': None,
+            'p90_completion_days': None,
+            'completed_count': 0
+        }
+    median, p90 = _percentiles_from_histogram(histogram, count, (0.5, 0.9))
+    return {
+        'avg_completion_days': round(sum(days * value for days, value in histogram) / count),
+        'median_completion_days': round(float(median), 1),
+        'p90_completion_days': round(float(p90), 1),
+        'completed_count': count
+    }
+
+
+def _workload_from_counters(counters):
+    from models.user import User
+
+    specialists = db.session.query(User.user_id, User.full_name).filter(
+        User.user_type == 'Специалист'
+    ).order_by(User.user_id).all()
+
+    return [{
+        'specialist_id': user_id,
+        'specialist_name': full_name,
+        'total_assigned': counters.get(('master', str(user_id)), 0),
+        'by_status': {
+            key: counters.get(('master_status', f'{user_id}|{status}'), 0)
+            for status, key in WORKLOAD_STATUS_KEYS.items()
+        }
+    } for user_id, full_name in specialists]
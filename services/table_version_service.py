@@ -0,0 +1,38 @@
+import random
+
+from sqlalchemy import func
+
+from database import db, add_to_counters
+
+# Строк на таблицу в table_versions: параллельные записи увеличивают разные строки
+# и не ждут блокировку одной (версия - сумма по строкам, растёт монотонно)
+TABLE_VERSION_SLOTS = 16
+
+
+class TableVersionService:
+    """
+    Счётчики версий таблиц в table_versions.
+
+    bump вызывается рядом с каждой записью (в той же транзакции, без commit),
+    get - перед чтением: если версии не изменились, ответ можно не строить.
+    """
+
+    @staticmethod
+    def bump(*tables):
+        """Увеличить версии таблиц (коммитит вызывающий код)"""
+        from models.table_version import TableVersion
+
+        slot = random.randrange(TABLE_VERSION_SLOTS)
+        add_to_counters(TableVersion, ('table_name', 'slot'), [
+            {'table_name': table, 'slot': slot, 'version': 1} for table in set(tables)
+        ])
+
+    @staticmethod
+    def get(*tables):
+        """Текущие версии таблиц в порядке аргументов (0 - записей ещё не было)"""
+        from models.table_version import TableVersion
+
+        rows = dict(db.session.query(TableVersion.table_name, func.sum(TableVersion.version)).filter(
+            TableVersion.table_name.in_(tables)
+        ).group_by(TableVersion.table_name).all())
+        return tuple(int(rows.get(table) or 0) for table in tables)
@@ -0,0 +1,140 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from database import db
+from config import Config
+from sqlalchemy import select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+# Запас при подтягивании отзывов других воркеров (транзакции коммитятся не мгновенно)
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class TokenRevocationStore:
+    """
+    Список отозванных токенов.
+
+    Проверка is_revoked - поиск в словаре jti -> exp в памяти процесса.
+    Таблица revoked_tokens хранит отзывы между перезапусками и воркерами:
+    раз в sync_interval секунд из неё подтягиваются новые записи,
+    раз в compact_interval секунд удаляются истёкшие.
+    """
+
+    def __init__(self, sync_interval=5, compact_interval=600):
+        self.sync_interval = sync_interval
+        self.compact_interval = compact_interval
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._next_sync = 0.0
+        self._next_compact = time.monotonic() + compact_interval
+        self._watermark = None
+
+    def is_revoked(self, jti):
+        if not jti:
+            return False
+        self._maybe_sync()
+        exp = self._revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+    def revoke(self, jti, exp, user_id=None):
+        """
+        Отозвать токен до момента exp (unix time).
+        Возвращает True, если отозван этим вызовом (False - уже был отозван).
+        """
+        from models.revoked_token import RevokedToken
+
+        if not jti:
+            return False
+        row = dict(jti=jti, user_id=user_id, expires_at=datetime.utcfromtimestamp(exp),
+                   revoked_at=datetime.utcnow())
+        # Параллельный выход с тем же токеном: вторая вставка ничего не делает
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = (postgresql if dialect == 'postgresql' else sqlite).insert(RevokedToken)
+            inserted = db.session.execute(
+                insert.values(row).on_conflict_do_nothing(index_elements=['jti'])
+            ).rowcount == 1
+            db.session.commit()
+        elif db.session.get(RevokedToken, jti) is None:
+            try:
+                db.session.add(RevokedToken(**row))
+                db.session.commit()
+                inserted = True
+            except IntegrityError:
+                db.session.rollback()
+                inserted = False
+        else:
+            inserted = False
+        with self._lock:
+            self._revoked[jti] = exp
+        return inserted
+
+    def sync(self):
+        """Подтянуть отзывы из таблицы (в т.ч. сделанные другими воркерами)"""
+        from models.revoked_token import RevokedToken
+
+        now = datetime.utcnow()
+        query = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at).where(
+            RevokedToken.expires_at > now
+        )
+        if self._watermark is not None:
+            query = query.where(RevokedToken.revoked_at >= self._watermark - SYNC_OVERLAP)
+
+        # Отдельное соединение: не открываем транзакцию в сессии запроса
+        with db.engine.connect() as conn:
+            rows = conn.execute(query).all()
+
+        with self._lock:
+            for jti, expires_at, revoked_at in rows:
+                self._revoked[jti] = _to_timestamp(expires_at)
+                if self._watermark is None or revoked_at > self._watermark:
+                    self._watermark = revoked_at
+            if self._watermark is None:
+                self._watermark = now
+
+    def compact(self):
+        """Удалить истёкшие отзывы из памяти и из таблицы"""
+        from models.revoked_token import RevokedToken
+
+        now = time.time()
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+
+        with db.engine.begin() as conn:
+            result = conn.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        return result.rowcount
+
+    def stats(self):
+        return {'revoked_in_memory': len(self._revoked)}
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        with self._lock:
+            if now < self._next_sync:
+                return
+            self._next_sync = now + self.sync_interval
+            compact = now >= self._next_compact
+            if compact:
+                self._next_compact = now + self.compact_interval
+        try:
+            self.sync()
+            if compact:
+                self.compact()
+        except Exception as e:
+            # Недоступность БД не должна ломать проверку токенов - работаем по памяти
+            current_app.logger.warning("Token revocation sync failed: %s", e)
+
+
+def _to_timestamp(value):
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+revocation_store = TokenRevocationStore(
+    sync_interval=Config.REVOCATION_SYNC_INTERVAL,
+    compact_interval=Config.REVOCATION_COMPACT_INTERVAL
+)
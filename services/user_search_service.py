@@ -0,0 +1,189 @@
+import re
+import threading
+
+from sqlalchemy import case, func, or_
+
+from database import db
+from services.serialization import user_serializer
+from services.table_version_service import TableVersionService
+
+# Сколько подсказок отдаёт поиск по умолчанию (максимум - services.pagination.MAX_PAGE_LIMIT)
+USER_SEARCH_LIMIT = 10
+
+# Нечёткое сравнение (pg_trgm %) имеет смысл с трёх символов
+FUZZY_MIN_LENGTH = 3
+# Поиск по телефону - с трёх цифр
+PHONE_MIN_DIGITS = 3
+
+_WORD_RE = re.compile(r'\w+')
+
+
+class UserSearchService:
+    """
+    Подсказки при выборе пользователя (typeahead): ФИО, логин, телефон в любом формате.
+
+    Специалисты (выбор ответственного) ищутся по префиксному дереву в памяти
+    процесса - без запроса к users, кроме сверки версии. Остальные роли:
+    в PostgreSQL - триграммные GIN-индексы pg_trgm (подстрока и опечатки),
+    в других СУБД - такое же префиксное дерево по всем пользователям.
+    """
+
+    @staticmethod
+    def search(query_text, user_types=None, limit=USER_SEARCH_LIMIT):
+        """Лучшие совпадения -> список dict (поля user_serializer)"""
+        user_types = tuple(user_types) if user_types else None
+        if user_types == ('Специалист',):
+            return specialist_index.search(query_text, limit)
+        if db.session.get_bind().dialect.name == 'postgresql':
+            return _trigram_search(query_text, user_types, limit)
+        return user_index.search(query_text, limit, user_types)
+
+
+def invalidate_user_search():
+    """Сбросить деревья поиска после создания, изменения или удаления пользователя"""
+    specialist_index.invalidate()
+    user_index.invalidate()
+
+
+def _trigram_search(query_text, user_types, limit):
+    """Подстрока ФИО, начало логина, цифры телефона или похожее ФИО (similarity)"""
+    from models.user import User, normalized_phone
+
+    needle = _normalize(query_text)
+    name = func.lower(User.full_name)
+    conditions = [
+        name.contains(needle, autoescape=True),
+        func.lower(User.login).startswith(needle, autoescape=True),
+    ]
+    if len(needle) >= FUZZY_MIN_LENGTH:
+        conditions.append(name.op('%')(needle))
+    digits = _digits(query_text)
+    if len(digits) >= PHONE_MIN_DIGITS:
+        conditions.append(normalized_phone().contains(digits))
+
+    # Сначала ФИО, начинающиеся с запроса, затем по похожести
+    score = case((name.startswith(needle, autoescape=True), 1.0), else_=0.0) + func.word_similarity(needle, name)
+    statement = user_serializer.select().where(or_(*conditions))
+    if user_types:
+        statement = statement.where(User.user_type.in_(user_types))
+    return user_serializer.fetch(statement.order_by(score.desc(), User.full_name, User.user_id).limit(limit))
+
+
+def _normalize(value):
+    return ' '.join((value or '').lower().replace('ё', 'е').split())
+
+
+def _digits(value):
+    return re.sub(r'\D', '', value or '')
+
+
+def _user_keys(user):
+    """Ключи пользователя в дереве: слова ФИО, логин, телефон (и без кода страны)"""
+    keys = set(_WORD_RE.findall(_normalize(user['full_name'])))
+    keys.add(_normalize(user['login']))
+    phone = _digits(user['phone'])
+    if phone:
+        keys.add(phone)
+        if len(phone) == 11 and phone[0] in '78':
+            keys.add(phone[1:])
+    return keys
+
+
+class PrefixTrie:
+    """Префиксное дерево: ключ -> множество id, поиск всех id с ключом на данный префикс"""
+
+    # Множество id хранится в узле под пустым ключом (символы ключей непустые)
+    _IDS = ''
+
+    def __init__(self):
+        self._root = {}
+
+    def insert(self, key, item_id):
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+            node.setdefault(self._IDS, set()).add(item_id)
+
+    def find(self, prefix):
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get(self._IDS, set())
+
+
+class UserSearchIndex:
+    """
+    Кэш пользователей с префиксным деревом по словам ФИО, логину и телефону.
+
+    Строится лениво при первом поиске; сбрасывается invalidate() (routes/users.py
+    после записи) и при смене версии таблицы users - так видны изменения,
+    сделанные другими воркерами.
+    """
+
+    def __init__(self, user_types=None):
+        self.user_types = user_types
+        self._trie = None
+        self._users = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._trie = None
+
+    def search(self, query_text, limit, user_types=None):
+        words = _WORD_RE.findall(_normalize(query_text))
+        digits = _digits(query_text)
+        with self._lock:
+            self._sync()
+            if not words:
+                return []
+            # Каждое слово запроса - префикс какого-то ключа; номер можно вводить с пробелами и дефисами
+            matched = None
+            for word in words:
+                found = self._trie.find(word)
+                matched = set(found) if matched is None else matched & found
+            if len(words) > 1 and all(word.isdigit() for word in words):
+                matched |= self._trie.find(digits)
+            users = [self._users[user_id] for user_id in matched]
+
+        if user_types:
+            users = [user for user in users if user['user_type'] in user_types]
+        needle = _normalize(query_text)
+        users.sort(key=lambda user: (
+            not _normalize(user['full_name']).startswith(needle), user['full_name'], user['user_id']
+        ))
+        return users[:limit]
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._users), 'version': self._version, 'rebuilds': self.rebuilds}
+
+    def _sync(self):
+        from models.user import User
+
+        (version,) = TableVersionService.get('users')
+        if self._trie is not None and version == self._version:
+            return
+
+        statement = user_serializer.select()
+        if self.user_types:
+            statement = statement.where(User.user_type.in_(self.user_types))
+        trie = PrefixTrie()
+        users = {}
+        for user in user_serializer.fetch(statement):
+            users[user['user_id']] = user
+            for key in _user_keys(user):
+                trie.insert(key, user['user_id'])
+
+        self._trie = trie
+        self._users = users
+        self._version = version
+        self.rebuilds += 1
+
+
+specialist_index = UserSearchIndex(('Специалист',))
+user_index = UserSearchIndex()
@@ -1,34 +1,193 @@
+import json
+import threading
+import time
+
+from config import Config
 from database import db
-from werkzeug.security import generate_password_hash
+from services.auth_service import AuthService
+from services.cache import LRUCache
+from services.serialization import user_serializer
+from services.table_version_service import TableVersionService
+from services.user_search_service import invalidate_user_search
+
+# Ключ списка специалистов в кэше пользователей
+SPECIALISTS_KEY = "specialists"
+
+
+class MemoryUserStore:
+    """
+    Локальная замена общего хранилища кэша (Redis, memcached): тот же контракт
+    get / set / delete, значения хранятся как JSON. Общий только внутри процесса -
+    для разработки и проверки работы кэша с внешним хранилищем.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[1] <= time.time():
+                del self._data[key]
+                return None
+            return json.loads(item[0])
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (json.dumps(value, ensure_ascii=False), time.time() + ttl)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class UserCache:
+    """
+    Read-through кэш пользователей (dict из user_serializer) и списка специалистов.
+
+    Первый уровень - LRUCache в памяти процесса, второй (необязательный) - общее
+    хранилище с методами get/set/delete, например Redis. Промах на обоих уровнях
+    читает из БД и заполняет их. Любая запись пользователя вызывает invalidate
+    до и после commit; в других воркерах первый уровень устаревает не дольше
+    чем на ttl секунд.
+
+    Значение, прочитанное до invalidate, не кэшируется: загрузка запоминает
+    поколение кэша и не сохраняет результат, если за время чтения оно сменилось.
+    """
+
+    def __init__(self, maxsize, ttl, store=None):
+        self.ttl = ttl
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.store = store
+        self.store_hits = 0
+        self.store_misses = 0
+        self.store_errors = 0
+        self.loads = 0
+        self.invalidations = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        """Значение из кэша или loader() (None не кэшируется)"""
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        if self.store is not None:
+            value = self._store_call(self.store.get, key)
+            if value is not None:
+                self.store_hits += 1
+                self.local.set(key, value)
+                return value
+            self.store_misses += 1
+
+        with self._lock:
+            generation = self._generation
+        value = loader()
+        self.loads += 1
+        with self._lock:
+            # Параллельная запись успела сбросить кэш - прочитанное могло устареть
+            fresh = generation == self._generation
+        if value is not None and fresh:
+            self.local.set(key, value)
+            if self.store is not None:
+                self._store_call(self.store.set, key, value, self.ttl)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+        for key in keys:
+            self.local.invalidate(key)
+        if self.store is not None:
+            self._store_call(self.store.delete, *keys)
+        self.invalidations += 1
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        return {
+            **self.local.stats(),
+            "store": type(self.store).__name__ if self.store is not None else None,
+            "store_hits": self.store_hits,
+            "store_misses": self.store_misses,
+            "store_errors": self.store_errors,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+        }
+
+    def _store_call(self, method, *args):
+        # Недоступное общее хранилище не ломает чтение - идём в БД
+        try:
+            return method(*args)
+        except Exception:
+            self.store_errors += 1
+            return None
+
+
+def _make_store():
+    if Config.USER_CACHE_STORE == "memory":
+        return MemoryUserStore()
+    return None
+
+
+user_cache = UserCache(Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL, store=_make_store())
+
+
+def _user_key(user_id):
+    return f"user:{user_id}"
 
 
 class UserService:
+    @staticmethod
+    def invalidate_user(user_id=None):
+        """
+        Сбросить кэши при создании, изменении или удалении пользователя:
+        вызывается до commit и после него (чтение между ними не останется в кэше)
+        """
+        keys = [SPECIALISTS_KEY]
+        if user_id is not None:
+            keys.append(_user_key(user_id))
+        user_cache.invalidate(*keys)
+        invalidate_user_search()
+
     @staticmethod
     def get_all_users():
         try:
             from models.user import User
-            users = User.query.all()
-            return [u.to_dict() for u in users]
+            return user_serializer.fetch(user_serializer.select().order_by(User.user_id))
         except Exception as e:
             return {"error": str(e)}
 
     @staticmethod
     def get_user_by_id(user_id):
+        """Пользователь (dict) через кэш; None - не найден"""
         try:
             from models.user import User
-            user = User.query.get(user_id)
-            if not user:
-                return None
-            return user.to_dict()
+
+            def load():
+                users = user_serializer.fetch(user_serializer.select().where(User.user_id == user_id))
+                return users[0] if users else None
+
+            user = user_cache.get_or_load(_user_key(user_id), load)
+            return dict(user) if user is not None else None
         except Exception as e:
             return {"error": str(e)}
 
     @staticmethod
     def get_specialists():
+        """Все специалисты через кэш (копия - кэшированный список не меняется)"""
         try:
             from models.user import User
-            specialists = User.query.filter_by(user_type="Специалист").all()
-            return [u.to_dict() for u in specialists]
+            specialists = user_cache.get_or_load(SPECIALISTS_KEY, lambda: user_serializer.fetch(
+                user_serializer.select().where(User.user_type == "Специалист").order_by(User.user_id)
+            ))
+            return [dict(user) for user in specialists]
         except Exception as e:
             return {"error": str(e)}
 
@@ -74,7 +233,7 @@ class UserService:
             if len(password) < 3:
                 return {"error": "Password must be at least 3 characters long"}
 
-            hashed_password = generate_password_hash(password)
+            hashed_password = AuthService.hash_password(password)
 
             new_user = User(
                 full_name=full_name,
@@ -85,7 +244,10 @@ class UserService:
             )
 
             db.session.add(new_user)
+            TableVersionService.bump("users")
+            UserService.invalidate_user()
             db.session.commit()
+            UserService.invalidate_user(new_user.user_id)
 
             return new_user.to_dict()
         except Exception as e:
@@ -102,7 +264,10 @@ class UserService:
                 return {"error": "User not found"}
 
             db.session.delete(user)
+            TableVersionService.bump("users")
+            UserService.invalidate_user(user_id)
             db.session.commit()
+            UserService.invalidate_user(user_id)
 
             return {"message": "User deleted successfully"}
         except Exception as e:
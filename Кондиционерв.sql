@@ -7,6 +7,11 @@
 -- 1. УДАЛЕНИЕ СТАРЫХ ТАБЛИЦ (если существуют)
 -- ============================================================================
 
+DROP TABLE IF EXISTS request_tombstones CASCADE;
+DROP TABLE IF EXISTS table_versions CASCADE;
+DROP TABLE IF EXISTS revoked_tokens CASCADE;
+DROP TABLE IF EXISTS statistics_daily CASCADE;
+DROP TABLE IF EXISTS statistics_snapshot CASCADE;
 DROP TABLE IF EXISTS comments CASCADE;
 DROP TABLE IF EXISTS repair_requests CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
@@ -35,9 +40,14 @@ CREATE TABLE repair_requests (
     repair_parts VARCHAR(255),
     master_id INT,
     client_id INT NOT NULL,
+    -- ключ заявки во внешней системе (массовый импорт)
+    external_id VARCHAR(100),
+    -- время последнего изменения в UTC (приложение обновляет при записи)
+    updated_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'),
     FOREIGN KEY (master_id) REFERENCES users(user_id),
     FOREIGN KEY (client_id) REFERENCES users(user_id),
-    CONSTRAINT check_completion_date CHECK (completion_date IS NULL OR completion_date >= start_date)
+    CONSTRAINT check_completion_date CHECK (completion_date IS NULL OR completion_date >= start_date),
+    CONSTRAINT uq_requests_external_id UNIQUE (external_id)
 );
 
 CREATE TABLE comments (
@@ -50,15 +60,75 @@ CREATE TABLE comments (
     FOREIGN KEY (request_id) REFERENCES repair_requests(request_id)
 );
 
+-- Снимок статистики (заполняется приложением: flask statistics rebuild-snapshot)
+CREATE TABLE statistics_snapshot (
+    metric VARCHAR(50) NOT NULL,
+    key VARCHAR(150) NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, key)
+);
+
+-- Дневные сводки для /api/statistics/timeseries, заполняются: flask statistics backfill-rollups
+CREATE TABLE statistics_daily (
+    day DATE NOT NULL,
+    climate_tech_type VARCHAR(100) NOT NULL,
+    master_id INTEGER NOT NULL DEFAULT 0,
+    created BIGINT NOT NULL DEFAULT 0,
+    completed BIGINT NOT NULL DEFAULT 0,
+    completion_days_sum BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, climate_tech_type, master_id)
+);
+
+-- Отозванные JWT (POST /api/auth/logout), чистятся: flask auth compact-revocations
+CREATE TABLE revoked_tokens (
+    jti VARCHAR(64) PRIMARY KEY,
+    user_id INT,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Следы удалённых заявок для дельта-синхронизации (чистятся: flask requests compact-tombstones)
+CREATE TABLE request_tombstones (
+    request_id INT PRIMARY KEY,
+    client_id INT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc')
+);
+
+-- Версии таблиц для ETag: версия - сумма version по slot, каждая запись
+-- увеличивает один случайный slot (services.table_version_service.TABLE_VERSION_SLOTS)
+CREATE TABLE table_versions (
+    table_name VARCHAR(50) NOT NULL,
+    slot SMALLINT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (table_name, slot)
+);
+
 -- ============================================================================
 -- 3. СОЗДАНИЕ ИНДЕКСОВ
 -- ============================================================================
 
-CREATE INDEX idx_requests_status ON repair_requests(request_status);
-CREATE INDEX idx_requests_master ON repair_requests(master_id);
-CREATE INDEX idx_requests_client ON repair_requests(client_id);
-CREATE INDEX idx_comments_request ON comments(request_id);
+-- Составные индексы (те же, что объявлены в models/repair_request.py)
+CREATE INDEX idx_requests_client_id ON repair_requests(client_id, request_id);
+CREATE INDEX idx_requests_status_start ON repair_requests(request_status, start_date);
+CREATE INDEX idx_requests_master_status ON repair_requests(master_id, request_status);
+CREATE INDEX idx_requests_start_id ON repair_requests(start_date, request_id);
+CREATE INDEX idx_requests_updated ON repair_requests(updated_at, request_id);
+CREATE INDEX idx_comments_request_created ON comments(request_id, created_at, comment_id);
 CREATE INDEX idx_users_type ON users(user_type);
+CREATE INDEX idx_revoked_tokens_expires ON revoked_tokens(expires_at);
+CREATE INDEX idx_revoked_tokens_revoked ON revoked_tokens(revoked_at);
+CREATE INDEX idx_request_tombstones_deleted ON request_tombstones(deleted_at);
+-- Полнотекстовый поиск заявок (то же выражение, что models.repair_request.search_document)
+CREATE INDEX idx_requests_search ON repair_requests USING gin ((
+    setweight(to_tsvector('russian'::regconfig, coalesce(climate_tech_model, '')), 'A') ||
+    setweight(to_tsvector('russian'::regconfig, coalesce(problem_description, '')), 'B') ||
+    setweight(to_tsvector('russian'::regconfig, coalesce(repair_parts, '')), 'C')
+));
+-- Поиск пользователей по подстроке и с опечатками (models/user.py, services/user_search_service.py)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_users_full_name_trgm ON users USING gin (lower(full_name) gin_trgm_ops);
+CREATE INDEX idx_users_login_trgm ON users USING gin (lower(login) gin_trgm_ops);
+CREATE INDEX idx_users_phone_trgm ON users USING gin (regexp_replace(phone, '\D', '', 'g') gin_trgm_ops);
 
 -- ============================================================================
 -- 4. ВСТАВКА ДАННЫХ (без указания ID - они генерируются автоматически)
@@ -102,6 +172,12 @@ VALUES
     ('Всё сделаем!', 3, 2),
     ('Починим в момент.', 3, 3);
 
+-- Все slot заранее: во время работы bump только увеличивает существующие строки
+INSERT INTO table_versions (table_name, slot, version)
+SELECT table_name, slot, CASE WHEN slot = 0 THEN 1 ELSE 0 END
+FROM (VALUES ('users'), ('repair_requests')) AS tables(table_name)
+CROSS JOIN generate_series(0, 15) AS slot;
+
 -- ============================================================================
 -- 5. ПРОВЕРКА ДАННЫХ
 -- ============================================================================
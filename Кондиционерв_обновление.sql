@@ -0,0 +1,107 @@
+-- ============================================================================
+-- Обновление существующей БД PostgreSQL до текущей схемы (без потери данных)
+--
+-- Кондиционерв.sql пересоздаёт таблицы с нуля, а db.create_all() не меняет
+-- уже существующие таблицы - новые колонки и индексы к ним добавляет этот
+-- скрипт. Повторный запуск безопасен (IF NOT EXISTS).
+--
+--     psql -d Кондиционеры -f Кондиционерв_обновление.sql
+-- ============================================================================
+
+BEGIN;
+
+-- ----------------------------------------------------------------------------
+-- Дельта-синхронизация заявок (GET /api/requests/changes)
+-- ----------------------------------------------------------------------------
+
+-- Существующие заявки получают время обновления скрипта: клиенты один раз
+-- получат их как изменённые
+ALTER TABLE repair_requests
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc');
+CREATE INDEX IF NOT EXISTS idx_requests_updated ON repair_requests(updated_at, request_id);
+
+CREATE TABLE IF NOT EXISTS request_tombstones (
+    request_id INT PRIMARY KEY,
+    client_id INT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc')
+);
+CREATE INDEX IF NOT EXISTS idx_request_tombstones_deleted ON request_tombstones(deleted_at);
+
+-- ----------------------------------------------------------------------------
+-- Массовый импорт заявок (POST /api/requests/import): ключ во внешней системе
+-- ----------------------------------------------------------------------------
+
+ALTER TABLE repair_requests ADD COLUMN IF NOT EXISTS external_id VARCHAR(100);
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_requests_external_id') THEN
+        ALTER TABLE repair_requests ADD CONSTRAINT uq_requests_external_id UNIQUE (external_id);
+    END IF;
+END $$;
+
+-- ----------------------------------------------------------------------------
+-- Версии таблиц для ETag: несколько строк (slot) на таблицу вместо одной
+-- ----------------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(50) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0
+);
+ALTER TABLE table_versions ADD COLUMN IF NOT EXISTS slot SMALLINT NOT NULL DEFAULT 0;
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = 'table_versions'::regclass AND i.indisprimary AND a.attname = 'slot'
+    ) THEN
+        ALTER TABLE table_versions DROP CONSTRAINT IF EXISTS table_versions_pkey;
+        ALTER TABLE table_versions ADD PRIMARY KEY (table_name, slot);
+    END IF;
+END $$;
+
+-- Все slot заранее (существующие версии остаются в slot 0, сумма не меняется)
+INSERT INTO table_versions (table_name, slot, version)
+SELECT table_name, slot, 0
+FROM (VALUES ('users'), ('repair_requests')) AS tables(table_name)
+CROSS JOIN generate_series(0, 15) AS slot
+ON CONFLICT (table_name, slot) DO NOTHING;
+
+-- ----------------------------------------------------------------------------
+-- Поиск пользователей по подстроке и с опечатками (GET /api/users/search):
+-- pg_trgm и триграммные индексы (те же выражения, что в models/user.py)
+-- ----------------------------------------------------------------------------
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_users_full_name_trgm ON users USING gin (lower(full_name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_login_trgm ON users USING gin (lower(login) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_phone_trgm ON users USING gin (regexp_replace(phone, '\D', '', 'g') gin_trgm_ops);
+
+-- ----------------------------------------------------------------------------
+-- Полнотекстовый поиск заявок (GET /api/requests/search, ?search=):
+-- то же выражение, что models.repair_request.search_document
+-- ----------------------------------------------------------------------------
+
+CREATE INDEX IF NOT EXISTS idx_requests_search ON repair_requests USING gin ((
+    setweight(to_tsvector('russian'::regconfig, coalesce(climate_tech_model, '')), 'A') ||
+    setweight(to_tsvector('russian'::regconfig, coalesce(problem_description, '')), 'B') ||
+    setweight(to_tsvector('russian'::regconfig, coalesce(repair_parts, '')), 'C')
+));
+
+-- ----------------------------------------------------------------------------
+-- Составные индексы списков заявок и комментариев (models/repair_request.py,
+-- models/comment.py); прежние одноколоночные индексы - их префиксы, не нужны
+-- ----------------------------------------------------------------------------
+
+CREATE INDEX IF NOT EXISTS idx_requests_client_id ON repair_requests(client_id, request_id);
+CREATE INDEX IF NOT EXISTS idx_requests_status_start ON repair_requests(request_status, start_date);
+CREATE INDEX IF NOT EXISTS idx_requests_master_status ON repair_requests(master_id, request_status);
+CREATE INDEX IF NOT EXISTS idx_requests_start_id ON repair_requests(start_date, request_id);
+CREATE INDEX IF NOT EXISTS idx_comments_request_created ON comments(request_id, created_at, comment_id);
+
+DROP INDEX IF EXISTS idx_requests_client;
+DROP INDEX IF EXISTS idx_requests_status;
+DROP INDEX IF EXISTS idx_requests_master;
+DROP INDEX IF EXISTS idx_comments_request;
+
+COMMIT;